@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+"""Compare iterating a JavaScript array from Python with converting it at once.
+
+    python benchmarks/bench_arrays.py [items] [repeat]
+"""
+import sys
+import timeit
+
+from v8 import JSContext
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+REPEAT = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+
+def report(name, func):
+    elapsed = min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+    print("%-24s %10.3f ms %8.1f ns/item" % (name, elapsed * 1000, elapsed * 1e9 / ITEMS))
+
+
+def iterate(array):
+    for _ in array:
+        pass
+
+
+with JSContext() as ctxt:
+    array = ctxt.eval("var a = []; for (var i=0; i<%d; i++) a.push(i); a" % ITEMS)
+
+    print("%d items, best of %d" % (ITEMS, REPEAT))
+
+    report("for x in JSArray", lambda: iterate(array))
+    report("JSArray.tolist()", lambda: array.tolist())
+    report("JSArray[i]", lambda: [array[i] for i in range(ITEMS)])
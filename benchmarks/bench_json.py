@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""Compare the JSON fast path with the generic conversion of the results.
+
+    python benchmarks/bench_json.py [items] [repeat]
+"""
+import sys
+import json
+import timeit
+
+from v8 import JSContext
+from v8.utils import convert
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REPEAT = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+payload = json.dumps([{'id': i, 'name': 'item %d' % i, 'tags': ['a', 'b', 'c'], 'price': i * 1.5}
+                      for i in range(ITEMS)])
+
+
+def report(name, func):
+    elapsed = min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+    print("%-32s %10.3f ms" % (name, elapsed * 1000))
+
+
+with JSContext() as ctxt:
+    parse = ctxt.eval("(function (s) { return JSON.parse(s); })")
+    payload_bytes = payload.encode('utf-8')
+    obj = ctxt.parse_json(payload_bytes)
+
+    print("%d items, %d bytes, best of %d" % (ITEMS, len(payload_bytes), REPEAT))
+
+    report("eval JSON.parse(str)", lambda: parse(payload))
+    report("JSContext.parse_json(bytes)", lambda: ctxt.parse_json(payload_bytes))
+    report("convert(obj)", lambda: convert(obj))
+    report("JSObject.to_python()", lambda: obj.to_python())
+    report("JSObject.to_json()", lambda: obj.to_json())
+    report("json.loads(JSObject.to_json())", lambda: json.loads(obj.to_json().decode('utf-8')))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Measure the time and the memory of holding many JavaScript object wrappers from Python.
+
+    python benchmarks/bench_wrappers.py [count]
+
+Each case runs in a fresh process, so the memory freed by a case can't hide the growth of the next one.
+"""
+import os
+import gc
+import sys
+import time
+import subprocess
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from v8 import JSContext
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+CASES = [
+    ("JSObject", "var a = []; for (var i=0; i<%d; i++) a.push({ i: i }); a"),
+    ("JSArray", "var a = []; for (var i=0; i<%d; i++) a.push([i]); a"),
+    ("JSFunction", "var a = []; for (var i=0; i<%d; i++) a.push(function () {}); a"),
+]
+
+
+def rss():
+    # the current resident set, ru_maxrss is the peak which hides the cases after the first one
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def measure(name, ctxt, source):
+    items = ctxt.eval(source % COUNT)
+
+    gc.collect()
+
+    before = rss()
+    start = time.time()
+
+    wrappers = [items[i] for i in range(COUNT)]
+
+    elapsed = time.time() - start
+    growth = rss() - before
+
+    print("%-12s %10.3f ms %8.1f bytes/wrapper" % (name, elapsed * 1000, float(growth) / len(wrappers)))
+
+    del wrappers, items
+
+    gc.collect()
+
+
+if len(sys.argv) > 2:
+    name, source = CASES[int(sys.argv[2])]
+
+    with JSContext() as ctxt:
+        measure(name, ctxt, source)
+else:
+    print("%d wrappers" % COUNT)
+    sys.stdout.flush()
+
+    for i in range(len(CASES)):
+        subprocess.check_call([sys.executable, __file__, str(COUNT), str(i)])
@@ -3,8 +3,20 @@
 #include "Wrapper.h"
 #include "Engine.h"
 
+#include <sstream>
+
+#include <boost/thread/mutex.hpp>
+#include <boost/thread/locks.hpp>
+
+static boost::mutex s_budgetLock;
+
+const uint32_t CHeapBudget::DATA_SLOT;
+PyObject *CHeapBudget::s_exception = NULL;
+
 void CContext::Expose(void)
 {
+  CHeapBudget::Expose();
+
   py::class_<CIsolate, boost::noncopyable>("JSIsolate", "JSIsolate is an isolated instance of the V8 engine.", py::no_init)
     .def(py::init<bool>((py::arg("owner") = false)))
 
@@ -15,6 +27,15 @@ void CContext::Expose(void)
 
     .def("GetCurrentStackTrace", &CIsolate::GetCurrentStackTrace)
 
+    .def("heap_stats", &CIsolate::GetHeapStatistics,
+         "Get the statistics about the heap memory usage of the isolate, "
+         "with the size, used, available and committed bytes of each heap space and the external memory.")
+
+    .add_property("memoryLimit", &CIsolate::GetMemoryLimit, &CIsolate::SetMemoryLimit,
+                  "The soft limit of the used heap in bytes, 0 means unlimited. "
+                  "The heap is checked after each garbage collection, once it's crossed "
+                  "the execution is terminated and JSMemoryLimitExceeded is raised.")
+
     .def("enter", &CIsolate::Enter,
          "Sets this isolate as the entered one for the current thread. "
          "Saves the previously entered one (if any), so that it can be "
@@ -50,12 +71,28 @@ void CContext::Expose(void)
                                        py::arg("name") = std::string(),
                                        py::arg("line") = -1,
                                        py::arg("col") = -1,
-                                       py::arg("precompiled") = py::object()))
+                                       py::arg("precompiled") = py::object(),
+                                       py::arg("raw") = false))
     .def("eval", &CContext::EvaluateW, (py::arg("source"),
                                         py::arg("name") = std::wstring(),
                                         py::arg("line") = -1,
                                         py::arg("col") = -1,
-                                        py::arg("precompiled") = py::object()))
+                                        py::arg("precompiled") = py::object(),
+                                        py::arg("raw") = false))
+
+    .def("to_js", &CContext::ToJS, (py::arg("obj"),
+                                    py::arg("deep") = true),
+         "Copy the dict, list and tuple into the native JavaScript object and array, "
+         "instead of wrapping them as the Python object proxies.")
+
+    .def("parse_json", &CContext::ParseJSON, (py::arg("data")),
+         "Parse the JSON text, the UTF-8 encoded bytes or any buffer, with the V8 JSON parser.")
+
+    .def("expose", &CContext::ExposeFunction, (py::arg("func"),
+                                               py::arg("signature") = py::object(),
+                                               py::arg("name") = py::object()),
+         "Expose the Python callable as a global function, the arguments listed in the signature "
+         "as int, float, str or bool are converted directly instead of being wrapped.")
 
     .def("enter", &CContext::Enter, "Enter this context. "
          "After entering a context, all code compiled and "
@@ -76,6 +113,213 @@ void CContext::Expose(void)
     py::objects::pointer_holder<boost::shared_ptr<CContext>,CContext> > >();
 }
 
+CIsolate::~CIsolate(void)
+{
+  if (m_owner) Dispose();
+}
+
+void CIsolate::Dispose(void)
+{
+  {
+    // the cached persistent handles must be reset with the isolate locked and entered
+
+    std::auto_ptr<v8::Locker> locker;
+
+    if (v8::Locker::IsActive()) locker.reset(new v8::Locker(m_isolate));
+
+    v8::Isolate::Scope isolate_scope(m_isolate);
+
+    CScriptCache::Release(m_isolate);
+    CPythonClass::Release(m_isolate);
+    CPythonNames::Release(m_isolate);
+    CJavascriptObjectCache::Release(m_isolate);
+    CHeapBudget::Release(m_isolate);
+    GarbageCollectionTracker::Release(m_isolate);
+  }
+
+  m_isolate->Dispose();
+}
+
+size_t CIsolate::GetMemoryLimit(void)
+{
+  return CHeapBudget::GetLimit(m_isolate);
+}
+
+void CIsolate::SetMemoryLimit(size_t limit)
+{
+  CHeapBudget::SetLimit(m_isolate, limit);
+}
+
+void CHeapBudget::Expose(void)
+{
+  s_exception = ::PyErr_NewException(const_cast<char *>("_v8.JSMemoryLimitExceeded"), ::PyExc_MemoryError, NULL);
+
+  py::scope().attr("JSMemoryLimitExceeded") = py::object(py::handle<>(py::borrowed(s_exception)));
+}
+
+void CHeapBudget::onGCEpilogue(v8::Isolate *isolate, v8::GCType type, v8::GCCallbackFlags flags)
+{
+  Budget *budget = Find(isolate);
+
+  if (!budget || budget->exceeded) return;
+
+  size_t limit;
+
+  {
+    boost::lock_guard<boost::mutex> lock(s_budgetLock);
+
+    limit = budget->limit;
+  }
+
+  if (!limit) return;
+
+  v8::HeapStatistics stats;
+
+  isolate->GetHeapStatistics(&stats);
+
+  if (stats.used_heap_size() > limit)
+  {
+    budget->exceeded = true;
+
+    v8::V8::TerminateExecution(isolate);
+  }
+}
+
+size_t CHeapBudget::GetLimit(v8::Isolate *isolate)
+{
+  boost::lock_guard<boost::mutex> lock(s_budgetLock);
+
+  Budget *budget = Find(isolate);
+
+  return budget ? budget->limit : 0;
+}
+
+void CHeapBudget::SetLimit(v8::Isolate *isolate, size_t limit)
+{
+  boost::lock_guard<boost::mutex> lock(s_budgetLock);
+
+  Budget *budget = Find(isolate);
+
+  if (!budget)
+  {
+    if (!limit) return;
+
+    // kept until the isolate is disposed, so the entered scopes never see it released
+
+    budget = new Budget();
+
+    isolate->SetData(DATA_SLOT, budget);
+  }
+
+  if (limit && !budget->limit)
+  {
+    isolate->AddGCEpilogueCallback(onGCEpilogue);
+  }
+  else if (!limit && budget->limit)
+  {
+    isolate->RemoveGCEpilogueCallback(onGCEpilogue);
+  }
+
+  budget->limit = limit;
+}
+
+void CHeapBudget::Release(v8::Isolate *isolate)
+{
+  boost::lock_guard<boost::mutex> lock(s_budgetLock);
+
+  delete Find(isolate);
+
+  isolate->SetData(DATA_SLOT, NULL);
+}
+
+bool CHeapBudget::Exit(v8::Isolate *isolate, Budget *budget)
+{
+  bool outermost = 0 == --budget->depth;
+  bool exceeded = budget->exceeded;
+
+  // keep terminating until the outermost call returns, so the script can't catch the exception
+
+  if (exceeded && outermost)
+  {
+    budget->exceeded = false;
+
+    v8::V8::CancelTerminateExecution(isolate);
+  }
+
+  return exceeded;
+}
+
+void CHeapBudget::Scope::Leave(void)
+{
+  Budget *budget = m_budget;
+
+  m_budget = NULL;
+
+  if (!budget || !CHeapBudget::Exit(m_isolate, budget)) return;
+
+  size_t limit;
+
+  {
+    boost::lock_guard<boost::mutex> lock(s_budgetLock);
+
+    limit = budget->limit;
+  }
+
+  std::ostringstream oss;
+
+  oss << "the used heap exceeded the memory limit of " << limit << " bytes";
+
+  throw CJavascriptException(oss.str(), s_exception);
+}
+
+template <typename T>
+static py::dict GetSpaceStatistics(T *space)
+{
+  py::dict stats;
+
+  stats["size"] = space->Size();
+  stats["used"] = space->SizeOfObjects();
+  stats["available"] = space->Available();
+  stats["committed"] = space->CommittedMemory();
+
+  return stats;
+}
+
+py::dict CIsolate::GetHeapStatistics(void)
+{
+  v8::HeapStatistics stats;
+
+  m_isolate->GetHeapStatistics(&stats);
+
+  py::dict result;
+
+  result["total_heap_size"] = stats.total_heap_size();
+  result["total_heap_size_executable"] = stats.total_heap_size_executable();
+  result["total_physical_size"] = stats.total_physical_size();
+  result["used_heap_size"] = stats.used_heap_size();
+  result["heap_size_limit"] = stats.heap_size_limit();
+
+  v8i::Heap *heap = reinterpret_cast<v8i::Isolate *>(m_isolate)->heap();
+
+  py::dict spaces;
+
+  spaces["new"] = GetSpaceStatistics(heap->new_space());
+  spaces["old_pointer"] = GetSpaceStatistics(heap->old_pointer_space());
+  spaces["old_data"] = GetSpaceStatistics(heap->old_data_space());
+  spaces["code"] = GetSpaceStatistics(heap->code_space());
+  spaces["map"] = GetSpaceStatistics(heap->map_space());
+  spaces["cell"] = GetSpaceStatistics(heap->cell_space());
+  spaces["property_cell"] = GetSpaceStatistics(heap->property_cell_space());
+  spaces["large_object"] = GetSpaceStatistics(heap->lo_space());
+
+  result["spaces"] = spaces;
+
+  // adjusting by zero returns the current amount reported by the embedder
+  result["external_memory"] = m_isolate->AdjustAmountOfExternalAllocatedMemory(0);
+
+  return result;
+}
+
 py::object CIsolate::GetCurrent(void)
 {
   v8::Isolate *isolate = v8::Isolate::GetCurrent();
@@ -208,23 +452,95 @@ py::object CContext::GetCalling(void)
 py::object CContext::Evaluate(const std::string& src,
                               const std::string name,
                               int line, int col,
-                              py::object precompiled)
+                              py::object precompiled, bool raw)
 {
+  CScriptCache *cache = CScriptCache::Get(v8::Isolate::GetCurrent());
+
+  if (cache) return cache->Compile(src, name, line, col, precompiled)->Run(raw);
+
   CEngine engine(v8::Isolate::GetCurrent());
 
   CScriptPtr script = engine.Compile(src, name, line, col, precompiled);
 
-  return script->Run();
+  return script->Run(raw);
+}
+
+py::object CContext::ToJS(py::object obj, bool deep)
+{
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::Context::Scope context_scope(Handle());
+
+  return CJavascriptObject::Wrap(CPythonObject::Copy(obj, deep));
+}
+
+py::object CContext::ParseJSON(py::object data)
+{
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  v8::HandleScope handle_scope(isolate);
+
+  v8::Context::Scope context_scope(Handle());
+
+  v8::TryCatch try_catch;
+
+  v8::Handle<v8::String> json;
+
+  if (PyUnicode_Check(data.ptr()))
+  {
+    json = ToString(data);
+  }
+  else
+  {
+    Py_buffer buf;
+
+    if (-1 == ::PyObject_GetBuffer(data.ptr(), &buf, PyBUF_SIMPLE))
+    {
+      throw CJavascriptException("fail to get data from the JSON buffer", ::PyExc_TypeError);
+    }
+
+    json = v8::String::NewFromUtf8(isolate, (const char *) buf.buf, v8::String::kNormalString, (int) buf.len);
+
+    ::PyBuffer_Release(&buf);
+  }
+
+  v8::Handle<v8::Value> result = v8::JSON::Parse(json);
+
+  if (result.IsEmpty()) CJavascriptException::ThrowIf(isolate, try_catch);
+
+  return CJavascriptObject::Wrap(result);
+}
+
+py::object CContext::ExposeFunction(py::object func, py::object signature, py::object name)
+{
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::Context::Scope context_scope(Handle());
+
+  v8::TryCatch try_catch;
+
+  if (name.is_none()) name = func.attr("__name__");
+
+  v8::Handle<v8::Function> result = CPythonFunction::Create(func, signature, name);
+
+  if (!Handle()->Global()->Set(ToString(name), result))
+    CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+  return CJavascriptObject::Wrap(result);
 }
 
 py::object CContext::EvaluateW(const std::wstring& src,
                                const std::wstring name,
                                int line, int col,
-                               py::object precompiled)
+                               py::object precompiled, bool raw)
 {
+  CScriptCache *cache = CScriptCache::Get(v8::Isolate::GetCurrent());
+
+  if (cache) return cache->CompileW(src, name, line, col, precompiled)->Run(raw);
+
   CEngine engine(v8::Isolate::GetCurrent());
 
   CScriptPtr script = engine.CompileW(src, name, line, col, precompiled);
 
-  return script->Run();
+  return script->Run(raw);
 }
@@ -1,6 +1,7 @@
 #pragma once
 
 #include <cassert>
+#include <map>
 
 #include <boost/shared_ptr.hpp>
 
@@ -20,7 +21,7 @@ class CIsolate
 public:
   CIsolate(bool owner=false) : m_owner(owner) { m_isolate = v8::Isolate::New(); }
   CIsolate(v8::Isolate *isolate) : m_isolate(isolate), m_owner(false) {}
-  ~CIsolate(void) { if (m_owner) m_isolate->Dispose(); }
+  ~CIsolate(void);
 
   v8::Isolate *GetIsolate(void) { return m_isolate; }
 
@@ -33,9 +34,63 @@ public:
 
   void Enter(void) { m_isolate->Enter(); }
   void Leave(void) { m_isolate->Exit(); }
-  void Dispose(void) { m_isolate->Dispose(); }
+  void Dispose(void);
 
   bool IsLocked(void) { return v8::Locker::IsLocked(m_isolate); }
+
+  py::dict GetHeapStatistics(void);
+
+  size_t GetMemoryLimit(void);
+  void SetMemoryLimit(size_t limit);
+};
+
+//
+// The soft limit of the used heap of an isolate, checked after each garbage collection,
+// the execution is terminated once it's crossed and the outermost call raises JSMemoryLimitExceeded.
+//
+class CHeapBudget
+{
+  // kept in the isolate data, the depth and the exceeded flag are only touched by the thread which owns the isolate
+  struct Budget
+  {
+    size_t limit;
+    bool exceeded;
+    size_t depth;
+  };
+
+  static const uint32_t DATA_SLOT = 0;
+
+  static PyObject *s_exception;
+
+  static Budget *Find(v8::Isolate *isolate) { return static_cast<Budget *>(isolate->GetData(DATA_SLOT)); }
+
+  static void onGCEpilogue(v8::Isolate *isolate, v8::GCType type, v8::GCCallbackFlags flags);
+
+  static bool Exit(v8::Isolate *isolate, Budget *budget);
+public:
+  //
+  // Counts the nested calls into an isolate with a limit, wrap each Run/Call with it and Leave() once it returns,
+  // the termination is kept until the outermost call, so the script can't catch the exception.
+  //
+  class Scope
+  {
+    v8::Isolate *m_isolate;
+    Budget *m_budget;
+  public:
+    Scope(v8::Isolate *isolate) : m_isolate(isolate), m_budget(Find(isolate))
+    {
+      if (m_budget) m_budget->depth++;
+    }
+    ~Scope() { if (m_budget) CHeapBudget::Exit(m_isolate, m_budget); }
+
+    void Leave(void);
+  };
+
+  static size_t GetLimit(v8::Isolate *isolate);
+  static void SetLimit(v8::Isolate *isolate, size_t limit);
+  static void Release(v8::Isolate *isolate);
+
+  static void Expose(void);
 };
 
 class CContext
@@ -66,9 +121,13 @@ public:
   bool HasOutOfMemoryException(void) { v8::HandleScope handle_scope(v8::Isolate::GetCurrent()); return Handle()->HasOutOfMemoryException(); }
 
   py::object Evaluate(const std::string& src, const std::string name = std::string(),
-                      int line = -1, int col = -1, py::object precompiled = py::object());
+                      int line = -1, int col = -1, py::object precompiled = py::object(), bool raw = false);
   py::object EvaluateW(const std::wstring& src, const std::wstring name = std::wstring(),
-                       int line = -1, int col = -1, py::object precompiled = py::object());
+                       int line = -1, int col = -1, py::object precompiled = py::object(), bool raw = false);
+
+  py::object ToJS(py::object obj, bool deep);
+  py::object ParseJSON(py::object data);
+  py::object ExposeFunction(py::object func, py::object signature, py::object name);
 
   static py::object GetEntered(void);
   static py::object GetCurrent(void);
@@ -1,6 +1,7 @@
 #include "Engine.h"
 
 #include <iostream>
+#include <algorithm>
 
 #include <boost/preprocessor.hpp>
 #include <boost/thread/mutex.hpp>
@@ -10,6 +11,8 @@
   CEngine::CounterTable CEngine::m_counters;
 #endif
 
+py::object CEngine::s_codeCache;
+
 #ifdef SUPPORT_AST
   #include "AST.h"
 #endif
@@ -88,6 +91,374 @@ public:
 
 MemoryAllocationManager::CallbackMap MemoryAllocationManager::s_callbacks;
 
+//
+// Aggregate the allocation events per object space into the lock-free counters,
+// the Python callback is sampled by the allocated bytes and runs as a pending call of the interpreter,
+// so it never runs inside the V8 allocator.
+//
+class MemoryAllocationTracker
+{
+  enum { kSpaces = 8 };
+
+  struct Counters
+  {
+    int64_t allocated, freed, allocations, frees;
+  };
+
+  static Counters s_counters[kSpaces];
+  static const char *s_names[kSpaces];
+
+  static bool s_enabled;
+
+  static py::object s_callback;
+  static int64_t s_threshold, s_pending, s_scheduled;
+
+  static int GetSpaceIndex(v8::ObjectSpace space)
+  {
+    switch (space)
+    {
+    case v8::kObjectSpaceNewSpace: return 0;
+    case v8::kObjectSpaceOldPointerSpace: return 1;
+    case v8::kObjectSpaceOldDataSpace: return 2;
+    case v8::kObjectSpaceCodeSpace: return 3;
+    case v8::kObjectSpaceMapSpace: return 4;
+    case v8::kObjectSpaceCellSpace: return 5;
+    case v8::kObjectSpacePropertyCellSpace: return 6;
+    case v8::kObjectSpaceLoSpace: return 7;
+    default: return -1;
+    }
+  }
+
+  static void onMemoryAllocation(v8::ObjectSpace space, v8::AllocationAction action, int size)
+  {
+    int index = GetSpaceIndex(space);
+
+    if (index < 0) return;
+
+    Counters& counters = s_counters[index];
+
+    if (action == v8::kAllocationActionAllocate)
+    {
+      ATOMIC_ADD(counters.allocated, size);
+      ATOMIC_ADD(counters.allocations, 1);
+
+      if (s_threshold && ATOMIC_ADD(s_pending, size) + size >= s_threshold && ATOMIC_CAS(s_scheduled, 0, 1))
+      {
+        if (0 != ::Py_AddPendingCall(DeliverSample, NULL)) s_scheduled = 0;
+      }
+    }
+    else
+    {
+      ATOMIC_ADD(counters.freed, size);
+      ATOMIC_ADD(counters.frees, 1);
+    }
+  }
+
+  static int DeliverSample(void *)
+  {
+    int64_t pending = s_pending;
+
+    ATOMIC_ADD(s_pending, -pending);
+
+    s_scheduled = 0;
+
+    if (!s_callback.is_none())
+    {
+      try
+      {
+        s_callback(GetStats(false));
+      }
+      catch (const py::error_already_set&)
+      {
+        ::PyErr_Print();
+      }
+    }
+
+    return 0;
+  }
+
+  static int64_t Take(int64_t& counter, bool reset)
+  {
+    int64_t value = counter;
+
+    if (reset) ATOMIC_ADD(counter, -value);
+
+    return value;
+  }
+public:
+  static bool IsEnabled(void) { return s_enabled; }
+
+  static void SetEnabled(bool enabled)
+  {
+    if (enabled && !s_enabled)
+    {
+      v8::V8::AddMemoryAllocationCallback(&onMemoryAllocation, v8::kObjectSpaceAll, v8::kAllocationActionAll);
+    }
+    else if (!enabled && s_enabled)
+    {
+      v8::V8::RemoveMemoryAllocationCallback(&onMemoryAllocation);
+    }
+
+    s_enabled = enabled;
+  }
+
+  static py::dict GetStats(bool reset)
+  {
+    py::dict stats;
+
+    for (int i=0; i<kSpaces; i++)
+    {
+      py::dict space;
+
+      space["allocated"] = Take(s_counters[i].allocated, reset);
+      space["freed"] = Take(s_counters[i].freed, reset);
+      space["allocations"] = Take(s_counters[i].allocations, reset);
+      space["frees"] = Take(s_counters[i].frees, reset);
+
+      stats[s_names[i]] = space;
+    }
+
+    return stats;
+  }
+
+  static void SetCallback(py::object callback, size_t threshold)
+  {
+    s_callback = callback;
+    s_threshold = callback.is_none() ? 0 : threshold;
+    s_pending = 0;
+  }
+};
+
+MemoryAllocationTracker::Counters MemoryAllocationTracker::s_counters[MemoryAllocationTracker::kSpaces];
+const char *MemoryAllocationTracker::s_names[MemoryAllocationTracker::kSpaces] = {
+  "new", "old_pointer", "old_data", "code", "map", "cell", "property_cell", "large_object"
+};
+bool MemoryAllocationTracker::s_enabled = false;
+py::object MemoryAllocationTracker::s_callback;
+int64_t MemoryAllocationTracker::s_threshold = 0;
+int64_t MemoryAllocationTracker::s_pending = 0;
+int64_t MemoryAllocationTracker::s_scheduled = 0;
+
+GarbageCollectionTracker::lock_t GarbageCollectionTracker::s_lock;
+GarbageCollectionTracker::Record GarbageCollectionTracker::s_history[GarbageCollectionTracker::kHistorySize];
+size_t GarbageCollectionTracker::s_next = 0;
+size_t GarbageCollectionTracker::s_size = 0;
+size_t GarbageCollectionTracker::s_undelivered = 0;
+int64_t GarbageCollectionTracker::s_count = 0;
+int64_t GarbageCollectionTracker::s_scavenges = 0;
+int64_t GarbageCollectionTracker::s_markSweeps = 0;
+int64_t GarbageCollectionTracker::s_reclaimed = 0;
+double GarbageCollectionTracker::s_totalPause = 0;
+double GarbageCollectionTracker::s_maxPause = 0;
+GarbageCollectionTracker::CollectionMap GarbageCollectionTracker::s_collections;
+py::object GarbageCollectionTracker::s_callback;
+int64_t GarbageCollectionTracker::s_scheduled = 0;
+
+int64_t GarbageCollectionTracker::GetUsedHeapSize(v8::Isolate *isolate)
+{
+  v8::HeapStatistics stats;
+
+  isolate->GetHeapStatistics(&stats);
+
+  return stats.used_heap_size();
+}
+
+void GarbageCollectionTracker::onPrologue(v8::Isolate *isolate, v8::GCType type, v8::GCCallbackFlags flags)
+{
+  int64_t used = GetUsedHeapSize(isolate);
+
+  lock_guard_t lock(s_lock);
+
+  CollectionMap::iterator it = s_collections.find(isolate);
+
+  if (it == s_collections.end()) return;
+
+  it->second.usedBefore = used;
+  it->second.start = v8i::OS::TimeCurrentMillis();
+}
+
+void GarbageCollectionTracker::onEpilogue(v8::Isolate *isolate, v8::GCType type, v8::GCCallbackFlags flags)
+{
+  double now = v8i::OS::TimeCurrentMillis();
+  int64_t used = GetUsedHeapSize(isolate);
+
+  {
+    lock_guard_t lock(s_lock);
+
+    CollectionMap::iterator it = s_collections.find(isolate);
+
+    if (it == s_collections.end()) return;
+
+    Record record = { type, it->second.start, now - it->second.start, it->second.usedBefore - used };
+
+    s_history[s_next] = record;
+    s_next = (s_next + 1) % kHistorySize;
+    s_size = std::min<size_t>(s_size + 1, kHistorySize);
+    s_undelivered = std::min<size_t>(s_undelivered + 1, kHistorySize);
+
+    s_count++;
+    if (type == v8::kGCTypeScavenge) s_scavenges++; else s_markSweeps++;
+    s_reclaimed += record.reclaimed;
+    s_totalPause += record.pause;
+    s_maxPause = std::max(s_maxPause, record.pause);
+  }
+
+  if (!s_callback.is_none() && ATOMIC_CAS(s_scheduled, 0, 1))
+  {
+    if (0 != ::Py_AddPendingCall(DeliverRecords, NULL)) s_scheduled = 0;
+  }
+}
+
+py::dict GarbageCollectionTracker::ToDict(const Record& record)
+{
+  py::dict result;
+
+  result["type"] = record.type == v8::kGCTypeScavenge ? "scavenge" : "mark_sweep_compact";
+  result["start"] = record.start / 1000;
+  result["pause"] = record.pause;
+  result["reclaimed"] = record.reclaimed;
+
+  return result;
+}
+
+std::vector<GarbageCollectionTracker::Record> GarbageCollectionTracker::GetRecords(size_t count)
+{
+  std::vector<Record> records;
+
+  count = std::min(count, s_size);
+
+  for (size_t i=0; i<count; i++)
+  {
+    records.push_back(s_history[(s_next + kHistorySize - count + i) % kHistorySize]);
+  }
+
+  return records;
+}
+
+int GarbageCollectionTracker::DeliverRecords(void *)
+{
+  std::vector<Record> records;
+
+  {
+    lock_guard_t lock(s_lock);
+
+    records = GetRecords(s_undelivered);
+
+    s_undelivered = 0;
+    s_scheduled = 0;
+  }
+
+  for (size_t i=0; i<records.size() && !s_callback.is_none(); i++)
+  {
+    try
+    {
+      s_callback(ToDict(records[i]));
+    }
+    catch (const py::error_already_set&)
+    {
+      ::PyErr_Print();
+    }
+  }
+
+  return 0;
+}
+
+double GarbageCollectionTracker::Percentile(const std::vector<double>& pauses, double rank)
+{
+  if (pauses.empty()) return 0;
+
+  return pauses[std::min(pauses.size() - 1, (size_t) (rank * pauses.size()))];
+}
+
+bool GarbageCollectionTracker::IsEnabled(void)
+{
+  lock_guard_t lock(s_lock);
+
+  return s_collections.find(v8::Isolate::GetCurrent()) != s_collections.end();
+}
+
+void GarbageCollectionTracker::SetEnabled(bool enabled)
+{
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  lock_guard_t lock(s_lock);
+
+  CollectionMap::iterator it = s_collections.find(isolate);
+
+  if (enabled && it == s_collections.end())
+  {
+    Collection collection = { 0, 0 };
+
+    s_collections[isolate] = collection;
+
+    isolate->AddGCPrologueCallback(onPrologue);
+    isolate->AddGCEpilogueCallback(onEpilogue);
+  }
+  else if (!enabled && it != s_collections.end())
+  {
+    isolate->RemoveGCPrologueCallback(onPrologue);
+    isolate->RemoveGCEpilogueCallback(onEpilogue);
+
+    s_collections.erase(it);
+  }
+}
+
+void GarbageCollectionTracker::Release(v8::Isolate *isolate)
+{
+  lock_guard_t lock(s_lock);
+
+  s_collections.erase(isolate);
+}
+
+py::dict GarbageCollectionTracker::GetStats(bool reset)
+{
+  lock_guard_t lock(s_lock);
+
+  std::vector<double> pauses;
+
+  for (size_t i=0; i<s_size; i++) pauses.push_back(s_history[i].pause);
+
+  std::sort(pauses.begin(), pauses.end());
+
+  py::dict stats;
+
+  stats["count"] = s_count;
+  stats["scavenges"] = s_scavenges;
+  stats["mark_sweeps"] = s_markSweeps;
+  stats["reclaimed"] = s_reclaimed;
+  stats["total_pause"] = s_totalPause;
+  stats["max_pause"] = s_maxPause;
+  stats["p50_pause"] = Percentile(pauses, 0.50);
+  stats["p99_pause"] = Percentile(pauses, 0.99);
+
+  if (reset)
+  {
+    s_next = s_size = s_undelivered = 0;
+    s_count = s_scavenges = s_markSweeps = s_reclaimed = 0;
+    s_totalPause = s_maxPause = 0;
+  }
+
+  return stats;
+}
+
+py::list GarbageCollectionTracker::GetHistory(void)
+{
+  lock_guard_t lock(s_lock);
+
+  std::vector<Record> records = GetRecords(s_size);
+
+  py::list history;
+
+  for (size_t i=0; i<records.size(); i++) history.append(ToDict(records[i]));
+
+  return history;
+}
+
+void GarbageCollectionTracker::SetCallback(py::object callback)
+{
+  s_callback = callback;
+}
+
 void CEngine::Expose(void)
 {
 #ifndef SUPPORT_SERIALIZE
@@ -126,6 +497,9 @@ void CEngine::Expose(void)
     .add_static_property("dead", &v8::V8::IsDead,
                          "Check if V8 is dead and therefore unusable.")
 
+    .add_static_property("liveWrappers", &CJavascriptObject::GetAliveCount,
+                         "The count of the live Python wrappers of JavaScript objects in all the isolates.")
+
     .def("setFlags", &CEngine::SetFlags, "Sets V8 flags from a string.")
     .staticmethod("setFlags")
 
@@ -186,6 +560,69 @@ void CEngine::Expose(void)
                                         "and perform custom logging when V8 Allocates Executable Memory.")
     .staticmethod("setMemoryAllocationCallback")
 
+    .add_static_property("allocationTracking", &MemoryAllocationTracker::IsEnabled, &MemoryAllocationTracker::SetEnabled,
+                         "Count the allocated and freed bytes of each object space with the lock-free counters.")
+
+    .def("allocation_stats", &MemoryAllocationTracker::GetStats, (py::arg("reset") = false),
+         "Get the allocated and freed bytes and the event counts of each object space "
+         "since the tracking started or the last reset.")
+    .staticmethod("allocation_stats")
+
+    .def("setAllocationCallback", &MemoryAllocationTracker::SetCallback,
+         (py::arg("callback"),
+          py::arg("threshold") = 1024 * 1024),
+         "Call the callback with the allocation stats every time V8 allocates about threshold bytes, "
+         "the callback runs later in the main thread of the interpreter.")
+    .staticmethod("setAllocationCallback")
+
+    .add_static_property("gcTracking", &GarbageCollectionTracker::IsEnabled, &GarbageCollectionTracker::SetEnabled,
+                         "Record the type, pause and reclaimed bytes of each garbage collection of the current isolate, "
+                         "the records of all the tracked isolates are aggregated.")
+
+    .def("gc_stats", &GarbageCollectionTracker::GetStats, (py::arg("reset") = false),
+         "Get the collection counts, the reclaimed bytes and the total, max, p50 and p99 pauses in milliseconds "
+         "since the tracking started or the last reset, the percentiles cover the recent collections.")
+    .staticmethod("gc_stats")
+
+    .def("gc_history", &GarbageCollectionTracker::GetHistory,
+         "Get the records of the recent collections, the oldest first.")
+    .staticmethod("gc_history")
+
+    .def("setGCCallback", &GarbageCollectionTracker::SetCallback, (py::arg("callback")),
+         "Call the callback with the record of each garbage collection, "
+         "the callback runs later in the main thread of the interpreter.")
+    .staticmethod("setGCCallback")
+
+    .add_static_property("codeCache", &CEngine::GetCodeCache, &CEngine::SetCodeCache,
+                         "The store of precompiled data used when compiling without the precompiled argument, "
+                         "it should provide a load(source) method which returns the precompiled data or None.")
+
+    .def("enableScriptCache", &CScriptCache::Enable, (py::arg("max_count") = 256,
+                                                      py::arg("max_size") = 16 * 1024 * 1024),
+         "Cache the scripts compiled by JSContext.eval in the current isolate, "
+         "the least recently used scripts are evicted when exceed the count or size limits.")
+    .staticmethod("enableScriptCache")
+
+    .def("disableScriptCache", &CScriptCache::Disable,
+         "Disable and release the script cache of the current isolate.")
+    .staticmethod("disableScriptCache")
+
+    .def("clearScriptCache", &CScriptCache::Clear,
+         "Remove all the scripts from the script cache of the current isolate.")
+    .staticmethod("clearScriptCache")
+
+    .add_static_property("scriptCacheStats", &CScriptCache::GetStats,
+                         "Get the hits, misses and evictions of the script cache in the current isolate.")
+
+    .add_static_property("integralNumbersAsInt", &CJavascriptObject::GetIntegralNumbersAsInt, &CJavascriptObject::SetIntegralNumbersAsInt,
+                         "Convert the integral JavaScript numbers up to 2^53 to int instead of float.")
+    .add_static_property("raiseOnPrecisionLoss", &CPythonObject::GetRaiseOnPrecisionLoss, &CPythonObject::SetRaiseOnPrecisionLoss,
+                         "Raise OverflowError when a Python int can't be represented exactly as a JavaScript number.")
+
+    .add_static_property("externalStringThreshold", &GetExternalStringThreshold, &SetExternalStringThreshold,
+                         "The minimum size in bytes of the Python str or bytes passed to V8 as an external string "
+                         "which shares the Python buffer instead of copying it, 0 disables the external strings.")
+
     .def("precompile", &CEngine::PreCompile, (py::arg("source")))
     .def("precompile", &CEngine::PreCompileW, (py::arg("source")))
 
@@ -204,7 +641,8 @@ void CEngine::Expose(void)
   py::class_<CScript, boost::noncopyable>("JSScript", "JSScript is a compiled JavaScript script.", py::no_init)
     .add_property("source", &CScript::GetSource, "the source code")
 
-    .def("run", &CScript::Run, "Execute the compiled code.")
+    .def("run", &CScript::Run, (py::arg("raw") = false),
+         "Execute the compiled code, a string result is returned as JSString when raw is true.")
 
   #ifdef SUPPORT_AST
     .def("visit", &CScript::visit, (py::arg("handler"),
@@ -408,7 +846,8 @@ py::object CEngine::InternalPreCompile(v8::Handle<v8::String> src)
 boost::shared_ptr<CScript> CEngine::InternalCompile(v8::Handle<v8::String> src,
                                                     v8::Handle<v8::Value> name,
                                                     int line, int col,
-                                                    py::object precompiled)
+                                                    py::object precompiled,
+                                                    bool bound)
 {
   v8::HandleScope handle_scope(m_isolate);
 
@@ -426,7 +865,7 @@ boost::shared_ptr<CScript> CEngine::InternalCompile(v8::Handle<v8::String> src,
     {
       Py_buffer buf;
 
-      if (-1 == ::PyObject_GetBuffer(precompiled.ptr(), &buf, PyBUF_WRITABLE))
+      if (-1 == ::PyObject_GetBuffer(precompiled.ptr(), &buf, PyBUF_SIMPLE))
       {
         throw CJavascriptException("fail to get data from the precompiled buffer");
       }
@@ -447,13 +886,15 @@ boost::shared_ptr<CScript> CEngine::InternalCompile(v8::Handle<v8::String> src,
   {
     v8::ScriptOrigin script_origin(name, v8::Integer::New(m_isolate, line), v8::Integer::New(m_isolate, col));
 
-    script = v8::Script::Compile(source, &script_origin, script_data.get());
+    script = bound ? v8::Script::Compile(source, &script_origin, script_data.get()) :
+                     v8::Script::New(source, &script_origin, script_data.get());
   }
   else
   {
     v8::ScriptOrigin script_origin(name);
 
-    script = v8::Script::Compile(source, &script_origin, script_data.get());
+    script = bound ? v8::Script::Compile(source, &script_origin, script_data.get()) :
+                     v8::Script::New(source, &script_origin, script_data.get());
   }
 
   Py_END_ALLOW_THREADS
@@ -472,7 +913,7 @@ boost::shared_ptr<CScript> CEngine::InternalCompile(v8::Handle<v8::String> src,
   return boost::shared_ptr<CScript>(new CScript(m_isolate, *this, script_source, script));
 }
 
-py::object CEngine::ExecuteScript(v8::Handle<v8::Script> script)
+py::object CEngine::ExecuteScript(v8::Handle<v8::Script> script, bool raw)
 {
 #ifdef SUPPORT_PROBES
   if (ENGINE_SCRIPT_RUN_ENABLED()) {
@@ -486,12 +927,16 @@ py::object CEngine::ExecuteScript(v8::Handle<v8::Script> script)
 
   v8::Handle<v8::Value> result;
 
+  CHeapBudget::Scope budget_scope(m_isolate);
+
   Py_BEGIN_ALLOW_THREADS
 
   result = script->Run();
 
   Py_END_ALLOW_THREADS
 
+  budget_scope.Leave();
+
   if (result.IsEmpty())
   {
     if (try_catch.HasCaught())
@@ -507,6 +952,8 @@ py::object CEngine::ExecuteScript(v8::Handle<v8::Script> script)
     result = v8::Null(m_isolate);
   }
 
+  if (raw && result->IsString()) return CJavascriptString::Wrap(result.As<v8::String>());
+
   return CJavascriptObject::Wrap(result);
 }
 
@@ -556,11 +1003,217 @@ const std::string CScript::GetSource(void) const
   return std::string(*source, source.length());
 }
 
-py::object CScript::Run(void)
+py::object CScript::Run(bool raw)
 {
   v8::HandleScope handle_scope(m_isolate);
 
-  return m_engine.ExecuteScript(Script());
+  return m_engine.ExecuteScript(Script(), raw);
+}
+
+CScriptCache::CacheMap CScriptCache::s_caches;
+
+bool CScriptCache::Key::operator <(const Key& other) const
+{
+  if (digest != other.digest) return digest < other.digest;
+  if (length != other.length) return length < other.length;
+  if (wide != other.wide) return wide < other.wide;
+  if (line != other.line) return line < other.line;
+  if (col != other.col) return col < other.col;
+
+  return name < other.name;
+}
+
+uint64_t CScriptCache::Digest(const void *data, size_t size)
+{
+  // 64-bit FNV-1a
+
+  const unsigned char *p = static_cast<const unsigned char *>(data);
+
+  uint64_t hash = 14695981039346656037ULL;
+
+  for (size_t i=0; i<size; i++)
+  {
+    hash ^= p[i];
+    hash *= 1099511628211ULL;
+  }
+
+  return hash;
+}
+
+CScriptPtr CScriptCache::Lookup(const Key& key, const std::string& source)
+{
+  EntryMap::iterator it = m_entries.find(key);
+
+  // the digest only picks the entry, a colliding source is a miss and replaces it when inserted
+
+  if (it == m_entries.end() || it->second.source != source)
+  {
+    m_misses++;
+
+    return CScriptPtr();
+  }
+
+  m_hits++;
+
+  m_lru.splice(m_lru.begin(), m_lru, it->second.lru);
+
+  return it->second.script;
+}
+
+void CScriptCache::Insert(const Key& key, const std::string& source, CScriptPtr script)
+{
+  size_t size = source.size();
+
+  EntryMap::iterator it = m_entries.find(key);
+
+  if (it != m_entries.end())
+  {
+    // the same script was compiled by another thread when we released the GIL,
+    // or another source with the same digest was cached
+
+    m_size -= it->second.size;
+    m_lru.erase(it->second.lru);
+    m_entries.erase(it);
+  }
+
+  if (m_maxSize && size > m_maxSize) return;
+
+  m_lru.push_front(key);
+
+  Entry entry = { source, script, size, m_lru.begin() };
+
+  m_entries.insert(std::make_pair(key, entry));
+  m_size += size;
+
+  Evict();
+}
+
+void CScriptCache::Evict(void)
+{
+  while (!m_lru.empty() && ((m_maxCount && m_entries.size() > m_maxCount) || (m_maxSize && m_size > m_maxSize)))
+  {
+    EntryMap::iterator it = m_entries.find(m_lru.back());
+
+    m_size -= it->second.size;
+    m_entries.erase(it);
+    m_lru.pop_back();
+
+    m_evictions++;
+  }
+}
+
+CScriptPtr CScriptCache::Compile(const std::string& src, const std::string& name,
+                                 int line, int col, py::object precompiled)
+{
+  Key key = { Digest(src.c_str(), src.size()), src.size(), false, name, line, col };
+
+  CScriptPtr script = Lookup(key, src);
+
+  if (!script)
+  {
+    v8::HandleScope handle_scope(m_engine.m_isolate);
+
+    script = m_engine.InternalCompile(ToString(src), ToString(name), line, col,
+                                      CEngine::LoadPrecompiled(src, precompiled), false);
+
+    Insert(key, src, script);
+  }
+
+  return script;
+}
+
+CScriptPtr CScriptCache::CompileW(const std::wstring& src, const std::wstring& name,
+                                  int line, int col, py::object precompiled)
+{
+  Key key = { Digest(src.c_str(), src.size() * sizeof(wchar_t)), src.size(), true,
+              name.empty() ? std::string() : EncodeUtf8(name), line, col };
+
+  std::string source(reinterpret_cast<const char *>(src.c_str()), src.size() * sizeof(wchar_t));
+
+  CScriptPtr script = Lookup(key, source);
+
+  if (!script)
+  {
+    v8::HandleScope handle_scope(m_engine.m_isolate);
+
+    script = m_engine.InternalCompile(ToString(src), ToString(name), line, col,
+                                      CEngine::LoadPrecompiled(src, precompiled), false);
+
+    Insert(key, source, script);
+  }
+
+  return script;
+}
+
+CScriptCache *CScriptCache::Get(v8::Isolate *isolate)
+{
+  CacheMap::const_iterator it = s_caches.find(isolate);
+
+  return it == s_caches.end() ? NULL : it->second;
+}
+
+void CScriptCache::Release(v8::Isolate *isolate)
+{
+  CacheMap::iterator it = s_caches.find(isolate);
+
+  if (it != s_caches.end())
+  {
+    delete it->second;
+
+    s_caches.erase(it);
+  }
+}
+
+void CScriptCache::Enable(size_t max_count, size_t max_size)
+{
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  CScriptCache *cache = Get(isolate);
+
+  if (cache)
+  {
+    cache->m_maxCount = max_count;
+    cache->m_maxSize = max_size;
+
+    cache->Evict();
+  }
+  else
+  {
+    s_caches[isolate] = new CScriptCache(isolate, max_count, max_size);
+  }
+}
+
+void CScriptCache::Disable(void)
+{
+  Release(v8::Isolate::GetCurrent());
+}
+
+void CScriptCache::Clear(void)
+{
+  CScriptCache *cache = Get(v8::Isolate::GetCurrent());
+
+  if (cache)
+  {
+    cache->m_entries.clear();
+    cache->m_lru.clear();
+    cache->m_size = 0;
+  }
+}
+
+py::dict CScriptCache::GetStats(void)
+{
+  CScriptCache *cache = Get(v8::Isolate::GetCurrent());
+
+  py::dict stats;
+
+  stats["enabled"] = cache != NULL;
+  stats["hits"] = cache ? cache->m_hits : 0;
+  stats["misses"] = cache ? cache->m_misses : 0;
+  stats["evictions"] = cache ? cache->m_evictions : 0;
+  stats["count"] = cache ? cache->m_entries.size() : 0;
+  stats["size"] = cache ? cache->m_size : 0;
+
+  return stats;
 }
 
 #ifdef SUPPORT_EXTENSION
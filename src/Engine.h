@@ -3,8 +3,11 @@
 #include <string>
 #include <vector>
 #include <map>
+#include <list>
 
 #include <boost/shared_ptr.hpp>
+#include <boost/thread/mutex.hpp>
+#include <boost/thread/locks.hpp>
 
 #include "Context.h"
 #include "Utils.h"
@@ -17,12 +20,25 @@ typedef boost::shared_ptr<CScript> CScriptPtr;
 
 class CEngine
 {
+  friend class CScriptCache;
+
   v8::Isolate *m_isolate;
 
   static uint32_t *CalcStackLimitSize(uint32_t size);
 protected:
   py::object InternalPreCompile(v8::Handle<v8::String> src);
-  CScriptPtr InternalCompile(v8::Handle<v8::String> src, v8::Handle<v8::Value> name, int line, int col, py::object precompiled);
+  CScriptPtr InternalCompile(v8::Handle<v8::String> src, v8::Handle<v8::Value> name, int line, int col,
+                             py::object precompiled, bool bound = true);
+
+  static py::object s_codeCache;
+
+  template <typename T>
+  static py::object LoadPrecompiled(const T& src, py::object precompiled)
+  {
+    if (!precompiled.is_none() || s_codeCache.is_none()) return precompiled;
+
+    return s_codeCache.attr("load")(src);
+  }
 
 #ifdef SUPPORT_SERIALIZE
 
@@ -58,14 +74,14 @@ public:
   {
     v8::HandleScope scope(m_isolate);
 
-    return InternalCompile(ToString(src), ToString(name), line, col, precompiled);
+    return InternalCompile(ToString(src), ToString(name), line, col, LoadPrecompiled(src, precompiled));
   }
   CScriptPtr CompileW(const std::wstring& src, const std::wstring name = std::wstring(),
                       int line = -1, int col = -1, py::object precompiled = py::object())
   {
     v8::HandleScope scope(m_isolate);
 
-    return InternalCompile(ToString(src), ToString(name), line, col, precompiled);
+    return InternalCompile(ToString(src), ToString(name), line, col, LoadPrecompiled(src, precompiled));
   }
 
   void RaiseError(v8::TryCatch& try_catch);
@@ -76,10 +92,13 @@ public:
   static bool SetMemoryLimit(int max_young_space_size, int max_old_space_size, int max_executable_size);
   static bool SetStackLimit(uint32_t stack_limit_size);
 
-  py::object ExecuteScript(v8::Handle<v8::Script> script);
+  py::object ExecuteScript(v8::Handle<v8::Script> script, bool raw = false);
 
   static void SetFlags(const std::string& flags) { v8::V8::SetFlagsFromString(flags.c_str(), flags.size()); }
 
+  static py::object GetCodeCache(void) { return s_codeCache; }
+  static void SetCodeCache(py::object cache) { s_codeCache = cache; }
+
   static void SetSerializeEnable(bool value);
   static bool IsSerializeEnabled(void);
 
@@ -90,12 +109,12 @@ public:
 class CScript
 {
   v8::Isolate *m_isolate;
-  CEngine& m_engine;
+  CEngine m_engine;
 
   v8::Persistent<v8::String> m_source;
   v8::Persistent<v8::Script> m_script;
 public:
-  CScript(v8::Isolate *isolate, CEngine& engine, v8::Persistent<v8::String>& source, v8::Handle<v8::Script> script)
+  CScript(v8::Isolate *isolate, const CEngine& engine, v8::Persistent<v8::String>& source, v8::Handle<v8::Script> script)
     : m_isolate(isolate), m_engine(engine), m_source(m_isolate, source), m_script(m_isolate, script)
   {
 
@@ -125,7 +144,131 @@ public:
 
   const std::string GetSource(void) const;
 
-  py::object Run(void);
+  py::object Run(bool raw = false);
+};
+
+//
+// Record the collections into a ring buffer from the GC prologue/epilogue callbacks of the tracked isolates,
+// the Python callback runs as a pending call of the interpreter with the records collected since the last call.
+//
+class GarbageCollectionTracker
+{
+  enum { kHistorySize = 1024 };
+
+  struct Record
+  {
+    v8::GCType type;
+    double start, pause;
+    int64_t reclaimed;
+  };
+
+  // the collection in progress of a tracked isolate
+  struct Collection
+  {
+    double start;
+    int64_t usedBefore;
+  };
+
+  typedef std::map<v8::Isolate *, Collection> CollectionMap;
+
+  typedef boost::mutex lock_t;
+  typedef boost::lock_guard<lock_t> lock_guard_t;
+
+  static lock_t s_lock;
+
+  static Record s_history[kHistorySize];
+  static size_t s_next, s_size, s_undelivered;
+
+  static int64_t s_count, s_scavenges, s_markSweeps, s_reclaimed;
+  static double s_totalPause, s_maxPause;
+
+  static CollectionMap s_collections;
+
+  static py::object s_callback;
+  static int64_t s_scheduled;
+
+  static int64_t GetUsedHeapSize(v8::Isolate *isolate);
+
+  static void onPrologue(v8::Isolate *isolate, v8::GCType type, v8::GCCallbackFlags flags);
+  static void onEpilogue(v8::Isolate *isolate, v8::GCType type, v8::GCCallbackFlags flags);
+
+  static py::dict ToDict(const Record& record);
+  static std::vector<Record> GetRecords(size_t count);
+  static int DeliverRecords(void *);
+  static double Percentile(const std::vector<double>& pauses, double rank);
+public:
+  static bool IsEnabled(void);
+  static void SetEnabled(bool enabled);
+  static void Release(v8::Isolate *isolate);
+
+  static py::dict GetStats(bool reset);
+  static py::list GetHistory(void);
+  static void SetCallback(py::object callback);
+};
+
+//
+// Per-isolate LRU cache of the scripts compiled by JSContext.eval,
+// the cached scripts are context-independent and bound to the current context when running.
+//
+class CScriptCache
+{
+  struct Key
+  {
+    uint64_t digest;
+    size_t length;
+    bool wide;
+    std::string name;
+    int line, col;
+
+    bool operator <(const Key& other) const;
+  };
+
+  typedef std::list<Key> LruList;
+
+  struct Entry
+  {
+    std::string source;
+    CScriptPtr script;
+    size_t size;
+    LruList::iterator lru;
+  };
+
+  typedef std::map<Key, Entry> EntryMap;
+  typedef std::map<v8::Isolate *, CScriptCache *> CacheMap;
+
+  CEngine m_engine;
+
+  size_t m_maxCount, m_maxSize, m_size;
+  size_t m_hits, m_misses, m_evictions;
+
+  LruList m_lru;
+  EntryMap m_entries;
+
+  static CacheMap s_caches;
+
+  CScriptCache(v8::Isolate *isolate, size_t max_count, size_t max_size)
+    : m_engine(isolate), m_maxCount(max_count), m_maxSize(max_size), m_size(0),
+      m_hits(0), m_misses(0), m_evictions(0)
+  {
+  }
+
+  static uint64_t Digest(const void *data, size_t size);
+
+  CScriptPtr Lookup(const Key& key, const std::string& source);
+  void Insert(const Key& key, const std::string& source, CScriptPtr script);
+  void Evict(void);
+public:
+  CScriptPtr Compile(const std::string& src, const std::string& name, int line, int col, py::object precompiled);
+  CScriptPtr CompileW(const std::wstring& src, const std::wstring& name, int line, int col, py::object precompiled);
+
+  static CScriptCache *Get(v8::Isolate *isolate);
+  static void Release(v8::Isolate *isolate);
+
+  static void Enable(size_t max_count, size_t max_size);
+  static void Disable(void);
+  static void Clear(void);
+
+  static py::dict GetStats(void);
 };
 
 #ifdef SUPPORT_EXTENSION
@@ -37,10 +37,129 @@ v8::Handle<v8::String> ToString(const std::wstring& str)
 
   return scope.Escape(v8::String::NewFromTwoByte(v8::Isolate::GetCurrent(), &data[0], v8::String::kNormalString, str.size()));
 }
+static size_t s_externalStringThreshold = 0;
+
+size_t GetExternalStringThreshold(void)
+{
+  return s_externalStringThreshold;
+}
+
+void SetExternalStringThreshold(size_t threshold)
+{
+  s_externalStringThreshold = threshold;
+}
+
+static bool IsFinalizing(void)
+{
+#if PY_VERSION_HEX >= 0x030D0000
+  return Py_IsFinalizing();
+#elif PY_VERSION_HEX >= 0x03070000
+  return _Py_IsFinalizing();
+#else
+  return false;
+#endif
+}
+
+template <typename R, typename T>
+class CPythonStringResource : public R
+{
+  PyObject *m_obj;
+  const T *m_data;
+  size_t m_length;
+public:
+  CPythonStringResource(py::object obj, const T *data, size_t length)
+    : m_obj(py::incref(obj.ptr())), m_data(data), m_length(length)
+  {
+  }
+
+  virtual ~CPythonStringResource()
+  {
+    // V8 may dispose the resources in the isolate teardown after the interpreter is finalized, the object is leaked then
+
+    if (!Py_IsInitialized() || IsFinalizing()) return;
+
+    CPythonGIL python_gil;
+
+    Py_DECREF(m_obj);
+  }
+
+  virtual const T *data() const { return m_data; }
+  virtual size_t length() const { return m_length; }
+};
+
+typedef CPythonStringResource<v8::String::ExternalAsciiStringResource, char> CPythonAsciiString;
+typedef CPythonStringResource<v8::String::ExternalStringResource, uint16_t> CPythonTwoByteString;
+
+static bool IsAscii(const char *data, size_t len)
+{
+  for (size_t i=0; i<len; i++)
+  {
+    if (data[i] & 0x80) return false;
+  }
+
+  return true;
+}
+
+static v8::Local<v8::String> ToExternalString(py::object str)
+{
+  // the immutable str and bytes objects are pinned by the resource, V8 reads their buffers directly
+  if (PyBytes_CheckExact(str.ptr()))
+  {
+    const char *data = PyBytes_AS_STRING(str.ptr());
+    size_t len = PyBytes_GET_SIZE(str.ptr());
+
+    if (len >= s_externalStringThreshold && IsAscii(data, len))
+    {
+      return v8::String::NewExternal(v8::Isolate::GetCurrent(), new CPythonAsciiString(str, data, len));
+    }
+  }
+  else if (PyUnicode_CheckExact(str.ptr()))
+  {
+  #if PY_MAJOR_VERSION >= 3
+    if (PyUnicode_READY(str.ptr()) < 0)
+    {
+      ::PyErr_Clear();
+
+      return v8::Local<v8::String>();
+    }
+
+    size_t len = PyUnicode_GET_LENGTH(str.ptr());
+
+    if (PyUnicode_IS_ASCII(str.ptr()) && len >= s_externalStringThreshold)
+    {
+      return v8::String::NewExternal(v8::Isolate::GetCurrent(),
+        new CPythonAsciiString(str, reinterpret_cast<const char *>(PyUnicode_1BYTE_DATA(str.ptr())), len));
+    }
+    if (PyUnicode_KIND(str.ptr()) == PyUnicode_2BYTE_KIND && len * 2 >= s_externalStringThreshold)
+    {
+      return v8::String::NewExternal(v8::Isolate::GetCurrent(),
+        new CPythonTwoByteString(str, reinterpret_cast<const uint16_t *>(PyUnicode_2BYTE_DATA(str.ptr())), len));
+    }
+  #elif !defined(Py_UNICODE_WIDE)
+    size_t len = PyUnicode_GET_SIZE(str.ptr());
+
+    if (len * 2 >= s_externalStringThreshold)
+    {
+      return v8::String::NewExternal(v8::Isolate::GetCurrent(),
+        new CPythonTwoByteString(str, reinterpret_cast<const uint16_t *>(PyUnicode_AS_UNICODE(str.ptr())), len));
+    }
+  #endif
+  }
+
+  return v8::Local<v8::String>();
+}
+
 v8::Handle<v8::String> ToString(py::object str)
 {
   v8::EscapableHandleScope scope(v8::Isolate::GetCurrent());
 
+  if (s_externalStringThreshold)
+  {
+    v8::Local<v8::String> result = ToExternalString(str);
+
+    if (!result.IsEmpty()) return scope.Escape(result);
+  }
+
   if (PyBytes_CheckExact(str.ptr()))
   {
     return scope.Escape(v8::String::NewFromUtf8(v8::Isolate::GetCurrent(), PyBytes_AS_STRING(str.ptr()), v8::String::kNormalString, PyBytes_GET_SIZE(str.ptr())));
@@ -117,9 +117,21 @@ v8::Handle<v8::String> ToString(const std::string& str);
 v8::Handle<v8::String> ToString(const std::wstring& str);
 v8::Handle<v8::String> ToString(py::object str);
 
+size_t GetExternalStringThreshold(void);
+void SetExternalStringThreshold(size_t threshold);
+
 v8::Handle<v8::String> DecodeUtf8(const std::string& str);
 const std::string EncodeUtf8(const std::wstring& str);
 
+#ifdef _MSC_VER
+  #include <intrin.h>
+  #define ATOMIC_ADD(var, n) _InterlockedExchangeAdd64((volatile __int64 *) &(var), (n))
+  #define ATOMIC_CAS(var, oldval, newval) (_InterlockedCompareExchange64((volatile __int64 *) &(var), (newval), (oldval)) == (oldval))
+#else
+  #define ATOMIC_ADD(var, n) __sync_fetch_and_add(&(var), (n))
+  #define ATOMIC_CAS(var, oldval, newval) __sync_bool_compare_and_swap(&(var), (oldval), (newval))
+#endif
+
 struct CPythonGIL
 {
   PyGILState_STATE m_state;
@@ -22,5 +22,6 @@
 #include "src/scanner.h"
 
 #include "src/api.h"
+#include "src/date.h"
 
 namespace v8i = v8::internal;
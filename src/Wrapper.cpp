@@ -3,9 +3,14 @@
 #include <stdlib.h>
 
 #include <vector>
+#include <limits>
+#include <algorithm>
 
 #include <boost/preprocessor.hpp>
 #include <boost/python/raw_function.hpp>
+#include <boost/python/object/make_holder.hpp>
+#include <boost/python/object/value_holder.hpp>
+#include <boost/mpl/vector.hpp>
 
 #include <descrobject.h>
 #include <datetime.h>
@@ -38,6 +43,8 @@ void CWrapper::Expose(void)
 {
   PyDateTime_IMPORT;
 
+  CPythonBuffer::Initialize();
+
   py::class_<CJavascriptObject, boost::noncopyable>("JSObject", py::no_init)
     .def("__getattr__", &CJavascriptObject::GetAttr)
     .def("__setattr__", &CJavascriptObject::SetAttr)
@@ -61,6 +68,13 @@ void CWrapper::Expose(void)
 
     .def("__contains__", &CJavascriptObject::Contains)
 
+    .def("to_python", &CJavascriptObject::ToPython, (py::arg("depth") = -1,
+                                                     py::arg("max_items") = -1),
+         "Convert the object graph to the plain Python dict, list and values in one pass, "
+         "the objects nested deeper than depth are kept as JSObject.")
+    .def("to_json", &CJavascriptObject::ToJSON,
+         "Serialize the object with JSON.stringify into the UTF-8 encoded bytes.")
+
     .def(int_(py::self))
     .def(float_(py::self))
     .def(str(py::self))
@@ -99,6 +113,12 @@ void CWrapper::Expose(void)
     .def("__iter__", py::range(&CJavascriptArray::begin, &CJavascriptArray::end))
 
     .def("__contains__", &CJavascriptArray::Contains)
+
+    .def("tolist", &CJavascriptArray::ToList, "Convert the array to a list of the items, fetched in chunks.")
+
+    .def("todates", &CJavascriptArray::ToDates, (py::arg("tz") = py::object()),
+         "Convert the Date items, or the epoch milliseconds, to the naive local datetimes, "
+         "or to the aware datetimes in the tz timezone.")
     ;
 
   py::class_<CJavascriptFunction, py::bases<CJavascriptObject>, boost::noncopyable>("JSFunction", py::no_init)
@@ -119,6 +139,13 @@ void CWrapper::Expose(void)
            py::arg("kwds") = py::dict()),
           "Performs a binding method call using the parameters.")
 
+    .def("map", &CJavascriptFunction::Map, (py::arg("iterable"),
+                                            py::arg("chunk") = 256),
+         "Call the function with each item of the iterable and return the list of results.")
+    .def("starmap", &CJavascriptFunction::StarMap, (py::arg("iterable"),
+                                                    py::arg("chunk") = 256),
+         "Call the function with each argument tuple of the iterable and return the list of results.")
+
     .def("setName", &CJavascriptFunction::SetName)
 
     .add_property("name", &CJavascriptFunction::GetName, &CJavascriptFunction::SetName, "The name of function")
@@ -135,6 +162,8 @@ void CWrapper::Expose(void)
   py::objects::class_value_wrapper<boost::shared_ptr<CJavascriptObject>,
     py::objects::make_ptr_instance<CJavascriptObject,
     py::objects::pointer_holder<boost::shared_ptr<CJavascriptObject>,CJavascriptObject> > >();
+
+  CJavascriptString::Expose();
 }
 
 void CPythonObject::ThrowIf(v8::Isolate* isolate)
@@ -249,6 +278,13 @@ void CPythonObject::ThrowIf(v8::Isolate* isolate)
     return; \
   }
 
+#define _TERMINATE_CALLBACK_EXECUTION_CHECK_VOID() \
+  if(v8::V8::IsExecutionTerminating()) { \
+    ::PyErr_Clear(); \
+    ::PyErr_SetString(PyExc_RuntimeError, "execution is terminating"); \
+    return; \
+  }
+
 #define TRY_HANDLE_EXCEPTION(value) _TERMINATE_CALLBACK_EXECUTION_CHECK(value) \
                                     BEGIN_HANDLE_PYTHON_EXCEPTION \
                                     {
@@ -269,11 +305,19 @@ void CPythonObject::NamedGetter(v8::Local<v8::String> prop, const v8::PropertyCa
 
   py::object obj = CJavascriptObject::Wrap(info.Holder());
 
-  v8::String::Utf8Value name(prop);
+  py::object name = CPythonNames::Get(info.GetIsolate(), prop);
 
   if (PyGen_Check(obj.ptr())) CALLBACK_RETURN(v8::Undefined(info.GetIsolate()));
 
-  PyObject *value = ::PyObject_GetAttrString(obj.ptr(), *name);
+  // the declared methods and properties are resolved by the accessors of the class prototype
+
+  if (info.Data()->IsExternal() &&
+      static_cast<CPythonClass *>(v8::Handle<v8::External>::Cast(info.Data())->Value())->IsDeclared(obj, name))
+  {
+    CALLBACK_RETURN(v8::Handle<v8::Value>());
+  }
+
+  PyObject *value = ::PyObject_GetAttr(obj.ptr(), name.ptr());
 
   if (!value)
   {
@@ -290,9 +334,9 @@ void CPythonObject::NamedGetter(v8::Local<v8::String> prop, const v8::PropertyCa
     }
 
     if (::PyMapping_Check(obj.ptr()) &&
-        ::PyMapping_HasKeyString(obj.ptr(), *name))
+        ::PyMapping_HasKey(obj.ptr(), name.ptr()))
     {
-      py::object result(py::handle<>(::PyMapping_GetItemString(obj.ptr(), *name)));
+      py::object result(py::handle<>(::PyObject_GetItem(obj.ptr(), name.ptr())));
 
       if (!result.is_none()) CALLBACK_RETURN(Wrap(result));
     }
@@ -329,34 +373,33 @@ void CPythonObject::NamedSetter(v8::Local<v8::String> prop, v8::Local<v8::Value>
 
   py::object obj = CJavascriptObject::Wrap(info.Holder());
 
-  v8::String::Utf8Value name(prop);
+  py::object name = CPythonNames::Get(info.GetIsolate(), prop);
   py::object newval = CJavascriptObject::Wrap(value);
 
-  bool found = 1 == ::PyObject_HasAttrString(obj.ptr(), *name);
+  bool found = 1 == ::PyObject_HasAttr(obj.ptr(), name.ptr());
 
   if (::PyObject_HasAttrString(obj.ptr(), "__watchpoints__"))
   {
     py::dict watchpoints(obj.attr("__watchpoints__"));
-    py::str propname(*name, name.length());
 
-    if (watchpoints.has_key(propname))
+    if (watchpoints.has_key(name))
     {
-      py::object watchhandler = watchpoints.get(propname);
+      py::object watchhandler = watchpoints.get(name);
 
-      newval = watchhandler(propname, found ? obj.attr(propname) : py::object(), newval);
+      newval = watchhandler(name, found ? obj.attr(name) : py::object(), newval);
     }
   }
 
   if (!found && ::PyMapping_Check(obj.ptr()))
   {
-    ::PyMapping_SetItemString(obj.ptr(), *name, newval.ptr());
+    ::PyObject_SetItem(obj.ptr(), name.ptr(), newval.ptr());
   }
   else
   {
   #ifdef SUPPORT_PROPERTY
     if (found)
     {
-      py::object attr = obj.attr(*name);
+      py::object attr = obj.attr(name);
 
       if (PyObject_TypeCheck(attr.ptr(), &::PyProperty_Type))
       {
@@ -371,7 +414,7 @@ void CPythonObject::NamedSetter(v8::Local<v8::String> prop, v8::Local<v8::Value>
       }
     }
   #endif
-    obj.attr(*name) = newval;
+    obj.attr(name) = newval;
   }
 
   CALLBACK_RETURN(value);
@@ -389,10 +432,16 @@ void CPythonObject::NamedQuery(v8::Local<v8::String> prop, const v8::PropertyCal
 
   py::object obj = CJavascriptObject::Wrap(info.Holder());
 
-  v8::String::Utf8Value name(prop);
+  py::object name = CPythonNames::Get(info.GetIsolate(), prop);
+
+  if (info.Data()->IsExternal() &&
+      static_cast<CPythonClass *>(v8::Handle<v8::External>::Cast(info.Data())->Value())->IsDeclared(obj, name))
+  {
+    return;
+  }
 
-  bool exists = PyGen_Check(obj.ptr()) || ::PyObject_HasAttrString(obj.ptr(), *name) ||
-                (::PyMapping_Check(obj.ptr()) && ::PyMapping_HasKeyString(obj.ptr(), *name));
+  bool exists = PyGen_Check(obj.ptr()) || ::PyObject_HasAttr(obj.ptr(), name.ptr()) ||
+                (::PyMapping_Check(obj.ptr()) && ::PyMapping_HasKey(obj.ptr(), name.ptr()));
 
   if (exists) CALLBACK_RETURN(v8::Integer::New(info.GetIsolate(), v8::None));
 
@@ -409,20 +458,20 @@ void CPythonObject::NamedDeleter(v8::Local<v8::String> prop, const v8::PropertyC
 
   py::object obj = CJavascriptObject::Wrap(info.Holder());
 
-  v8::String::Utf8Value name(prop);
+  py::object name = CPythonNames::Get(info.GetIsolate(), prop);
 
-  if (!::PyObject_HasAttrString(obj.ptr(), *name) &&
+  if (!::PyObject_HasAttr(obj.ptr(), name.ptr()) &&
       ::PyMapping_Check(obj.ptr()) &&
-      ::PyMapping_HasKeyString(obj.ptr(), *name))
+      ::PyMapping_HasKey(obj.ptr(), name.ptr()))
   {
-    CALLBACK_RETURN(-1 != ::PyMapping_DelItemString(obj.ptr(), *name));
+    CALLBACK_RETURN(-1 != ::PyObject_DelItem(obj.ptr(), name.ptr()));
   }
   else
   {
   #ifdef SUPPORT_PROPERTY
-    py::object attr = obj.attr(*name);
+    py::object attr = obj.attr(name);
 
-    if (::PyObject_HasAttrString(obj.ptr(), *name) &&
+    if (::PyObject_HasAttr(obj.ptr(), name.ptr()) &&
         PyObject_TypeCheck(attr.ptr(), &::PyProperty_Type))
     {
       py::object deleter = attr.attr("fdel");
@@ -434,10 +483,10 @@ void CPythonObject::NamedDeleter(v8::Local<v8::String> prop, const v8::PropertyC
     }
     else
     {
-      CALLBACK_RETURN(-1 != ::PyObject_DelAttrString(obj.ptr(), *name));
+      CALLBACK_RETURN(-1 != ::PyObject_DelAttr(obj.ptr(), name.ptr()));
     }
   #else
-    CALLBACK_RETURN(-1 != ::PyObject_DelAttrString(obj.ptr(), *name));
+    CALLBACK_RETURN(-1 != ::PyObject_DelAttr(obj.ptr(), name.ptr()));
   #endif
   }
 
@@ -501,7 +550,10 @@ void CPythonObject::NamedEnumerator(const v8::PropertyCallbackInfo<v8::Array>& i
           continue;
       }
 
-      result->Set(v8::Uint32::New(info.GetIsolate(), i), Wrap(py::object(py::handle<>(py::borrowed(item)))));
+      py::object key(py::handle<>(py::borrowed(item)));
+
+      result->Set(v8::Uint32::New(info.GetIsolate(), i),
+                  filter_name ? CPythonNames::Get(info.GetIsolate(), key) : Wrap(key));
     }
 
     CALLBACK_RETURN(result);
@@ -728,260 +780,1337 @@ void CPythonObject::Caller(const v8::FunctionCallbackInfo<v8::Value>& info)
   END_HANDLE_EXCEPTION(v8::Undefined(info.GetIsolate()))
 }
 
-void CPythonObject::SetupObjectTemplate(v8::Isolate *isolate, v8::Handle<v8::ObjectTemplate> clazz)
+std::string CPythonFunction::ParseSignature(py::object signature)
 {
-  v8::HandleScope handle_scope(isolate);
+  std::string kinds;
 
-  clazz->SetInternalFieldCount(1);
-  clazz->SetNamedPropertyHandler(NamedGetter, NamedSetter, NamedQuery, NamedDeleter, NamedEnumerator);
-  clazz->SetIndexedPropertyHandler(IndexedGetter, IndexedSetter, IndexedQuery, IndexedDeleter, IndexedEnumerator);
-  clazz->SetCallAsFunctionHandler(Caller);
+  if (signature.is_none()) return kinds;
+
+  for (Py_ssize_t i=0; i<PySequence_Size(signature.ptr()); i++)
+  {
+    py::object type = signature[i];
+
+    if (type.ptr() == (PyObject *) &PyBool_Type)
+      kinds.push_back('b');
+    else if (type.ptr() == (PyObject *) &PyLong_Type
+  #if PY_MAJOR_VERSION < 3
+             || type.ptr() == (PyObject *) &PyInt_Type
+  #endif
+             )
+      kinds.push_back('i');
+    else if (type.ptr() == (PyObject *) &PyFloat_Type)
+      kinds.push_back('f');
+    else if (type.ptr() == (PyObject *) &PyUnicode_Type || type.ptr() == (PyObject *) &PyBytes_Type)
+      kinds.push_back('s');
+    else if (type.is_none() || type.ptr() == (PyObject *) &PyBaseObject_Type)
+      kinds.push_back('o');
+    else
+      throw CJavascriptException("signature only supports int, float, str, bool and object", ::PyExc_TypeError);
+  }
+
+  return kinds;
 }
 
-v8::Handle<v8::ObjectTemplate> CPythonObject::CreateObjectTemplate(v8::Isolate *isolate)
+v8::Handle<v8::Function> CPythonFunction::Create(py::object func, py::object signature, py::object name)
 {
-  v8::EscapableHandleScope handle_scope(isolate);
+  if (!PyCallable_Check(func.ptr()))
+    throw CJavascriptException("exposed object should be callable", ::PyExc_TypeError);
 
-  v8::Local<v8::ObjectTemplate> clazz = v8::ObjectTemplate::New();
+  v8::EscapableHandleScope handle_scope(v8::Isolate::GetCurrent());
 
-  SetupObjectTemplate(isolate, clazz);
+  std::auto_ptr<CPythonFunction> fn(new CPythonFunction(func, ParseSignature(signature)));
 
-  return handle_scope.Escape(clazz);
+  v8::Handle<v8::FunctionTemplate> func_tmpl = v8::FunctionTemplate::New(v8::Isolate::GetCurrent(),
+    Caller, v8::External::New(v8::Isolate::GetCurrent(), fn.get()));
+
+  v8::Local<v8::Function> result = func_tmpl->GetFunction();
+
+  if (result.IsEmpty()) throw CJavascriptException("fail to create the function", ::PyExc_RuntimeError);
+
+  if (!name.is_none())
+  {
+    result->SetName(ToString(name));
+  }
+  else if (PyObject_HasAttrString(func.ptr(), "__name__"))
+  {
+    result->SetName(ToString(func.attr("__name__")));
+  }
+
+  fn->m_handle.Reset(v8::Isolate::GetCurrent(), result);
+  fn->m_handle.SetWeak(fn.get(), WeakCallback);
+  fn.release();
+
+  return handle_scope.Escape(result);
 }
 
-bool CPythonObject::IsWrapped(v8::Handle<v8::Object> obj)
+void CPythonFunction::WeakCallback(const v8::WeakCallbackData<v8::Function, CPythonFunction>& data)
 {
-  return obj->InternalFieldCount() == 1;
+  CPythonGIL python_gil;
+
+  std::auto_ptr<CPythonFunction> fn(data.GetParameter());
+
+  fn->m_handle.Reset();
 }
 
-py::object CPythonObject::Unwrap(v8::Handle<v8::Object> obj)
+class CArrayBufferAllocator : public v8::ArrayBuffer::Allocator
 {
-  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+public:
+  virtual void *Allocate(size_t length) { return ::calloc(length, 1); }
+  virtual void *AllocateUninitialized(size_t length) { return ::malloc(length); }
+  virtual void Free(void *data, size_t length) { ::free(data); }
+};
 
-  v8::Handle<v8::External> payload = v8::Handle<v8::External>::Cast(obj->GetInternalField(0));
+void CPythonBuffer::Initialize(void)
+{
+  static CArrayBufferAllocator s_allocator;
 
-  return *static_cast<py::object *>(payload->Value());
+  v8::V8::SetArrayBufferAllocator(&s_allocator);
 }
 
-void CPythonObject::Dispose(v8::Handle<v8::Value> value)
+CPythonBuffer::~CPythonBuffer()
 {
-  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+  if (m_acquired)
+  {
+    CPythonGIL python_gil;
 
-  if (value->IsObject())
+    ::PyBuffer_Release(&m_view);
+  }
+
+  m_handle.Reset();
+}
+
+void CPythonBuffer::WeakCallback(const v8::WeakCallbackData<v8::ArrayBuffer, CPythonBuffer>& data)
+{
+  std::auto_ptr<CPythonBuffer> buffer(data.GetParameter());
+}
+
+v8::Handle<v8::String> CPythonBuffer::GetHiddenKey(v8::Isolate *isolate)
+{
+  return v8::String::NewFromUtf8(isolate, "__pybuffer__", v8::String::kInternalizedString);
+}
+
+bool CPythonBuffer::IsBuffer(py::object obj)
+{
+  // bytes and str keep mapping to the JavaScript strings
+  return ::PyObject_CheckBuffer(obj.ptr()) && !PyBytes_Check(obj.ptr()) && !PyUnicode_Check(obj.ptr());
+}
+
+bool CPythonBuffer::IsResizable(PyObject *obj)
+{
+  if (PyByteArray_Check(obj)) return true;
+
+  static PyObject *s_array = NULL;
+
+  if (!s_array)
   {
-    v8::Handle<v8::Object> obj = value->ToObject();
+    PyObject *module = ::PyImport_ImportModule("array");
 
-    if (IsWrapped(obj))
+    if (module)
     {
-      Py_DECREF(CPythonObject::Unwrap(obj).ptr());
+      s_array = ::PyObject_GetAttrString(module, "array");
+
+      Py_DECREF(module);
+    }
+
+    if (!s_array)
+    {
+      ::PyErr_Clear();
+
+      return false;
     }
   }
+
+  int result = ::PyObject_IsInstance(obj, s_array);
+
+  if (result < 0) ::PyErr_Clear();
+
+  return result == 1;
 }
 
-v8::Handle<v8::Value> CPythonObject::Wrap(py::object obj)
+char CPythonBuffer::GetKind(const Py_buffer& view)
 {
-  v8::EscapableHandleScope handle_scope(v8::Isolate::GetCurrent());
-
-  v8::Local<v8::Value> value;
+  const char *format = view.format ? view.format : "B";
 
-#ifdef SUPPORT_TRACE_LIFECYCLE
-  value = ObjectTracer::FindCache(obj);
+  if (*format == '@' || *format == '=' || *format == '<') format++;
 
-  if (value.IsEmpty())
-#endif
+  if (format[0] == 0 || format[1] != 0) return 0;
 
-  value = WrapInternal(obj);
+  switch (format[0])
+  {
+  case 'b':
+  case 'h':
+  case 'H':
+  case 'f':
+  case 'd':
+    return format[0];
+  case 'B':
+  case 'c':
+    return 'B';
+  case 'i':
+  case 'l':
+    return view.itemsize == 4 ? 'i' : 0;
+  case 'I':
+  case 'L':
+    return view.itemsize == 4 ? 'I' : 0;
+  }
 
-  return handle_scope.Escape(value);
+  return 0;
 }
 
-v8::Handle<v8::Value> CPythonObject::WrapInternal(py::object obj)
+char CPythonBuffer::GetKind(v8::Handle<v8::Object> obj)
 {
-  assert(v8::Isolate::GetCurrent()->InContext());
+  if (obj->IsInt8Array()) return 'b';
+  if (obj->IsInt16Array()) return 'h';
+  if (obj->IsUint16Array()) return 'H';
+  if (obj->IsInt32Array()) return 'i';
+  if (obj->IsUint32Array()) return 'I';
+  if (obj->IsFloat32Array()) return 'f';
+  if (obj->IsFloat64Array()) return 'd';
 
-  v8::EscapableHandleScope handle_scope(v8::Isolate::GetCurrent());
+  return 'B';
+}
 
-  v8::TryCatch try_catch;
+v8::Local<v8::Value> CPythonBuffer::NewTypedArray(char kind, v8::Handle<v8::ArrayBuffer> buffer, size_t length)
+{
+  switch (kind)
+  {
+  case 'b': return v8::Int8Array::New(buffer, 0, length);
+  case 'h': return v8::Int16Array::New(buffer, 0, length);
+  case 'H': return v8::Uint16Array::New(buffer, 0, length);
+  case 'i': return v8::Int32Array::New(buffer, 0, length);
+  case 'I': return v8::Uint32Array::New(buffer, 0, length);
+  case 'f': return v8::Float32Array::New(buffer, 0, length);
+  case 'd': return v8::Float64Array::New(buffer, 0, length);
+  }
 
-  CPythonGIL python_gil;
+  return v8::Uint8Array::New(buffer, 0, length);
+}
 
-  TERMINATE_EXECUTION_CHECK(v8::Undefined(v8::Isolate::GetCurrent()))
+v8::Local<v8::Value> CPythonBuffer::Wrap(py::object obj)
+{
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
 
-  if (obj.is_none()) return v8::Null(v8::Isolate::GetCurrent());
-  if (obj.ptr() == Py_True) return v8::True(v8::Isolate::GetCurrent());
-  if (obj.ptr() == Py_False) return v8::False(v8::Isolate::GetCurrent());
+  v8::EscapableHandleScope handle_scope(isolate);
 
-  py::extract<CJavascriptObject&> extractor(obj);
+  std::auto_ptr<CPythonBuffer> buffer(new CPythonBuffer());
 
-  if (extractor.check())
-  {
-    CJavascriptObject& jsobj = extractor();
+  // share the memory of a writable buffer with a fixed size, otherwise copy it into a store owned by V8,
+  // the buffer stays exported until the typed array is collected, which would block resizing the owner
+  bool shared = !IsResizable(obj.ptr()) &&
+    0 == ::PyObject_GetBuffer(obj.ptr(), &buffer->m_view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | PyBUF_WRITABLE);
 
-    if (dynamic_cast<CJavascriptNull *>(&jsobj)) return v8::Null(v8::Isolate::GetCurrent());
-    if (dynamic_cast<CJavascriptUndefined *>(&jsobj)) return v8::Undefined(v8::Isolate::GetCurrent());
+  if (!shared)
+  {
+    ::PyErr_Clear();
 
-    if (jsobj.Object().IsEmpty())
+    if (0 != ::PyObject_GetBuffer(obj.ptr(), &buffer->m_view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT))
     {
-      ILazyObject *pLazyObject = dynamic_cast<ILazyObject *>(&jsobj);
+      ::PyErr_Clear();
 
-      if (pLazyObject) pLazyObject->LazyConstructor();
+      return v8::Local<v8::Value>();
     }
+  }
 
-    if (jsobj.Object().IsEmpty())
-    {
-      throw CJavascriptException("Refer to a null object", ::PyExc_AttributeError);
-    }
+  buffer->m_acquired = true;
 
-  #ifdef SUPPORT_TRACE_LIFECYCLE
-    py::object *object = new py::object(obj);
+  const Py_buffer& view = buffer->m_view;
 
-    ObjectTracer::Trace(jsobj.Object(), object);
-  #endif
+  char kind = GetKind(view);
 
-    return handle_scope.Escape(jsobj.Object());
-  }
+  if (!kind) return v8::Local<v8::Value>();
 
-  v8::Local<v8::Value> result;
+  v8::Local<v8::ArrayBuffer> array_buffer;
 
-#if PY_MAJOR_VERSION < 3
-  if (PyInt_CheckExact(obj.ptr()))
+  if (shared)
   {
-    result = v8::Integer::New(v8::Isolate::GetCurrent(), ::PyInt_AsLong(obj.ptr()));
+    array_buffer = v8::ArrayBuffer::New(isolate, view.buf, view.len);
+    array_buffer->SetHiddenValue(GetHiddenKey(isolate), v8::External::New(isolate, buffer.get()));
+
+    buffer->m_handle.Reset(isolate, array_buffer);
+    buffer->m_handle.SetWeak(buffer.get(), WeakCallback);
   }
   else
-#endif
-  if (PyLong_CheckExact(obj.ptr()))
-  {
-    result = v8::Integer::New(v8::Isolate::GetCurrent(), ::PyLong_AsLong(obj.ptr()));
-  }
-  else if (PyBool_Check(obj.ptr()))
   {
-    result = v8::Boolean::New(v8::Isolate::GetCurrent(), py::extract<bool>(obj));
+    array_buffer = v8::ArrayBuffer::New(isolate, view.len);
+
+    if (view.len) memcpy(v8::Utils::OpenHandle(*array_buffer)->backing_store(), view.buf, view.len);
   }
-  else if (PyBytes_CheckExact(obj.ptr()) ||
-           PyUnicode_CheckExact(obj.ptr()))
+
+  v8::Local<v8::Value> result = NewTypedArray(kind, array_buffer, view.len / view.itemsize);
+
+  if (shared) buffer.release();
+
+  return handle_scope.Escape(result);
+}
+
+py::object CPythonBuffer::Unwrap(v8::Handle<v8::Object> obj)
+{
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  v8::HandleScope handle_scope(isolate);
+
+  v8::Handle<v8::ArrayBuffer> buffer;
+  size_t offset = 0, length = 0;
+
+  if (obj->IsArrayBuffer())
   {
-    result = ToString(obj);
+    buffer = obj.As<v8::ArrayBuffer>();
+    length = buffer->ByteLength();
   }
-  else if (PyFloat_CheckExact(obj.ptr()))
+  else
   {
-    result = v8::Number::New(v8::Isolate::GetCurrent(), py::extract<double>(obj));
+    v8::Handle<v8::ArrayBufferView> view = obj.As<v8::ArrayBufferView>();
+
+    buffer = view->Buffer();
+    offset = view->ByteOffset();
+    length = view->ByteLength();
   }
-  else if (PyDateTime_CheckExact(obj.ptr()) || PyDate_CheckExact(obj.ptr()))
-  {
-    tm ts = { 0 };
 
-    ts.tm_year = PyDateTime_GET_YEAR(obj.ptr()) - 1900;
-    ts.tm_mon = PyDateTime_GET_MONTH(obj.ptr()) - 1;
-    ts.tm_mday = PyDateTime_GET_DAY(obj.ptr());
-    ts.tm_hour = PyDateTime_DATE_GET_HOUR(obj.ptr());
-    ts.tm_min = PyDateTime_DATE_GET_MINUTE(obj.ptr());
-    ts.tm_sec = PyDateTime_DATE_GET_SECOND(obj.ptr());
-    ts.tm_isdst = -1;
+  char kind = GetKind(obj);
 
-    int ms = PyDateTime_DATE_GET_MICROSECOND(obj.ptr());
+  v8::Handle<v8::Value> hidden = buffer->GetHiddenValue(GetHiddenKey(isolate));
 
-    result = v8::Date::New(v8::Isolate::GetCurrent(), ((double) mktime(&ts)) * 1000 + ms / 1000);
-  }
-  else if (PyTime_CheckExact(obj.ptr()))
+  CPythonGIL python_gil;
+
+  py::object result;
+
+  if (!hidden.IsEmpty() && hidden->IsExternal())
   {
-    tm ts = { 0 };
+    // the memory belongs to a Python object, view it again instead of copying
+    CPythonBuffer *shared = static_cast<CPythonBuffer *>(hidden.As<v8::External>()->Value());
+
+    result = py::object(py::handle<>(::PyMemoryView_FromObject(shared->m_view.obj)));
 
-    ts.tm_hour = PyDateTime_TIME_GET_HOUR(obj.ptr()) - 1;
-    ts.tm_min = PyDateTime_TIME_GET_MINUTE(obj.ptr());
-    ts.tm_sec = PyDateTime_TIME_GET_SECOND(obj.ptr());
+  #if PY_MAJOR_VERSION < 3
+    size_t itemsize = shared->m_view.itemsize;
+  #else
+    size_t itemsize = 1;
 
-    int ms = PyDateTime_TIME_GET_MICROSECOND(obj.ptr());
+    result = result.attr("cast")("B");
+  #endif
 
-    result = v8::Date::New(v8::Isolate::GetCurrent(), ((double) mktime(&ts)) * 1000 + ms / 1000);
+    if (offset != 0 || length != (size_t) shared->m_view.len)
+    {
+      result = result.slice(offset / itemsize, (offset + length) / itemsize);
+    }
   }
-  else if (PyCFunction_Check(obj.ptr()) || PyFunction_Check(obj.ptr()) ||
-           PyMethod_Check(obj.ptr()) || PyType_Check(obj.ptr()))
+  else
   {
-    v8::Handle<v8::FunctionTemplate> func_tmpl = v8::FunctionTemplate::New(v8::Isolate::GetCurrent());
-    py::object *object = new py::object(obj);
+    py::object data(py::handle<>(::PyByteArray_FromStringAndSize(NULL, length)));
 
-    func_tmpl->SetCallHandler(Caller, v8::External::New(v8::Isolate::GetCurrent(), object));
+    if (length) memcpy(PyByteArray_AS_STRING(data.ptr()), (char *) v8::Utils::OpenHandle(*buffer)->backing_store() + offset, length);
 
-    if (PyType_Check(obj.ptr()))
-    {
-      v8::Handle<v8::String> cls_name = v8::String::NewFromUtf8(v8::Isolate::GetCurrent(), py::extract<const char *>(obj.attr("__name__"))());
+    result = py::object(py::handle<>(::PyMemoryView_FromObject(data.ptr())));
+  }
 
-      func_tmpl->SetClassName(cls_name);
-    }
+#if PY_MAJOR_VERSION >= 3
+  if (kind != 'B') result = result.attr("cast")(std::string(1, kind));
+#endif
 
-    result = func_tmpl->GetFunction();
+  return result;
+}
 
-  #ifdef SUPPORT_TRACE_LIFECYCLE
-    if (!result.IsEmpty()) ObjectTracer::Trace(result, object);
-  #endif
-  }
-  else
+PyObject *CPythonFunction::Convert(char kind, int index, v8::Handle<v8::Value> value)
+{
+  switch (kind)
   {
-    static v8::Persistent<v8::ObjectTemplate> s_template(v8::Isolate::GetCurrent(), CreateObjectTemplate(v8::Isolate::GetCurrent()));
+  case 'i':
+  {
+    if (value->IsInt32()) return ::PyLong_FromLong(value->Int32Value());
 
-    v8::Handle<v8::Object> instance = v8::Local<v8::ObjectTemplate>::New(v8::Isolate::GetCurrent(), s_template)->NewInstance();
+    double number = value->IsNumber() ? value->NumberValue() : 0;
 
-    if (!instance.IsEmpty())
-    {
-      py::object *object = new py::object(obj);
+    // reject the non-numeric, fractional and infinite values instead of truncating them
 
-      instance->SetInternalField(0, v8::External::New(v8::Isolate::GetCurrent(), object));
+    if (!value->IsNumber() || number != floor(number) || number - number != 0)
+    {
+      ::PyErr_Format(::PyExc_TypeError, "argument %d should be an integer", index);
 
-    #ifdef SUPPORT_TRACE_LIFECYCLE
-      ObjectTracer::Trace(instance, object);
-    #endif
+      return NULL;
     }
 
-    result = instance;
+    return ::PyLong_FromDouble(number);
   }
+  case 'f':
+    if (!value->IsNumber())
+    {
+      ::PyErr_Format(::PyExc_TypeError, "argument %d should be a number", index);
 
-  if (result.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
-
-  return handle_scope.Escape(result);
-}
+      return NULL;
+    }
 
-void CJavascriptObject::CheckAttr(v8::Handle<v8::String> name) const
-{
-  assert(v8::Isolate::GetCurrent()->InContext());
+    return ::PyFloat_FromDouble(value->NumberValue());
+  case 'b':
+    if (!value->IsBoolean())
+    {
+      ::PyErr_Format(::PyExc_TypeError, "argument %d should be a boolean", index);
 
-  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+      return NULL;
+    }
 
-  if (!Object()->Has(name))
+    return ::PyBool_FromLong(value->BooleanValue());
+  case 's':
   {
-    std::ostringstream msg;
+    if (!value->IsString())
+    {
+      ::PyErr_Format(::PyExc_TypeError, "argument %d should be a string", index);
 
-    msg << "'" << *v8::String::Utf8Value(Object()->ObjectProtoToString())
-        << "' object has no attribute '" << *v8::String::Utf8Value(name) << "'";
+      return NULL;
+    }
 
-    throw CJavascriptException(msg.str(), ::PyExc_AttributeError);
+    v8::String::Utf8Value str(value);
+
+    return py::incref(py::str(*str, str.length()).ptr());
+  }
+  default:
+    return py::incref(CJavascriptObject::Wrap(value).ptr());
   }
 }
 
-py::object CJavascriptObject::GetAttr(const std::string& name)
+void CPythonFunction::Caller(const v8::FunctionCallbackInfo<v8::Value>& info)
 {
-#ifdef SUPPORT_PROBES
-  if (WRAPPER_JS_OBJECT_GETATTR_ENABLED()) {
-    WRAPPER_JS_OBJECT_GETATTR(&m_obj, name.c_str());
-  }
-#endif
+  v8::HandleScope handle_scope(info.GetIsolate());
 
-  CHECK_V8_CONTEXT();
+  TRY_HANDLE_EXCEPTION(v8::Undefined(info.GetIsolate()));
 
-  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+  CPythonFunction *fn = static_cast<CPythonFunction *>(v8::Handle<v8::External>::Cast(info.Data())->Value());
 
-  v8::TryCatch try_catch;
+  CPythonGIL python_gil;
 
-  v8::Handle<v8::String> attr_name = DecodeUtf8(name);
+  const int argc = info.Length();
+  const size_t typed = fn->m_signature.size();
 
-  CheckAttr(attr_name);
+  std::vector<py::object> args;
 
-  v8::Handle<v8::Value> attr_value = Object()->Get(attr_name);
+  args.reserve(argc);
 
-  if (attr_value.IsEmpty())
-    CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+  for (int i=0; i<argc; i++)
+  {
+    PyObject *arg = Convert((size_t) i < typed ? fn->m_signature[i] : 'o', i, info[i]);
 
-  return CJavascriptObject::Wrap(attr_value, Object());
+    if (!arg) py::throw_error_already_set();
+
+    args.push_back(py::object(py::handle<>(arg)));
+  }
+
+#if PY_VERSION_HEX >= 0x03090000
+  std::vector<PyObject *> argv(argc + 1);
+
+  for (int i=0; i<argc; i++) argv[i + 1] = args[i].ptr();
+
+  PyObject *result = ::PyObject_Vectorcall(fn->m_func.ptr(), &argv[1],
+    argc | PY_VECTORCALL_ARGUMENTS_OFFSET, NULL);
+#else
+  py::object argv(py::handle<>(::PyTuple_New(argc)));
+
+  for (int i=0; i<argc; i++) PyTuple_SET_ITEM(argv.ptr(), i, py::incref(args[i].ptr()));
+
+  PyObject *result = ::PyObject_Call(fn->m_func.ptr(), argv.ptr(), NULL);
+#endif
+
+  if (!result) py::throw_error_already_set();
+
+  CALLBACK_RETURN(CPythonObject::Wrap(py::object(py::handle<>(result))));
+
+  END_HANDLE_EXCEPTION(v8::Undefined(info.GetIsolate()))
+}
+
+void CPythonObject::SetupObjectTemplate(v8::Isolate *isolate, v8::Handle<v8::ObjectTemplate> clazz)
+{
+  v8::HandleScope handle_scope(isolate);
+
+  clazz->SetInternalFieldCount(1);
+  clazz->SetNamedPropertyHandler(NamedGetter, NamedSetter, NamedQuery, NamedDeleter, NamedEnumerator);
+  clazz->SetIndexedPropertyHandler(IndexedGetter, IndexedSetter, IndexedQuery, IndexedDeleter, IndexedEnumerator);
+  clazz->SetCallAsFunctionHandler(Caller);
+}
+
+v8::Handle<v8::ObjectTemplate> CPythonObject::CreateObjectTemplate(v8::Isolate *isolate)
+{
+  v8::EscapableHandleScope handle_scope(isolate);
+
+  v8::Local<v8::ObjectTemplate> clazz = v8::ObjectTemplate::New();
+
+  SetupObjectTemplate(isolate, clazz);
+
+  return handle_scope.Escape(clazz);
+}
+
+CPythonNames::NamesMap CPythonNames::s_names;
+size_t CPythonNames::s_capacity = 4096;
+
+CPythonNames::~CPythonNames()
+{
+  for (EntryList::iterator it = m_entries.begin(); it != m_entries.end(); it++)
+  {
+    delete *it;
+  }
+}
+
+CPythonNames *CPythonNames::GetNames(v8::Isolate *isolate)
+{
+  NamesMap::const_iterator it = s_names.find(isolate);
+
+  if (it != s_names.end()) return it->second;
+
+  return s_names[isolate] = new CPythonNames(isolate);
+}
+
+void CPythonNames::Release(v8::Isolate *isolate)
+{
+  NamesMap::iterator it = s_names.find(isolate);
+
+  if (it != s_names.end())
+  {
+    delete it->second;
+
+    s_names.erase(it);
+  }
+}
+
+void CPythonNames::Remove(EntryList::iterator it)
+{
+  Entry *entry = *it;
+
+  HashMap::iterator hash = m_hashes.find(entry->hash);
+
+  if (hash != m_hashes.end() && hash->second == it) m_hashes.erase(hash);
+
+  StrMap::iterator str = m_strs.find(entry->str.ptr());
+
+  if (str != m_strs.end() && str->second == it) m_strs.erase(str);
+
+  m_entries.erase(it);
+
+  delete entry;
+}
+
+CPythonNames::EntryList::iterator CPythonNames::Insert(uint32_t hash, v8::Handle<v8::String> name, py::object str)
+{
+  HashMap::iterator collided = m_hashes.find(hash);
+
+  if (collided != m_hashes.end()) Remove(collided->second);
+
+  StrMap::iterator existed = m_strs.find(str.ptr());
+
+  if (existed != m_strs.end()) Remove(existed->second);
+
+  while (m_entries.size() >= s_capacity) Remove(--m_entries.end());
+
+  Entry *entry = new Entry();
+
+  entry->hash = hash;
+  entry->name.Reset(m_isolate, name);
+  entry->str = str;
+
+  m_entries.push_front(entry);
+
+  return m_hashes[hash] = m_strs[str.ptr()] = m_entries.begin();
+}
+
+py::object CPythonNames::Get(v8::Isolate *isolate, v8::Handle<v8::String> name)
+{
+  CPythonNames *names = GetNames(isolate);
+
+  uint32_t hash = v8::Utils::OpenHandle(*name)->Hash();
+
+  HashMap::iterator it = names->m_hashes.find(hash);
+
+  if (it != names->m_hashes.end() &&
+      v8::Local<v8::String>::New(isolate, (*it->second)->name)->StrictEquals(name))
+  {
+    names->m_entries.splice(names->m_entries.begin(), names->m_entries, it->second);
+
+    return (*it->second)->str;
+  }
+
+  v8::String::Utf8Value utf8(name);
+
+  PyObject *str = py::incref(py::str(*utf8, utf8.length()).ptr());
+
+#if PY_MAJOR_VERSION < 3
+  ::PyString_InternInPlace(&str);
+#else
+  ::PyUnicode_InternInPlace(&str);
+#endif
+
+  py::object result(py::handle<>(str));
+
+  names->Insert(hash, name, result);
+
+  return result;
+}
+
+v8::Handle<v8::Value> CPythonNames::Get(v8::Isolate *isolate, py::object name)
+{
+  if (!PyBytes_CheckExact(name.ptr()) && !PyUnicode_CheckExact(name.ptr())) return CPythonObject::Wrap(name);
+
+  v8::EscapableHandleScope handle_scope(isolate);
+
+  CPythonNames *names = GetNames(isolate);
+
+  StrMap::iterator it = names->m_strs.find(name.ptr());
+
+  if (it != names->m_strs.end())
+  {
+    names->m_entries.splice(names->m_entries.begin(), names->m_entries, it->second);
+
+    return handle_scope.Escape(v8::Local<v8::String>::New(isolate, (*it->second)->name));
+  }
+
+  v8::Local<v8::String> str;
+
+  if (PyBytes_CheckExact(name.ptr()))
+  {
+    str = v8::String::NewFromUtf8(isolate, PyBytes_AS_STRING(name.ptr()),
+                                  v8::String::kInternalizedString, (int) PyBytes_GET_SIZE(name.ptr()));
+  }
+  else
+  {
+  #if PY_MAJOR_VERSION >= 3
+    Py_ssize_t len = 0;
+    const char *utf8 = ::PyUnicode_AsUTF8AndSize(name.ptr(), &len);
+
+    if (!utf8) py::throw_error_already_set();
+
+    str = v8::String::NewFromUtf8(isolate, utf8, v8::String::kInternalizedString, (int) len);
+  #else
+    str = v8::Local<v8::String>::New(isolate, ToString(name));
+  #endif
+  }
+
+  names->Insert(v8::Utils::OpenHandle(*str)->Hash(), str, name);
+
+  return handle_scope.Escape(str);
+}
+
+CPythonClass::ClassMap CPythonClass::s_classes;
+CPythonClass::ClassList CPythonClass::s_orphans;
+
+CPythonClass::CPythonClass(v8::Isolate *isolate, py::object type)
+  : m_names(py::handle<>(::PySet_New(NULL)))
+{
+  v8::HandleScope handle_scope(isolate);
+
+  v8::Local<v8::FunctionTemplate> func_tmpl = v8::FunctionTemplate::New(isolate);
+
+  func_tmpl->SetClassName(ToString(type.attr("__name__")));
+
+  v8::Local<v8::ObjectTemplate> instance_tmpl = func_tmpl->InstanceTemplate();
+
+  instance_tmpl->SetInternalFieldCount(1);
+  instance_tmpl->SetNamedPropertyHandler(CPythonObject::NamedGetter, CPythonObject::NamedSetter,
+                                         CPythonObject::NamedQuery, CPythonObject::NamedDeleter,
+                                         CPythonObject::NamedEnumerator, v8::External::New(isolate, this));
+  instance_tmpl->SetIndexedPropertyHandler(CPythonObject::IndexedGetter, CPythonObject::IndexedSetter,
+                                           CPythonObject::IndexedQuery, CPythonObject::IndexedDeleter,
+                                           CPythonObject::IndexedEnumerator);
+  instance_tmpl->SetCallAsFunctionHandler(CPythonObject::Caller);
+
+  v8::Local<v8::ObjectTemplate> proto_tmpl = func_tmpl->PrototypeTemplate();
+  v8::Local<v8::Signature> signature = v8::Signature::New(isolate, func_tmpl);
+
+  py::list names(py::handle<>(::PyObject_Dir(type.ptr())));
+
+  for (Py_ssize_t i=0; i<PyList_GET_SIZE(names.ptr()); i++)
+  {
+    py::object name(py::handle<>(py::borrowed(PyList_GET_ITEM(names.ptr(), i))));
+    py::extract<std::string> extractor(name);
+
+    if (!extractor.check()) continue;
+
+    std::string key = extractor();
+
+    if (key.size() > 4 && key.compare(0, 2, "__") == 0 && key.compare(key.size() - 2, 2, "__") == 0) continue;
+
+    PyObject *attr = ::_PyType_Lookup((PyTypeObject *) type.ptr(), name.ptr());
+
+    if (!attr) continue;
+
+    bool method = PyFunction_Check(attr);
+
+    if (!method && !PyObject_TypeCheck(attr, &::PyProperty_Type)) continue;
+
+    ::PySet_Add(m_names.ptr(), name.ptr());
+
+    if (method)
+    {
+      // the signature rejects the receivers which aren't instances, so the data is only used while the class lives
+
+      m_methods.push_back(name);
+
+      v8::Local<v8::External> data = v8::External::New(isolate, &m_methods.back());
+
+      proto_tmpl->Set(ToString(name), v8::FunctionTemplate::New(isolate, MethodCaller, data, signature), v8::DontEnum);
+    }
+    else
+    {
+      // the prototype may outlive the class, so the accessors have no data and only rely on the receiver
+
+      proto_tmpl->SetAccessor(ToString(name), PropertyGetter, PropertySetter, v8::Handle<v8::Value>(), v8::DEFAULT, v8::DontEnum);
+    }
+  }
+
+  m_template.Reset(isolate, func_tmpl);
+}
+
+bool CPythonClass::IsTemplated(PyTypeObject *type)
+{
+  PyObject *flag = ::PyObject_GetAttrString((PyObject *) type, "__jstemplate__");
+
+  if (!flag)
+  {
+    ::PyErr_Clear();
+
+    return false;
+  }
+
+  bool templated = 1 == ::PyObject_IsTrue(flag);
+
+  Py_DECREF(flag);
+
+  ::PyErr_Clear();
+
+  if (!templated) return false;
+
+  // the attribute lookup can't be predicted when the class customizes it
+
+#if PY_MAJOR_VERSION < 3
+  static PyObject *s_name = ::PyString_InternFromString("__getattribute__");
+#else
+  static PyObject *s_name = ::PyUnicode_InternFromString("__getattribute__");
+#endif
+
+  return ::_PyType_Lookup(type, s_name) == ::_PyType_Lookup(&PyBaseObject_Type, s_name);
+}
+
+CPythonClass *CPythonClass::Get(v8::Isolate *isolate, py::object obj)
+{
+  if (!s_orphans.empty()) ReleaseOrphans(isolate);
+
+  PyTypeObject *type = Py_TYPE(obj.ptr());
+
+  ClassMap::const_iterator it = s_classes.find(std::make_pair(isolate, (PyObject *) type));
+
+  if (it != s_classes.end()) return it->second.clazz;
+
+  Entry entry = { NULL, py::object() };
+
+  if (PyType_HasFeature(type, Py_TPFLAGS_HEAPTYPE))
+  {
+    static PyMethodDef s_callback = { "OnTypeDeleted", (PyCFunction) OnTypeDeleted, METH_O, NULL };
+    static PyObject *s_func = ::PyCFunction_New(&s_callback, NULL);
+
+    // watch the type, so the entry is dropped before its address can be reused by another class
+
+    PyObject *ref = ::PyWeakref_NewRef((PyObject *) type, s_func);
+
+    if (!ref) py::throw_error_already_set();
+
+    entry.ref = py::object(py::handle<>(ref));
+
+    if (IsTemplated(type)) entry.clazz = new CPythonClass(isolate, py::object(py::handle<>(py::borrowed((PyObject *) type))));
+  }
+
+  s_classes[std::make_pair(isolate, (PyObject *) type)] = entry;
+
+  return entry.clazz;
+}
+
+PyObject *CPythonClass::OnTypeDeleted(PyObject *self, PyObject *ref)
+{
+  py::object guard(py::handle<>(py::borrowed(ref))); // the erased entry releases its reference
+
+  for (ClassMap::iterator it = s_classes.begin(); it != s_classes.end(); )
+  {
+    if (it->second.ref.ptr() == ref)
+    {
+      // the template can only be reset with the isolate locked, so it's released on the next use of the isolate
+
+      if (it->second.clazz) s_orphans.insert(std::make_pair(it->first.first, it->second.clazz));
+
+      s_classes.erase(it++);
+    }
+    else
+    {
+      it++;
+    }
+  }
+
+  Py_RETURN_NONE;
+}
+
+void CPythonClass::Release(v8::Isolate *isolate)
+{
+  for (ClassMap::iterator it = s_classes.begin(); it != s_classes.end(); )
+  {
+    if (it->first.first == isolate)
+    {
+      if (it->second.clazz) delete it->second.clazz;
+
+      s_classes.erase(it++);
+    }
+    else
+    {
+      it++;
+    }
+  }
+
+  ReleaseOrphans(isolate);
+}
+
+void CPythonClass::ReleaseOrphans(v8::Isolate *isolate)
+{
+  std::pair<ClassList::iterator, ClassList::iterator> orphans = s_orphans.equal_range(isolate);
+
+  for (ClassList::iterator it = orphans.first; it != orphans.second; it++) delete it->second;
+
+  s_orphans.erase(orphans.first, orphans.second);
+}
+
+bool CPythonClass::IsDeclared(py::object obj, py::object name) const
+{
+  if (1 != ::PySet_Contains(m_names.ptr(), name.ptr())) return false;
+
+  PyObject **dict = ::_PyObject_GetDictPtr(obj.ptr());
+
+  return !dict || !*dict || !::PyDict_GetItem(*dict, name.ptr());
+}
+
+v8::Handle<v8::Object> CPythonClass::NewInstance(v8::Isolate *isolate) const
+{
+  v8::EscapableHandleScope handle_scope(isolate);
+
+  v8::Local<v8::Function> func = v8::Local<v8::FunctionTemplate>::New(isolate, m_template)->GetFunction();
+
+  return handle_scope.Escape(func.IsEmpty() ? v8::Local<v8::Object>() : func->NewInstance());
+}
+
+template <typename T>
+py::object CPythonClass::FindInstance(const v8::PropertyCallbackInfo<T>& info)
+{
+  // the global object inherits the Python global, so the accessor may be called on a derived receiver
+
+  for (v8::Handle<v8::Value> obj = info.This(); obj->IsObject(); obj = obj.As<v8::Object>()->GetPrototype())
+  {
+    if (CPythonObject::IsWrapped(obj.As<v8::Object>())) return CPythonObject::Unwrap(obj.As<v8::Object>());
+  }
+
+  throw CJavascriptException("Illegal invocation", ::PyExc_TypeError);
+}
+
+void CPythonClass::MethodCaller(const v8::FunctionCallbackInfo<v8::Value>& info)
+{
+  v8::HandleScope handle_scope(info.GetIsolate());
+
+  TRY_HANDLE_EXCEPTION(v8::Undefined(info.GetIsolate()));
+
+  CPythonGIL python_gil;
+
+  PyObject *name = static_cast<py::object *>(v8::Handle<v8::External>::Cast(info.Data())->Value())->ptr();
+
+  py::object self = CPythonObject::Unwrap(info.Holder());
+
+  // an instance attribute shadows the method, otherwise the function is taken from the type cache
+  // and called with the instance prepended, without creating a bound method
+
+  PyObject **dict = ::_PyObject_GetDictPtr(self.ptr());
+  PyObject *attr = dict && *dict ? ::PyDict_GetItem(*dict, name) : NULL;
+
+  Py_ssize_t offset = 0;
+
+  if (!attr)
+  {
+    attr = ::_PyType_Lookup(Py_TYPE(self.ptr()), name);
+
+    if (attr && PyFunction_Check(attr)) offset = 1; else attr = NULL;
+  }
+
+  py::object func(attr ? py::handle<>(py::borrowed(attr)) : py::handle<>(::PyObject_GetAttr(self.ptr(), name)));
+
+  py::object args(py::handle<>(::PyTuple_New(offset + info.Length())));
+
+  if (offset) PyTuple_SET_ITEM(args.ptr(), 0, py::incref(self.ptr()));
+
+  for (int i=0; i<info.Length(); i++)
+  {
+    PyTuple_SET_ITEM(args.ptr(), offset + i, py::incref(CJavascriptObject::Wrap(info[i]).ptr()));
+  }
+
+  PyObject *result = ::PyObject_Call(func.ptr(), args.ptr(), NULL);
+
+  if (!result) py::throw_error_already_set();
+
+  CALLBACK_RETURN(CPythonObject::Wrap(py::object(py::handle<>(result))));
+
+  END_HANDLE_EXCEPTION(v8::Undefined(info.GetIsolate()))
+}
+
+void CPythonClass::PropertyGetter(v8::Local<v8::String> prop, const v8::PropertyCallbackInfo<v8::Value>& info)
+{
+  v8::HandleScope handle_scope(info.GetIsolate());
+
+  TRY_HANDLE_EXCEPTION(v8::Undefined(info.GetIsolate()));
+
+  CPythonGIL python_gil;
+
+  py::object name = CPythonNames::Get(info.GetIsolate(), prop);
+
+  CALLBACK_RETURN(CPythonObject::Wrap(FindInstance(info).attr(name)));
+
+  END_HANDLE_EXCEPTION(v8::Undefined(info.GetIsolate()))
+}
+
+void CPythonClass::PropertySetter(v8::Local<v8::String> prop, v8::Local<v8::Value> value, const v8::PropertyCallbackInfo<void>& info)
+{
+  v8::HandleScope handle_scope(info.GetIsolate());
+
+  _TERMINATE_CALLBACK_EXECUTION_CHECK_VOID()
+
+  BEGIN_HANDLE_PYTHON_EXCEPTION
+  {
+    CPythonGIL python_gil;
+
+    py::object name = CPythonNames::Get(info.GetIsolate(), prop);
+
+    py::setattr(FindInstance(info), name, CJavascriptObject::Wrap(value));
+  }
+  END_HANDLE_PYTHON_EXCEPTION
+}
+
+bool CPythonObject::IsWrapped(v8::Handle<v8::Object> obj)
+{
+  return obj->InternalFieldCount() == 1;
+}
+
+py::object CPythonObject::Unwrap(v8::Handle<v8::Object> obj)
+{
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::Handle<v8::External> payload = v8::Handle<v8::External>::Cast(obj->GetInternalField(0));
+
+  return *static_cast<py::object *>(payload->Value());
+}
+
+void CPythonObject::Dispose(v8::Handle<v8::Value> value)
+{
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  if (value->IsObject())
+  {
+    v8::Handle<v8::Object> obj = value->ToObject();
+
+    if (IsWrapped(obj))
+    {
+      Py_DECREF(CPythonObject::Unwrap(obj).ptr());
+    }
+  }
+}
+
+v8::Handle<v8::Value> CPythonObject::Wrap(py::object obj)
+{
+  v8::EscapableHandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::Local<v8::Value> value;
+
+#ifdef SUPPORT_TRACE_LIFECYCLE
+  value = ObjectTracer::FindCache(obj);
+
+  if (value.IsEmpty())
+#endif
+
+  value = WrapInternal(obj);
+
+  return handle_scope.Escape(value);
+}
+
+bool CPythonObject::s_raiseOnPrecisionLoss = false;
+
+v8::Local<v8::Value> CPythonObject::WrapInteger(PyObject *obj)
+{
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  int overflow = 0;
+
+#if PY_MAJOR_VERSION < 3
+  PY_LONG_LONG n = PyInt_CheckExact(obj) ? ::PyInt_AS_LONG(obj) : ::PyLong_AsLongLongAndOverflow(obj, &overflow);
+#else
+  PY_LONG_LONG n = ::PyLong_AsLongLongAndOverflow(obj, &overflow);
+#endif
+
+  if (n == -1 && PyErr_OCCURRED()) throw py::error_already_set();
+
+  if (!overflow)
+  {
+    if (n >= std::numeric_limits<int32_t>::min() && n <= std::numeric_limits<int32_t>::max())
+      return v8::Integer::New(isolate, (int32_t) n);
+    if (n >= 0 && n <= std::numeric_limits<uint32_t>::max())
+      return v8::Integer::NewFromUnsigned(isolate, (uint32_t) n);
+
+    double d = (double) n;
+
+    // the double rounds to 2^63 when n is close to LLONG_MAX, so don't convert it back
+    if (s_raiseOnPrecisionLoss && (d >= 9223372036854775808.0 || (PY_LONG_LONG) d != n))
+      throw CJavascriptException("integer can't be represented exactly as a JavaScript number", ::PyExc_OverflowError);
+
+    return v8::Number::New(isolate, d);
+  }
+
+  double d = ::PyLong_AsDouble(obj);
+
+  if (d == -1.0 && PyErr_OCCURRED()) throw py::error_already_set();
+
+  if (s_raiseOnPrecisionLoss)
+  {
+    py::object exact(py::handle<>(::PyLong_FromDouble(d)));
+
+    int equals = ::PyObject_RichCompareBool(exact.ptr(), obj, Py_EQ);
+
+    if (equals < 0) throw py::error_already_set();
+
+    if (!equals) throw CJavascriptException("integer can't be represented exactly as a JavaScript number", ::PyExc_OverflowError);
+  }
+
+  return v8::Number::New(isolate, d);
+}
+
+//
+// The conversion between the civil dates and the epoch is pure arithmetic,
+// the local timezone offsets come from the DST cache of V8 instead of localtime/mktime.
+//
+static const int64_t kMsPerDay = 86400000;
+
+static int64_t FloorDiv(int64_t a, int64_t b)
+{
+  return (a >= 0 ? a : a - b + 1) / b;
+}
+
+static int64_t DaysFromCivil(int64_t y, int m, int d)
+{
+  y -= m <= 2;
+
+  int64_t era = FloorDiv(y, 400);
+  int64_t yoe = y - era * 400;
+  int64_t doy = (153 * (m + (m > 2 ? -3 : 9)) + 2) / 5 + d - 1;
+  int64_t doe = yoe * 365 + yoe / 4 - yoe / 100 + doy;
+
+  return era * 146097 + doe - 719468;
+}
+
+static void CivilFromDays(int64_t z, int& y, int& m, int& d)
+{
+  z += 719468;
+
+  int64_t era = FloorDiv(z, 146097);
+  int64_t doe = z - era * 146097;
+  int64_t yoe = (doe - doe / 1460 + doe / 36524 - doe / 146096) / 365;
+  int64_t doy = doe - (365 * yoe + yoe / 4 - yoe / 100);
+  int64_t mp = (5 * doy + 2) / 153;
+
+  d = (int) (doy - (153 * mp + 2) / 5 + 1);
+  m = (int) (mp < 10 ? mp + 3 : mp - 9);
+  y = (int) (yoe + era * 400 + (m <= 2));
+}
+
+// the datetime or time value provides utcoffset(), the naive or missing value is in the local time
+static double ToEpochTime(int64_t days, int hour, int minute, int second, int us, py::object value)
+{
+  int64_t ms = days * kMsPerDay + hour * 3600000LL + minute * 60000LL + second * 1000LL + us / 1000;
+
+  py::object offset = value.is_none() ? py::object() : value.attr("utcoffset")();
+
+  if (offset.is_none()) return (double) v8i::Isolate::Current()->date_cache()->ToUTC(ms);
+
+  int days_offset = py::extract<int>(offset.attr("days")),
+      seconds_offset = py::extract<int>(offset.attr("seconds")),
+      us_offset = py::extract<int>(offset.attr("microseconds"));
+
+  return (double) (ms - (days_offset * kMsPerDay + seconds_offset * 1000LL + us_offset / 1000));
+}
+
+static py::object FromEpochTime(double time, py::object tz)
+{
+  if (time != time) return py::object(); // Invalid Date
+
+  int64_t ms = (int64_t) floor(time);
+
+  if (tz.is_none()) ms = v8i::Isolate::Current()->date_cache()->ToLocal(ms);
+
+  int64_t days = FloorDiv(ms, kMsPerDay), rem = ms - days * kMsPerDay;
+
+  int year, month, day;
+
+  CivilFromDays(days, year, month, day);
+
+  int hour = (int) (rem / 3600000), minute = (int) (rem / 60000 % 60),
+      second = (int) (rem / 1000 % 60), us = (int) (rem % 1000 * 1000);
+
+  if (tz.is_none())
+  {
+    return py::object(py::handle<>(::PyDateTime_FromDateAndTime(year, month, day, hour, minute, second, us)));
+  }
+
+  py::object utc(py::handle<>(PyDateTimeAPI->DateTime_FromDateAndTime(
+    year, month, day, hour, minute, second, us, tz.ptr(), PyDateTimeAPI->DateTimeType)));
+
+  return tz.attr("fromutc")(utc);
+}
+
+v8::Handle<v8::Value> CPythonObject::WrapInternal(py::object obj)
+{
+  assert(v8::Isolate::GetCurrent()->InContext());
+
+  v8::EscapableHandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::TryCatch try_catch;
+
+  CPythonGIL python_gil;
+
+  TERMINATE_EXECUTION_CHECK(v8::Undefined(v8::Isolate::GetCurrent()))
+
+  if (obj.is_none()) return v8::Null(v8::Isolate::GetCurrent());
+  if (obj.ptr() == Py_True) return v8::True(v8::Isolate::GetCurrent());
+  if (obj.ptr() == Py_False) return v8::False(v8::Isolate::GetCurrent());
+
+  py::extract<CJavascriptString&> str_extractor(obj);
+
+  if (str_extractor.check()) return handle_scope.Escape(str_extractor().String());
+
+  py::extract<CJavascriptObject&> extractor(obj);
+
+  if (extractor.check())
+  {
+    CJavascriptObject& jsobj = extractor();
+
+    if (dynamic_cast<CJavascriptNull *>(&jsobj)) return v8::Null(v8::Isolate::GetCurrent());
+    if (dynamic_cast<CJavascriptUndefined *>(&jsobj)) return v8::Undefined(v8::Isolate::GetCurrent());
+
+    if (jsobj.Object().IsEmpty())
+    {
+      ILazyObject *pLazyObject = dynamic_cast<ILazyObject *>(&jsobj);
+
+      if (pLazyObject) pLazyObject->LazyConstructor();
+    }
+
+    if (jsobj.Object().IsEmpty())
+    {
+      throw CJavascriptException("Refer to a null object", ::PyExc_AttributeError);
+    }
+
+  #ifdef SUPPORT_TRACE_LIFECYCLE
+    py::object *object = new py::object(obj);
+
+    ObjectTracer::Trace(jsobj.Object(), object);
+  #endif
+
+    return handle_scope.Escape(jsobj.Object());
+  }
+
+  v8::Local<v8::Value> result;
+
+#if PY_MAJOR_VERSION < 3
+  if (PyInt_CheckExact(obj.ptr()) || PyLong_CheckExact(obj.ptr()))
+#else
+  if (PyLong_CheckExact(obj.ptr()))
+#endif
+  {
+    result = WrapInteger(obj.ptr());
+  }
+  else if (PyBool_Check(obj.ptr()))
+  {
+    result = v8::Boolean::New(v8::Isolate::GetCurrent(), py::extract<bool>(obj));
+  }
+  else if (PyBytes_CheckExact(obj.ptr()) ||
+           PyUnicode_CheckExact(obj.ptr()))
+  {
+    result = ToString(obj);
+  }
+  else if (PyFloat_CheckExact(obj.ptr()))
+  {
+    result = v8::Number::New(v8::Isolate::GetCurrent(), py::extract<double>(obj));
+  }
+  else if (PyDateTime_CheckExact(obj.ptr()))
+  {
+    int64_t days = DaysFromCivil(PyDateTime_GET_YEAR(obj.ptr()), PyDateTime_GET_MONTH(obj.ptr()), PyDateTime_GET_DAY(obj.ptr()));
+
+    result = v8::Date::New(v8::Isolate::GetCurrent(), ToEpochTime(days,
+      PyDateTime_DATE_GET_HOUR(obj.ptr()), PyDateTime_DATE_GET_MINUTE(obj.ptr()),
+      PyDateTime_DATE_GET_SECOND(obj.ptr()), PyDateTime_DATE_GET_MICROSECOND(obj.ptr()), obj));
+  }
+  else if (PyDate_CheckExact(obj.ptr()))
+  {
+    int64_t days = DaysFromCivil(PyDateTime_GET_YEAR(obj.ptr()), PyDateTime_GET_MONTH(obj.ptr()), PyDateTime_GET_DAY(obj.ptr()));
+
+    result = v8::Date::New(v8::Isolate::GetCurrent(), ToEpochTime(days, 0, 0, 0, 0, py::object()));
+  }
+  else if (PyTime_CheckExact(obj.ptr()))
+  {
+    // the time of the day is placed on the zero day of struct tm, 1899-12-31
+    int64_t days = DaysFromCivil(1899, 12, 31);
+
+    result = v8::Date::New(v8::Isolate::GetCurrent(), ToEpochTime(days,
+      PyDateTime_TIME_GET_HOUR(obj.ptr()) - 1, PyDateTime_TIME_GET_MINUTE(obj.ptr()),
+      PyDateTime_TIME_GET_SECOND(obj.ptr()), PyDateTime_TIME_GET_MICROSECOND(obj.ptr()), obj));
+  }
+  else if (PyCFunction_Check(obj.ptr()) || PyFunction_Check(obj.ptr()) ||
+           PyMethod_Check(obj.ptr()) || PyType_Check(obj.ptr()))
+  {
+    v8::Handle<v8::FunctionTemplate> func_tmpl = v8::FunctionTemplate::New(v8::Isolate::GetCurrent());
+    py::object *object = new py::object(obj);
+
+    func_tmpl->SetCallHandler(Caller, v8::External::New(v8::Isolate::GetCurrent(), object));
+
+    if (PyType_Check(obj.ptr()))
+    {
+      v8::Handle<v8::String> cls_name = v8::String::NewFromUtf8(v8::Isolate::GetCurrent(), py::extract<const char *>(obj.attr("__name__"))());
+
+      func_tmpl->SetClassName(cls_name);
+    }
+
+    result = func_tmpl->GetFunction();
+
+  #ifdef SUPPORT_TRACE_LIFECYCLE
+    if (!result.IsEmpty()) ObjectTracer::Trace(result, object);
+  #endif
+  }
+  else if (CPythonBuffer::IsBuffer(obj) && !(result = CPythonBuffer::Wrap(obj)).IsEmpty())
+  {
+    // the shared typed array pins the exported buffer, and through it the Python object
+  }
+  else
+  {
+    static v8::Persistent<v8::ObjectTemplate> s_template(v8::Isolate::GetCurrent(), CreateObjectTemplate(v8::Isolate::GetCurrent()));
+
+    CPythonClass *clazz = CPythonClass::Get(v8::Isolate::GetCurrent(), obj);
+
+    v8::Handle<v8::Object> instance = clazz ? clazz->NewInstance(v8::Isolate::GetCurrent()) :
+      v8::Local<v8::ObjectTemplate>::New(v8::Isolate::GetCurrent(), s_template)->NewInstance();
+
+    if (!instance.IsEmpty())
+    {
+      py::object *object = new py::object(obj);
+
+      instance->SetInternalField(0, v8::External::New(v8::Isolate::GetCurrent(), object));
+
+    #ifdef SUPPORT_TRACE_LIFECYCLE
+      ObjectTracer::Trace(instance, object);
+    #endif
+    }
+
+    result = instance;
+  }
+
+  if (result.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+  return handle_scope.Escape(result);
+}
+
+v8::Handle<v8::Value> CPythonObject::Copy(py::object obj, bool deep)
+{
+  assert(v8::Isolate::GetCurrent()->InContext());
+
+  v8::EscapableHandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::TryCatch try_catch;
+
+  CopyMemo memo;
+
+  v8::Local<v8::Value> result = v8::Local<v8::Value>::New(v8::Isolate::GetCurrent(), CopyInternal(obj, deep, memo));
+
+  if (result.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+  return handle_scope.Escape(result);
+}
+
+v8::Handle<v8::Value> CPythonObject::CopyInternal(py::object obj, bool deep, CopyMemo& memo)
+{
+  CopyMemo::const_iterator it = memo.find(obj.ptr());
+
+  if (it != memo.end()) return it->second;
+
+  if (PyDict_Check(obj.ptr()))
+  {
+    v8::Handle<v8::Object> result = v8::Object::New(v8::Isolate::GetCurrent());
+
+    memo[obj.ptr()] = result;
+
+    PyObject *key, *value;
+    Py_ssize_t pos = 0;
+
+    while (PyDict_Next(obj.ptr(), &pos, &key, &value))
+    {
+      py::object item(py::handle<>(py::borrowed(value)));
+
+      result->Set(Wrap(py::object(py::handle<>(py::borrowed(key)))),
+                  deep ? CopyInternal(item, deep, memo) : Wrap(item));
+    }
+
+    return result;
+  }
+
+  if (PyList_Check(obj.ptr()) || PyTuple_Check(obj.ptr()))
+  {
+    Py_ssize_t size = PySequence_Fast_GET_SIZE(obj.ptr());
+    PyObject **items = PySequence_Fast_ITEMS(obj.ptr());
+
+    v8::Handle<v8::Array> result = v8::Array::New(v8::Isolate::GetCurrent(), size);
+
+    memo[obj.ptr()] = result;
+
+    for (Py_ssize_t i=0; i<size; i++)
+    {
+      py::object item(py::handle<>(py::borrowed(items[i])));
+
+      result->Set(i, deep ? CopyInternal(item, deep, memo) : Wrap(item));
+    }
+
+    return result;
+  }
+
+  return Wrap(obj);
+}
+
+void CJavascriptObject::CheckAttr(v8::Handle<v8::String> name) const
+{
+  assert(v8::Isolate::GetCurrent()->InContext());
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  if (!Object()->Has(name))
+  {
+    std::ostringstream msg;
+
+    msg << "'" << *v8::String::Utf8Value(Object()->ObjectProtoToString())
+        << "' object has no attribute '" << *v8::String::Utf8Value(name) << "'";
+
+    throw CJavascriptException(msg.str(), ::PyExc_AttributeError);
+  }
+}
+
+py::object CJavascriptObject::GetAttr(const std::string& name)
+{
+#ifdef SUPPORT_PROBES
+  if (WRAPPER_JS_OBJECT_GETATTR_ENABLED()) {
+    WRAPPER_JS_OBJECT_GETATTR(&m_obj, name.c_str());
+  }
+#endif
+
+  CHECK_V8_CONTEXT();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::TryCatch try_catch;
+
+  v8::Handle<v8::String> attr_name = DecodeUtf8(name);
+
+  CheckAttr(attr_name);
+
+  v8::Handle<v8::Value> attr_value = Object()->Get(attr_name);
+
+  if (attr_value.IsEmpty())
+    CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+  return CJavascriptObject::Wrap(attr_value, Object());
 }
 
 void CJavascriptObject::SetAttr(const std::string& name, py::object value)
@@ -1088,6 +2217,156 @@ bool CJavascriptObject::Contains(const std::string& name)
   return found;
 }
 
+py::object CJavascriptObject::ToPython(int depth, int max_items)
+{
+  CHECK_V8_CONTEXT();
+
+  ILazyObject *lazy = dynamic_cast<ILazyObject *>(this);
+
+  if (lazy) lazy->LazyConstructor();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::TryCatch try_catch;
+
+  ConvertMemo memo;
+
+  return Convert(Object(), v8::Handle<v8::Object>(), depth, max_items, memo, try_catch);
+}
+
+py::object CJavascriptObject::ToJSON(void)
+{
+  CHECK_V8_CONTEXT();
+
+  ILazyObject *lazy = dynamic_cast<ILazyObject *>(this);
+
+  if (lazy) lazy->LazyConstructor();
+
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  v8::HandleScope handle_scope(isolate);
+
+  v8::TryCatch try_catch;
+
+  v8::Handle<v8::Object> json = isolate->GetCurrentContext()->Global()->Get(
+    v8::String::NewFromUtf8(isolate, "JSON"))->ToObject();
+
+  if (json.IsEmpty()) CJavascriptException::ThrowIf(isolate, try_catch);
+
+  v8::Handle<v8::Value> stringify = json->Get(v8::String::NewFromUtf8(isolate, "stringify"));
+
+  if (stringify.IsEmpty() || !stringify->IsFunction())
+    throw CJavascriptException("JSON.stringify is not a function", ::PyExc_TypeError);
+
+  v8::Handle<v8::Value> args[] = { Object() };
+
+  CHeapBudget::Scope budget_scope(isolate);
+
+  v8::Handle<v8::Value> result = stringify.As<v8::Function>()->Call(json, 1, args);
+
+  budget_scope.Leave();
+
+  if (result.IsEmpty()) CJavascriptException::ThrowIf(isolate, try_catch);
+
+  if (!result->IsString()) return py::object();
+
+  v8::Handle<v8::String> str = result.As<v8::String>();
+
+  int len = str->Utf8Length();
+
+  py::object data(py::handle<>(::PyBytes_FromStringAndSize(NULL, len)));
+
+  str->WriteUtf8(PyBytes_AS_STRING(data.ptr()), len, NULL, v8::String::NO_NULL_TERMINATION);
+
+  return data;
+}
+
+static void ConsumeItems(int& budget, uint32_t count)
+{
+  if (budget < 0) return;
+
+  if (count > (uint32_t) budget)
+    throw CJavascriptException("too many items to convert", ::PyExc_ValueError);
+
+  budget -= count;
+}
+
+py::object CJavascriptObject::Convert(v8::Handle<v8::Value> value, v8::Handle<v8::Object> self,
+                                      int depth, int& budget, ConvertMemo& memo, v8::TryCatch& try_catch)
+{
+  if (value.IsEmpty())
+  {
+    if (try_catch.HasCaught()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+    return py::object();
+  }
+
+  if (!value->IsObject() || value->IsDate() || value->IsStringObject() ||
+      value->IsNumberObject() || value->IsBooleanObject())
+  {
+    return Wrap(value, self);
+  }
+
+  v8::Handle<v8::Object> obj = value.As<v8::Object>();
+
+  if (depth == 0 || obj->IsFunction() || CPythonBuffer::IsBuffer(obj) || CPythonObject::IsWrapped(obj)) return Wrap(obj, self);
+
+  int hash = obj->GetIdentityHash();
+
+  for (ConvertMemo::const_iterator it = memo.lower_bound(hash); it != memo.upper_bound(hash); it++)
+  {
+    if (it->second.first->StrictEquals(obj)) return it->second.second;
+  }
+
+  // a deep but acyclic graph would overflow the C stack, raise RecursionError like the Python code does
+
+  if (::Py_EnterRecursiveCall(const_cast<char *>(" while converting a Javascript object"))) throw py::error_already_set();
+
+  struct RecursionGuard { ~RecursionGuard() { Py_LeaveRecursiveCall(); } } recursion_guard;
+
+  if (obj->IsArray())
+  {
+    v8::Handle<v8::Array> array = obj.As<v8::Array>();
+
+    uint32_t len = array->Length();
+
+    ConsumeItems(budget, len);
+
+    py::list items;
+
+    memo.insert(std::make_pair(hash, std::make_pair(obj, items)));
+
+    for (uint32_t i=0; i<len; i++)
+    {
+      items.append(Convert(array->Get(i), obj, depth-1, budget, memo, try_catch));
+    }
+
+    return items;
+  }
+
+  v8::Handle<v8::Array> names = obj->GetPropertyNames();
+
+  if (names.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+  uint32_t len = names->Length();
+
+  ConsumeItems(budget, len);
+
+  py::dict items;
+
+  memo.insert(std::make_pair(hash, std::make_pair(obj, items)));
+
+  for (uint32_t i=0; i<len; i++)
+  {
+    v8::Handle<v8::Value> name = names->Get(i);
+    v8::String::Utf8Value key(name);
+
+    items[py::str(*key, key.length())] = Convert(obj->Get(name), obj, depth-1, budget, memo, try_catch);
+  }
+
+  return items;
+}
+
 bool CJavascriptObject::Equals(CJavascriptObjectPtr other) const
 {
   CHECK_V8_CONTEXT();
@@ -1196,7 +2475,15 @@ py::object CJavascriptObject::Wrap(v8::Handle<v8::Value> value, v8::Handle<v8::O
   }
   if (value->IsNumber())
   {
-    return py::object(py::handle<>(::PyFloat_FromDouble(value->NumberValue())));
+    double n = value->NumberValue();
+
+    // the integral doubles are exact up to 2^53
+    if (s_integralNumbersAsInt && n == floor(n) && fabs(n) <= 9007199254740992.0)
+    {
+      return py::object(py::handle<>(::PyLong_FromLongLong((PY_LONG_LONG) n)));
+    }
+
+    return py::object(py::handle<>(::PyFloat_FromDouble(n)));
   }
   if (value->IsNumberObject())
   {
@@ -1204,18 +2491,50 @@ py::object CJavascriptObject::Wrap(v8::Handle<v8::Value> value, v8::Handle<v8::O
   }
   if (value->IsDate())
   {
-    double n = v8::Handle<v8::Date>::Cast(value)->NumberValue();
+    return FromEpochTime(v8::Handle<v8::Date>::Cast(value)->ValueOf(), py::object());
+  }
+
+  return Wrap(value->ToObject(), self);
+}
 
-    time_t ts = (time_t) floor(n / 1000);
+template <typename T>
+static PyObject *NewInstance(void)
+{
+  PyTypeObject *type = py::converter::registered<T>::converters.get_class_object();
 
-    tm *t = localtime(&ts);
+  return type->tp_new(type, py::tuple().ptr(), NULL);
+}
 
-    return py::object(py::handle<>(::PyDateTime_FromDateAndTime(
-      t->tm_year+1900, t->tm_mon+1, t->tm_mday, t->tm_hour, t->tm_min, t->tm_sec,
-      ((long long) floor(n)) % 1000 * 1000)));
-  }
+//
+// Construct the wrapper in the holder storage reserved inside the Python instance by class_<T>,
+// which saves the separated C++ allocation and the shared_ptr control block of Wrap(CJavascriptObject *).
+//
+template <typename T, typename A0>
+static py::object MakeWrapper(A0 a0)
+{
+  CPythonGIL python_gil;
 
-  return Wrap(value->ToObject(), self);
+  TERMINATE_EXECUTION_CHECK(py::object())
+
+  py::object wrapper(py::handle<>(NewInstance<T>()));
+
+  py::objects::make_holder<1>::apply<py::objects::value_holder<T>, boost::mpl::vector1<A0> >::execute(wrapper.ptr(), a0);
+
+  return wrapper;
+}
+
+template <typename T, typename A0, typename A1>
+static py::object MakeWrapper(A0 a0, A1 a1)
+{
+  CPythonGIL python_gil;
+
+  TERMINATE_EXECUTION_CHECK(py::object())
+
+  py::object wrapper(py::handle<>(NewInstance<T>()));
+
+  py::objects::make_holder<2>::apply<py::objects::value_holder<T>, boost::mpl::vector2<A0, A1> >::execute(wrapper.ptr(), a0, a1);
+
+  return wrapper;
 }
 
 py::object CJavascriptObject::Wrap(v8::Handle<v8::Object> obj, v8::Handle<v8::Object> self)
@@ -1226,11 +2545,9 @@ py::object CJavascriptObject::Wrap(v8::Handle<v8::Object> obj, v8::Handle<v8::Ob
   {
     return py::object();
   }
-  else if (obj->IsArray())
+  else if (CPythonBuffer::IsBuffer(obj))
   {
-    v8::Handle<v8::Array> array = v8::Handle<v8::Array>::Cast(obj);
-
-    return Wrap(new CJavascriptArray(array));
+    return CPythonBuffer::Unwrap(obj);
   }
   else if (CPythonObject::IsWrapped(obj))
   {
@@ -1238,10 +2555,24 @@ py::object CJavascriptObject::Wrap(v8::Handle<v8::Object> obj, v8::Handle<v8::Ob
   }
   else if (obj->IsFunction())
   {
-    return Wrap(new CJavascriptFunction(self, v8::Handle<v8::Function>::Cast(obj)));
+    // the function wrapper is bound to its receiver, so it isn't shared
+    return MakeWrapper<CJavascriptFunction>(self, v8::Handle<v8::Function>::Cast(obj));
+  }
+
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  int hash = obj->GetIdentityHash();
+
+  py::object wrapper = CJavascriptObjectCache::Get(isolate, obj, hash);
+
+  if (wrapper.is_none())
+  {
+    wrapper = obj->IsArray() ? MakeWrapper<CJavascriptArray>(obj.As<v8::Array>()) : MakeWrapper<CJavascriptObject>(obj);
+
+    if (!wrapper.is_none()) CJavascriptObjectCache::Put(isolate, hash, wrapper);
   }
 
-  return Wrap(new CJavascriptObject(obj));
+  return wrapper;
 }
 
 py::object CJavascriptObject::Wrap(CJavascriptObject *obj)
@@ -1261,38 +2592,40 @@ void CJavascriptArray::LazyConstructor(void)
 
   v8::Handle<v8::Array> array;
 
+  size_t size = 0;
+
   if (m_items.is_none())
   {
-    array = v8::Array::New(v8::Isolate::GetCurrent(), m_size);
+    array = v8::Array::New(v8::Isolate::GetCurrent(), size);
   }
 #if PY_MAJOR_VERSION < 3
   else if (PyInt_CheckExact(m_items.ptr()))
   {
-    m_size = PyInt_AS_LONG(m_items.ptr());
-    array = v8::Array::New(v8::Isolate::GetCurrent(), m_size);
+    size = PyInt_AS_LONG(m_items.ptr());
+    array = v8::Array::New(v8::Isolate::GetCurrent(), size);
   }
 #endif
   else if (PyLong_CheckExact(m_items.ptr()))
   {
-    m_size = PyLong_AsLong(m_items.ptr());
-    array = v8::Array::New(v8::Isolate::GetCurrent(), m_size);
+    size = PyLong_AsLong(m_items.ptr());
+    array = v8::Array::New(v8::Isolate::GetCurrent(), size);
   }
   else if (PyList_Check(m_items.ptr()))
   {
-    m_size = PyList_GET_SIZE(m_items.ptr());
-    array = v8::Array::New(v8::Isolate::GetCurrent(), m_size);
+    size = PyList_GET_SIZE(m_items.ptr());
+    array = v8::Array::New(v8::Isolate::GetCurrent(), size);
 
-    for (Py_ssize_t i=0; i< (Py_ssize_t) m_size; i++)
+    for (Py_ssize_t i=0; i< (Py_ssize_t) size; i++)
     {
       array->Set(v8::Uint32::New(v8::Isolate::GetCurrent(), i), CPythonObject::Wrap(py::object(py::handle<>(py::borrowed(PyList_GET_ITEM(m_items.ptr(), i))))));
     }
   }
   else if (PyTuple_Check(m_items.ptr()))
   {
-    m_size = PyTuple_GET_SIZE(m_items.ptr());
-    array = v8::Array::New(v8::Isolate::GetCurrent(), m_size);
+    size = PyTuple_GET_SIZE(m_items.ptr());
+    array = v8::Array::New(v8::Isolate::GetCurrent(), size);
 
-    for (Py_ssize_t i=0; i< (Py_ssize_t) m_size; i++)
+    for (Py_ssize_t i=0; i< (Py_ssize_t) size; i++)
     {
       array->Set(v8::Uint32::New(v8::Isolate::GetCurrent(), i), CPythonObject::Wrap(py::object(py::handle<>(py::borrowed(PyTuple_GET_ITEM(m_items.ptr(), i))))));
     }
@@ -1301,20 +2634,98 @@ void CJavascriptArray::LazyConstructor(void)
   {
     array = v8::Array::New(v8::Isolate::GetCurrent());
 
-    py::object iter(py::handle<>(::PyObject_GetIter(m_items.ptr())));
+    py::object iter(py::handle<>(::PyObject_GetIter(m_items.ptr())));
+
+    PyObject *item = NULL;
+
+    while (NULL != (item = ::PyIter_Next(iter.ptr())))
+    {
+      array->Set(v8::Uint32::New(v8::Isolate::GetCurrent(), size++), CPythonObject::Wrap(py::object(py::handle<>(py::borrowed(item)))));
+    }
+  }
+
+  m_obj.Reset(v8::Isolate::GetCurrent(), array);
+
+  // the items have been copied, don't keep them alive with the array
+  m_items = py::object();
+}
+size_t CJavascriptArray::Length(void)
+{
+  CHECK_V8_CONTEXT();
+
+  LazyConstructor();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  return v8::Handle<v8::Array>::Cast(Object())->Length();
+}
+const size_t CJavascriptArray::CHUNK_SIZE;
+
+void CJavascriptArray::Fetch(size_t start, size_t count, std::vector<py::object>& items)
+{
+  CHECK_V8_CONTEXT();
+
+  LazyConstructor();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::TryCatch try_catch;
+
+  v8::Handle<v8::Array> array = Object().As<v8::Array>();
+
+  size_t stop = std::min(start + count, (size_t) array->Length());
+
+  items.clear();
+
+  for (size_t i=start; i<stop; i++)
+  {
+    v8::Handle<v8::Value> value = array->Get((uint32_t) i);
+
+    if (value.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+    items.push_back(CJavascriptObject::Wrap(value, array));
+  }
+
+  // the array may shrink while iterating, the missing items are None like GetItem returns
+  if (items.empty()) items.push_back(py::object());
+}
+
+py::object CJavascriptArray::ToList(void)
+{
+  CHECK_V8_CONTEXT();
+
+  LazyConstructor();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::TryCatch try_catch;
+
+  v8::Handle<v8::Array> array = Object().As<v8::Array>();
 
-    m_size = 0;
-    PyObject *item = NULL;
+  uint32_t len = array->Length();
 
-    while (NULL != (item = ::PyIter_Next(iter.ptr())))
+  py::object items(py::handle<>(::PyList_New(len)));
+
+  for (uint32_t start=0; start<len; start+=CHUNK_SIZE)
+  {
+    v8::HandleScope chunk_scope(v8::Isolate::GetCurrent());
+
+    uint32_t stop = std::min(len, (uint32_t) (start + CHUNK_SIZE));
+
+    for (uint32_t i=start; i<stop; i++)
     {
-      array->Set(v8::Uint32::New(v8::Isolate::GetCurrent(), m_size++), CPythonObject::Wrap(py::object(py::handle<>(py::borrowed(item)))));
+      v8::Handle<v8::Value> value = array->Get(i);
+
+      if (value.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+      PyList_SET_ITEM(items.ptr(), i, py::incref(CJavascriptObject::Wrap(value, array).ptr()));
     }
   }
 
-  m_obj.Reset(v8::Isolate::GetCurrent(), array);
+  return items;
 }
-size_t CJavascriptArray::Length(void)
+
+py::list CJavascriptArray::ToDates(py::object tz)
 {
   CHECK_V8_CONTEXT();
 
@@ -1322,7 +2733,39 @@ size_t CJavascriptArray::Length(void)
 
   v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
 
-  return v8::Handle<v8::Array>::Cast(Object())->Length();
+  v8::TryCatch try_catch;
+
+  v8::Handle<v8::Array> array = Object().As<v8::Array>();
+
+  uint32_t len = array->Length();
+
+  py::list result;
+
+  for (uint32_t i=0; i<len; i++)
+  {
+    v8::Handle<v8::Value> item = array->Get(i);
+
+    if (item.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
+
+    if (item->IsDate())
+    {
+      result.append(FromEpochTime(item.As<v8::Date>()->ValueOf(), tz));
+    }
+    else if (item->IsNumber())
+    {
+      result.append(FromEpochTime(item->NumberValue(), tz));
+    }
+    else if (item->IsNull() || item->IsUndefined())
+    {
+      result.append(py::object());
+    }
+    else
+    {
+      throw CJavascriptException("array item should be a Date or a number", ::PyExc_TypeError);
+    }
+  }
+
+  return result;
 }
 py::object CJavascriptArray::GetItem(py::object key)
 {
@@ -1593,6 +3036,8 @@ py::object CJavascriptFunction::Call(v8::Handle<v8::Object> self, py::list args,
 
   v8::Handle<v8::Value> result;
 
+  CHeapBudget::Scope budget_scope(v8::Isolate::GetCurrent());
+
   Py_BEGIN_ALLOW_THREADS
 
   result = func->Call(
@@ -1601,11 +3046,111 @@ py::object CJavascriptFunction::Call(v8::Handle<v8::Object> self, py::list args,
 
   Py_END_ALLOW_THREADS
 
+  budget_scope.Leave();
+
   if (result.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
 
   return CJavascriptObject::Wrap(result);
 }
 
+py::list CJavascriptFunction::CallMany(py::object iterable, size_t chunk, bool unpack)
+{
+  CHECK_V8_CONTEXT();
+
+  if (chunk == 0) throw CJavascriptException("chunk should be positive", ::PyExc_ValueError);
+
+  v8::Isolate *isolate = v8::Isolate::GetCurrent();
+
+  v8::HandleScope handle_scope(isolate);
+
+  v8::TryCatch try_catch;
+
+  v8::Handle<v8::Function> func = v8::Handle<v8::Function>::Cast(Object());
+  v8::Handle<v8::Object> self = Self();
+
+  if (self.IsEmpty()) self = isolate->GetCurrentContext()->Global();
+
+  py::object iter(py::handle<>(::PyObject_GetIter(iterable.ptr())));
+  py::list results;
+
+  std::vector< v8::Handle<v8::Value> > params;
+  std::vector<size_t> offsets;
+  std::vector< v8::Handle<v8::Value> > values(chunk);
+
+  bool exhausted = false;
+
+  while (!exhausted)
+  {
+    v8::HandleScope chunk_scope(isolate);
+
+    params.clear();
+    offsets.assign(1, 0);
+
+    while (offsets.size() <= chunk)
+    {
+      PyObject *item = ::PyIter_Next(iter.ptr());
+
+      if (!item)
+      {
+        if (::PyErr_Occurred()) py::throw_error_already_set();
+
+        exhausted = true;
+        break;
+      }
+
+      py::object arg(py::handle<>(item));
+
+      if (unpack)
+      {
+        py::object seq(py::handle<>(::PySequence_Fast(item, "starmap expects the argument sequences")));
+
+        Py_ssize_t size = PySequence_Fast_GET_SIZE(seq.ptr());
+        PyObject **items = PySequence_Fast_ITEMS(seq.ptr());
+
+        for (Py_ssize_t i=0; i<size; i++)
+        {
+          params.push_back(CPythonObject::Wrap(py::object(py::handle<>(py::borrowed(items[i])))));
+        }
+      }
+      else
+      {
+        params.push_back(CPythonObject::Wrap(arg));
+      }
+
+      offsets.push_back(params.size());
+    }
+
+    size_t count = offsets.size() - 1;
+    bool failed = false;
+
+    CHeapBudget::Scope budget_scope(isolate);
+
+    Py_BEGIN_ALLOW_THREADS
+
+    for (size_t i=0; i<count && !failed; i++)
+    {
+      size_t argc = offsets[i+1] - offsets[i];
+
+      values[i] = func->Call(self, argc, argc ? &params[offsets[i]] : NULL);
+
+      failed = values[i].IsEmpty();
+    }
+
+    Py_END_ALLOW_THREADS
+
+    budget_scope.Leave();
+
+    if (failed) CJavascriptException::ThrowIf(isolate, try_catch);
+
+    for (size_t i=0; i<count; i++)
+    {
+      results.append(CJavascriptObject::Wrap(values[i]));
+    }
+  }
+
+  return results;
+}
+
 py::object CJavascriptFunction::CreateWithArgs(CJavascriptFunctionPtr proto, py::tuple args, py::dict kwds)
 {
   CHECK_V8_CONTEXT();
@@ -1630,12 +3175,16 @@ py::object CJavascriptFunction::CreateWithArgs(CJavascriptFunctionPtr proto, py:
 
   v8::Handle<v8::Object> result;
 
+  CHeapBudget::Scope budget_scope(v8::Isolate::GetCurrent());
+
   Py_BEGIN_ALLOW_THREADS
 
   result = func->NewInstance(params.size(), params.empty() ? NULL : &params[0]);
 
   Py_END_ALLOW_THREADS
 
+  budget_scope.Leave();
+
   if (result.IsEmpty()) CJavascriptException::ThrowIf(v8::Isolate::GetCurrent(), try_catch);
 
   size_t kwds_count = ::PyMapping_Size(kwds.ptr());
@@ -1778,6 +3327,290 @@ py::object CJavascriptFunction::GetOwner(void) const
   return CJavascriptObject::Wrap(Self());
 }
 
+bool CJavascriptObject::s_integralNumbersAsInt = false;
+int64_t CJavascriptObject::s_alive = 0;
+
+CJavascriptObjectCache::CacheMap CJavascriptObjectCache::s_caches;
+const size_t CJavascriptObjectCache::s_sweep_size;
+
+py::object CJavascriptObjectCache::Get(v8::Isolate *isolate, v8::Handle<v8::Object> obj, int hash)
+{
+  CPythonGIL python_gil;
+
+  CacheMap::iterator cache = s_caches.find(isolate);
+
+  if (cache == s_caches.end()) return py::object();
+
+  RefMap& refs = cache->second.refs;
+
+  RefMap::iterator it = refs.lower_bound(hash);
+
+  while (it != refs.end() && it->first == hash)
+  {
+    PyObject *wrapper = PyWeakref_GET_OBJECT(it->second);
+
+    if (wrapper == Py_None)
+    {
+      Py_DECREF(it->second);
+
+      refs.erase(it++);
+    }
+    else
+    {
+      py::object result(py::handle<>(py::borrowed(wrapper)));
+
+      CJavascriptObject& jsobj = py::extract<CJavascriptObject&>(result);
+
+      if (jsobj.Object()->StrictEquals(obj)) return result;
+
+      it++;
+    }
+  }
+
+  return py::object();
+}
+
+void CJavascriptObjectCache::Put(v8::Isolate *isolate, int hash, py::object wrapper)
+{
+  CPythonGIL python_gil;
+
+  PyObject *ref = ::PyWeakref_NewRef(wrapper.ptr(), NULL);
+
+  if (!ref)
+  {
+    ::PyErr_Clear();
+
+    return;
+  }
+
+  Cache& cache = s_caches[isolate];
+
+  cache.refs.insert(std::make_pair(hash, ref));
+
+  if (cache.refs.size() >= cache.sweep_at) Sweep(cache);
+}
+
+void CJavascriptObjectCache::Sweep(Cache& cache)
+{
+  for (RefMap::iterator it = cache.refs.begin(); it != cache.refs.end();)
+  {
+    if (PyWeakref_GET_OBJECT(it->second) == Py_None)
+    {
+      Py_DECREF(it->second);
+
+      cache.refs.erase(it++);
+    }
+    else
+    {
+      it++;
+    }
+  }
+
+  cache.sweep_at = std::max(s_sweep_size, cache.refs.size() * 2);
+}
+
+void CJavascriptObjectCache::Release(v8::Isolate *isolate)
+{
+  CPythonGIL python_gil;
+
+  CacheMap::iterator cache = s_caches.find(isolate);
+
+  if (cache != s_caches.end())
+  {
+    for (RefMap::iterator it = cache->second.refs.begin(); it != cache->second.refs.end(); it++)
+    {
+      Py_DECREF(it->second);
+    }
+
+    s_caches.erase(cache);
+  }
+}
+
+void CJavascriptString::Expose(void)
+{
+  py::object type = py::class_<CJavascriptString, CJavascriptStringPtr, boost::noncopyable>("JSString", py::no_init)
+    .def("__len__", &CJavascriptString::Length)
+    .def("__str__", &CJavascriptString::Str)
+  #if PY_MAJOR_VERSION < 3
+    .def("__unicode__", &CJavascriptString::Unicode)
+  #else
+    .def("__bytes__", &CJavascriptString::ToBytes)
+  #endif
+    .def("__repr__", &CJavascriptString::Repr)
+
+    .def("__eq__", &CJavascriptString::Equals)
+    .def("__ne__", &CJavascriptString::Unequals)
+    .def("__hash__", &CJavascriptString::Hash)
+
+    .def("tobytes", &CJavascriptString::ToBytes, "Encode the string as UTF-8 without the intermediate Python string.")
+
+    .add_property("oneByte", &CJavascriptString::IsOneByte,
+                  "The string only contains the Latin-1 characters, and exposes them through the buffer protocol.")
+    ;
+
+#if PY_MAJOR_VERSION >= 3
+  static PyBufferProcs s_buffer_procs = { CJavascriptString::GetBuffer, NULL };
+
+  reinterpret_cast<PyTypeObject *>(type.ptr())->tp_as_buffer = &s_buffer_procs;
+#endif
+}
+
+bool CJavascriptString::IsUsable(void) const
+{
+  return v8i::Isolate::Current()->context() && m_isolate == v8::Isolate::GetCurrent();
+}
+
+void CJavascriptString::CheckUsable(void) const
+{
+  if (!IsUsable())
+    throw CJavascriptException("Javascript string out of context", PyExc_UnboundLocalError);
+}
+
+size_t CJavascriptString::Length(void) const
+{
+  CheckUsable();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  return String()->Length();
+}
+
+bool CJavascriptString::IsOneByte(void) const
+{
+  CheckUsable();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  return String()->IsOneByte();
+}
+
+py::object CJavascriptString::Str(void)
+{
+  if (m_value.is_none())
+  {
+    CheckUsable();
+
+    v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+    v8::String::Utf8Value str(String());
+
+    m_value = py::str(*str, str.length());
+  }
+
+  return m_value;
+}
+
+#if PY_MAJOR_VERSION < 3
+
+py::object CJavascriptString::Unicode(void)
+{
+  py::object str = Str();
+
+  return py::object(py::handle<>(::PyUnicode_DecodeUTF8(PyBytes_AS_STRING(str.ptr()), PyBytes_GET_SIZE(str.ptr()), NULL)));
+}
+
+#endif
+
+py::object CJavascriptString::ToBytes(void) const
+{
+  CheckUsable();
+
+  v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+  v8::Handle<v8::String> str = String();
+
+  int len = str->Utf8Length();
+
+  py::object result(py::handle<>(::PyBytes_FromStringAndSize(NULL, len)));
+
+  str->WriteUtf8(PyBytes_AS_STRING(result.ptr()), len, NULL, v8::String::NO_NULL_TERMINATION);
+
+  return result;
+}
+
+bool CJavascriptString::Equals(py::object other)
+{
+  py::extract<CJavascriptString&> extractor(other);
+
+  if (extractor.check())
+  {
+    CheckUsable();
+    extractor().CheckUsable();
+
+    v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+    return String()->StrictEquals(extractor().String());
+  }
+
+#if PY_MAJOR_VERSION < 3
+  py::object self = PyUnicode_Check(other.ptr()) ? Unicode() : Str();
+#else
+  py::object self = Str();
+#endif
+
+  int result = ::PyObject_RichCompareBool(self.ptr(), other.ptr(), Py_EQ);
+
+  if (result < 0) throw py::error_already_set();
+
+  return result == 1;
+}
+
+#if PY_MAJOR_VERSION >= 3
+
+int CJavascriptString::GetBuffer(PyObject *exporter, Py_buffer *view, int flags)
+{
+  py::extract<CJavascriptString&> extractor(exporter);
+
+  if (!extractor.check())
+  {
+    ::PyErr_SetString(::PyExc_BufferError, "not a JSString");
+
+    return -1;
+  }
+
+  CJavascriptString& self = extractor();
+
+  if (self.m_bytes.is_none())
+  {
+    if (!self.IsUsable())
+    {
+      ::PyErr_SetString(::PyExc_UnboundLocalError, "Javascript string out of context");
+
+      return -1;
+    }
+
+    v8::HandleScope handle_scope(v8::Isolate::GetCurrent());
+
+    v8::Handle<v8::String> str = self.String();
+
+    if (!str->IsOneByte())
+    {
+      ::PyErr_SetString(::PyExc_BufferError, "the string has no one-byte representation");
+
+      return -1;
+    }
+
+    PyObject *data = ::PyBytes_FromStringAndSize(NULL, str->Length());
+
+    if (!data) return -1;
+
+    str->WriteOneByte(reinterpret_cast<uint8_t *>(PyBytes_AS_STRING(data)), 0, -1, v8::String::NO_NULL_TERMINATION);
+
+    self.m_bytes = py::object(py::handle<>(data));
+  }
+
+  return ::PyBuffer_FillInfo(view, exporter, PyBytes_AS_STRING(self.m_bytes.ptr()), PyBytes_GET_SIZE(self.m_bytes.ptr()), 1, flags);
+}
+
+#endif
+
+py::object CJavascriptString::Wrap(v8::Handle<v8::String> str)
+{
+  CPythonGIL python_gil;
+
+  return py::object(CJavascriptStringPtr(new CJavascriptString(str)));
+}
+
 #ifdef SUPPORT_TRACE_LIFECYCLE
 
 ObjectTracer::ObjectTracer(v8::Handle<v8::Value> handle, py::object *object)
@@ -1,6 +1,8 @@
 #pragma once
 
 #include <map>
+#include <list>
+#include <vector>
 #include <sstream>
 
 #include <boost/shared_ptr.hpp>
@@ -14,6 +16,10 @@ class CJavascriptFunction;
 typedef boost::shared_ptr<CJavascriptObject> CJavascriptObjectPtr;
 typedef boost::shared_ptr<CJavascriptFunction> CJavascriptFunctionPtr;
 
+class CJavascriptString;
+
+typedef boost::shared_ptr<CJavascriptString> CJavascriptStringPtr;
+
 struct CWrapper
 {
   static void Expose(void);
@@ -21,6 +27,8 @@ struct CWrapper
 
 class CPythonObject : public CWrapper
 {
+  friend class CPythonClass;
+
   static void NamedGetter(v8::Local<v8::String> prop, const v8::PropertyCallbackInfo<v8::Value>& info);
   static void NamedSetter(v8::Local<v8::String> prop, v8::Local<v8::Value> value, const v8::PropertyCallbackInfo<v8::Value>& info);
   static void NamedQuery(v8::Local<v8::String> prop, const v8::PropertyCallbackInfo<v8::Integer>& info);
@@ -43,13 +51,165 @@ protected:
   static v8::Handle<v8::ObjectTemplate> CreateObjectTemplate(v8::Isolate *isolate);
 
   static v8::Handle<v8::Value> WrapInternal(py::object obj);
+  static v8::Local<v8::Value> WrapInteger(PyObject *obj);
+
+  static bool s_raiseOnPrecisionLoss;
+
+  typedef std::map<PyObject *, v8::Handle<v8::Value> > CopyMemo;
+
+  static v8::Handle<v8::Value> CopyInternal(py::object obj, bool deep, CopyMemo& memo);
 public:
   static bool IsWrapped(v8::Handle<v8::Object> obj);
   static v8::Handle<v8::Value> Wrap(py::object obj);
+  static v8::Handle<v8::Value> Copy(py::object obj, bool deep = true);
   static py::object Unwrap(v8::Handle<v8::Object> obj);
   static void Dispose(v8::Handle<v8::Value> value);
 
   static void ThrowIf(v8::Isolate* isolate);
+
+  static bool GetRaiseOnPrecisionLoss(void) { return s_raiseOnPrecisionLoss; }
+  static void SetRaiseOnPrecisionLoss(bool value) { s_raiseOnPrecisionLoss = value; }
+};
+
+class CPythonFunction
+{
+  py::object m_func;
+  std::string m_signature;
+  v8::Persistent<v8::Function> m_handle;
+
+  CPythonFunction(py::object func, const std::string& signature)
+    : m_func(func), m_signature(signature)
+  {
+  }
+
+  static std::string ParseSignature(py::object signature);
+
+  static PyObject *Convert(char kind, int index, v8::Handle<v8::Value> value);
+
+  static void Caller(const v8::FunctionCallbackInfo<v8::Value>& info);
+  static void WeakCallback(const v8::WeakCallbackData<v8::Function, CPythonFunction>& data);
+public:
+  static v8::Handle<v8::Function> Create(py::object func, py::object signature, py::object name = py::object());
+};
+
+//
+// The Python buffers are passed to JavaScript as the typed arrays. A writable buffer with a fixed size
+// is shared until V8 collects the typed array, the resizable bytearray and array.array are copied,
+// since an exported buffer can't be resized, pass a memoryview of them to share the memory.
+// The typed arrays owned by JavaScript are converted to the memoryviews of a copy.
+//
+class CPythonBuffer
+{
+  Py_buffer m_view;
+  bool m_acquired;
+  v8::Persistent<v8::ArrayBuffer> m_handle;
+
+  CPythonBuffer() : m_acquired(false)
+  {
+  }
+
+  static bool IsResizable(PyObject *obj);
+
+  static char GetKind(const Py_buffer& view);
+  static char GetKind(v8::Handle<v8::Object> obj);
+
+  static v8::Local<v8::Value> NewTypedArray(char kind, v8::Handle<v8::ArrayBuffer> buffer, size_t length);
+  static v8::Handle<v8::String> GetHiddenKey(v8::Isolate *isolate);
+
+  static void WeakCallback(const v8::WeakCallbackData<v8::ArrayBuffer, CPythonBuffer>& data);
+public:
+  ~CPythonBuffer();
+
+  static void Initialize(void);
+
+  static bool IsBuffer(py::object obj);
+  static bool IsBuffer(v8::Handle<v8::Object> obj) { return obj->IsArrayBuffer() || obj->IsArrayBufferView(); }
+
+  static v8::Local<v8::Value> Wrap(py::object obj);
+  static py::object Unwrap(v8::Handle<v8::Object> obj);
+};
+
+class CPythonNames
+{
+  struct Entry
+  {
+    uint32_t hash;
+    v8::Persistent<v8::String> name;
+    py::object str;
+
+    ~Entry() { name.Reset(); }
+  };
+
+  typedef std::list<Entry *> EntryList;
+  typedef std::map<uint32_t, EntryList::iterator> HashMap;
+  typedef std::map<PyObject *, EntryList::iterator> StrMap;
+  typedef std::map<v8::Isolate *, CPythonNames *> NamesMap;
+
+  static NamesMap s_names;
+  static size_t s_capacity;
+
+  v8::Isolate *m_isolate;
+  EntryList m_entries;
+  HashMap m_hashes;
+  StrMap m_strs;
+
+  CPythonNames(v8::Isolate *isolate) : m_isolate(isolate) {}
+
+  static CPythonNames *GetNames(v8::Isolate *isolate);
+
+  void Remove(EntryList::iterator it);
+  EntryList::iterator Insert(uint32_t hash, v8::Handle<v8::String> name, py::object str);
+public:
+  ~CPythonNames();
+
+  // the interned Python str of the V8 property name
+  static py::object Get(v8::Isolate *isolate, v8::Handle<v8::String> name);
+  // the internalized V8 string of the Python attribute name
+  static v8::Handle<v8::Value> Get(v8::Isolate *isolate, py::object name);
+
+  static void Release(v8::Isolate *isolate);
+};
+
+class CPythonClass
+{
+  struct Entry
+  {
+    CPythonClass *clazz;
+    py::object ref; // the weak reference of a heap type, the entry is dropped when the type dies
+  };
+
+  typedef std::map<std::pair<v8::Isolate *, PyObject *>, Entry> ClassMap;
+  typedef std::multimap<v8::Isolate *, CPythonClass *> ClassList;
+
+  static ClassMap s_classes;
+  static ClassList s_orphans;
+
+  std::list<py::object> m_methods; // the names of the methods, referenced by the callback data
+  py::object m_names;
+  v8::Persistent<v8::FunctionTemplate> m_template;
+
+  CPythonClass(v8::Isolate *isolate, py::object type);
+
+  static bool IsTemplated(PyTypeObject *type);
+
+  static PyObject *OnTypeDeleted(PyObject *self, PyObject *ref);
+  static void ReleaseOrphans(v8::Isolate *isolate);
+
+  template <typename T>
+  static py::object FindInstance(const v8::PropertyCallbackInfo<T>& info);
+
+  static void MethodCaller(const v8::FunctionCallbackInfo<v8::Value>& info);
+  static void PropertyGetter(v8::Local<v8::String> prop, const v8::PropertyCallbackInfo<v8::Value>& info);
+  static void PropertySetter(v8::Local<v8::String> prop, v8::Local<v8::Value> value, const v8::PropertyCallbackInfo<void>& info);
+public:
+  ~CPythonClass() { m_template.Reset(); }
+
+  bool IsDeclared(py::object obj, py::object name) const;
+
+  v8::Handle<v8::Object> NewInstance(v8::Isolate *isolate) const;
+
+  static CPythonClass *Get(v8::Isolate *isolate, py::object obj);
+  static void Release(v8::Isolate *isolate);
 };
 
 struct ILazyObject
@@ -64,21 +224,36 @@ protected:
 
   void CheckAttr(v8::Handle<v8::String> name) const;
 
+  typedef std::multimap<int, std::pair<v8::Handle<v8::Object>, py::object> > ConvertMemo;
+
+  static bool s_integralNumbersAsInt;
+
+  static py::object Convert(v8::Handle<v8::Value> value, v8::Handle<v8::Object> self,
+                            int depth, int& budget, ConvertMemo& memo, v8::TryCatch& try_catch);
+
+  static int64_t s_alive;
+
   CJavascriptObject()
   {
-
+    ATOMIC_ADD(s_alive, 1);
   }
 public:
   CJavascriptObject(v8::Handle<v8::Object> obj)
     : m_obj(v8::Isolate::GetCurrent(), obj)
   {
+    ATOMIC_ADD(s_alive, 1);
   }
 
   virtual ~CJavascriptObject()
   {
     m_obj.Reset();
+
+    ATOMIC_ADD(s_alive, -1);
   }
 
+  // the wrappers alive in the process, across all the isolates
+  static int64_t GetAliveCount(void) { return s_alive; }
+
   v8::Local<v8::Object> Object(void) const { return v8::Local<v8::Object>::New(v8::Isolate::GetCurrent(), m_obj); }
 
   py::object GetAttr(const std::string& name);
@@ -92,6 +267,9 @@ public:
 
   bool Contains(const std::string& name);
 
+  py::object ToPython(int depth = -1, int max_items = -1);
+  py::object ToJSON(void);
+
   operator long() const;
   operator double() const;
   operator bool() const;
@@ -101,6 +279,9 @@ public:
 
   void Dump(std::ostream& os) const;
 
+  static bool GetIntegralNumbersAsInt(void) { return s_integralNumbersAsInt; }
+  static void SetIntegralNumbersAsInt(bool value) { s_integralNumbersAsInt = value; }
+
   static py::object Wrap(CJavascriptObject *obj);
   static py::object Wrap(v8::Handle<v8::Value> value,
     v8::Handle<v8::Object> self = v8::Handle<v8::Object>());
@@ -125,34 +306,57 @@ public:
 class CJavascriptArray : public CJavascriptObject, public ILazyObject
 {
   py::object m_items;
-  size_t m_size;
 public:
+  static const size_t CHUNK_SIZE = 256;
+
+  // fetch the items in chunks, each of them is converted in a single scope
   class ArrayIterator
     : public boost::iterator_facade<ArrayIterator, py::object const, boost::forward_traversal_tag, py::object>
   {
+    struct Chunk
+    {
+      size_t start;
+      std::vector<py::object> items;
+    };
+
     CJavascriptArray *m_array;
     size_t m_idx;
+
+    // shared by the copies, boost.python copies the iterator on each step
+    boost::shared_ptr<Chunk> m_chunk;
   public:
     ArrayIterator(CJavascriptArray *array, size_t idx)
-      : m_array(array), m_idx(idx)
+      : m_array(array), m_idx(idx), m_chunk(new Chunk())
     {
+      m_chunk->start = 0;
     }
 
     void increment() { m_idx++; }
 
     bool equal(ArrayIterator const& other) const { return m_array == other.m_array && m_idx == other.m_idx; }
 
-    reference dereference() const { return m_array->GetItem(py::long_(m_idx)); }
+    reference dereference() const
+    {
+      Chunk& chunk = *m_chunk;
+
+      if (m_idx < chunk.start || m_idx >= chunk.start + chunk.items.size())
+      {
+        m_array->Fetch(m_idx, CHUNK_SIZE, chunk.items);
+        chunk.start = m_idx;
+      }
+
+      return chunk.items[m_idx - chunk.start];
+    }
   };
 
   CJavascriptArray(v8::Handle<v8::Array> array)
-    : CJavascriptObject(array), m_size(array->Length())
+    : CJavascriptObject(array)
   {
 
   }
 
   CJavascriptArray(py::object items)
-    : m_items(items), m_size(0)
+    : m_items(items)
   {
   }
 
@@ -163,6 +367,11 @@ public:
   py::object DelItem(py::object key);
   bool Contains(py::object item);
 
+  py::list ToDates(py::object tz);
+  py::object ToList(void);
+
+  void Fetch(size_t start, size_t count, std::vector<py::object>& items);
+
   ArrayIterator begin(void) { return ArrayIterator(this, 0);}
   ArrayIterator end(void) { return ArrayIterator(this, Length());}
 
@@ -175,6 +384,7 @@ class CJavascriptFunction : public CJavascriptObject
   v8::Persistent<v8::Object> m_self;
 
   py::object Call(v8::Handle<v8::Object> self, py::list args, py::dict kwds);
+  py::list CallMany(py::object iterable, size_t chunk, bool unpack);
 public:
   CJavascriptFunction(v8::Handle<v8::Object> self, v8::Handle<v8::Function> func)
     : CJavascriptObject(func), m_self(v8::Isolate::GetCurrent(), self)
@@ -195,6 +405,9 @@ public:
   py::object ApplyPython(py::object self, py::list args, py::dict kwds);
   py::object Invoke(py::list args, py::dict kwds);
 
+  py::list Map(py::object iterable, size_t chunk) { return CallMany(iterable, chunk, false); }
+  py::list StarMap(py::object iterable, size_t chunk) { return CallMany(iterable, chunk, true); }
+
   const std::string GetName(void) const;
   void SetName(const std::string& name);
 
@@ -208,6 +421,85 @@ public:
   py::object GetOwner(void) const;
 };
 
+//
+// A JavaScript string result which keeps the V8 handle,
+// and only converts to the Python string when it is used as one.
+//
+class CJavascriptString
+{
+  v8::Isolate *m_isolate;
+  v8::Persistent<v8::String> m_str;
+  py::object m_value;
+  py::object m_bytes;
+
+  // the handle can only be used in a context of the isolate which created it
+  bool IsUsable(void) const;
+  void CheckUsable(void) const;
+
+#if PY_MAJOR_VERSION >= 3
+  static int GetBuffer(PyObject *exporter, Py_buffer *view, int flags);
+#endif
+public:
+  CJavascriptString(v8::Handle<v8::String> str)
+    : m_isolate(v8::Isolate::GetCurrent()), m_str(m_isolate, str)
+  {
+  }
+
+  ~CJavascriptString()
+  {
+    m_str.Reset();
+  }
+
+  v8::Local<v8::String> String(void) const { return v8::Local<v8::String>::New(v8::Isolate::GetCurrent(), m_str); }
+
+  size_t Length(void) const;
+  bool IsOneByte(void) const;
+
+  py::object Str(void);
+#if PY_MAJOR_VERSION < 3
+  py::object Unicode(void);
+#endif
+  py::object ToBytes(void) const;
+  py::object Repr(void) { return py::object(py::handle<>(::PyObject_Repr(Str().ptr()))); }
+
+  bool Equals(py::object other);
+  bool Unequals(py::object other) { return !Equals(other); }
+  long Hash(void) { return ::PyObject_Hash(Str().ptr()); }
+
+  static py::object Wrap(v8::Handle<v8::String> str);
+
+  static void Expose(void);
+};
+
+//
+// Per-isolate identity cache of the Python wrappers of the JavaScript objects and arrays,
+// the wrappers are weakly referenced and the dead entries are pruned lazily.
+//
+class CJavascriptObjectCache
+{
+  typedef std::multimap<int, PyObject *> RefMap;
+
+  struct Cache
+  {
+    RefMap refs;
+    size_t sweep_at;
+
+    Cache() : sweep_at(s_sweep_size) {}
+  };
+
+  typedef std::map<v8::Isolate *, Cache> CacheMap;
+
+  static CacheMap s_caches;
+  static const size_t s_sweep_size = 1024;
+
+  static void Sweep(Cache& cache);
+public:
+  static py::object Get(v8::Isolate *isolate, v8::Handle<v8::Object> obj, int hash);
+  static void Put(v8::Isolate *isolate, int hash, py::object wrapper);
+
+  static void Release(v8::Isolate *isolate);
+};
+
 #ifdef SUPPORT_TRACE_LIFECYCLE
 
 class ObjectTracer;
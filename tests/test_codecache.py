@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+from v8 import *
+
+@pytest.fixture
+def cache(tmpdir):
+    return JSCodeCache(str(tmpdir.join('cache')), min_source_size=0)
+
+def testStore(cache):
+    assert cache.get("1+2") is None
+
+    with JSEngine() as engine:
+        precompiled = engine.precompile("1+2")
+
+        cache.put("1+2", precompiled)
+
+    data = cache.get("1+2")
+
+    assert data
+    assert bytes(precompiled) == data[:]
+    assert 1 == len(cache)
+
+    with JSContext() as ctxt:
+        with JSEngine() as engine:
+            assert 3 == int(engine.compile("1+2", precompiled=data).run())
+
+    assert cache.get("1+3") is None
+
+    cache.clear()
+
+    assert 0 == len(cache)
+
+def testLoad(cache):
+    data = cache.load("1+2")
+
+    assert data
+    assert 1 == len(cache)
+    assert cache.load("1+") is None
+
+    with JSContext() as ctxt:
+        with JSEngine() as engine:
+            s = engine.compile("1+2", precompiled=cache.load("1+2"))
+
+            assert 3 == int(s.run())
+
+def testEvict(cache):
+    sources = ["%d+%d" % (i, i) for i in range(4)]
+
+    for i, source in enumerate(sources):
+        cache.load(source)
+
+        os.utime(cache.filename(source), (i, i))
+
+    cache.max_size = cache.size // 2
+    cache.evict()
+
+    assert 2 == len(cache)
+    assert cache.get(sources[0]) is None
+    assert cache.get(sources[-1])
+
+def testEngineCodeCache(cache):
+    assert JSEngine.codeCache is None
+
+    JSEngine.codeCache = cache
+
+    try:
+        with JSContext() as ctxt:
+            assert 4 == ctxt.eval("2+2")
+            assert 1 == len(cache)
+            assert 4 == ctxt.eval("2+2")
+            assert 1 == len(cache)
+    finally:
+        JSEngine.codeCache = None
+
+def testPutEvict(cache):
+    cache.max_size = 64
+
+    for i in range(8):
+        cache.put("%d+%d" % (i, i), b'x' * 16)
+
+        assert cache.size <= 64
+
+    assert 4 == len(cache)
@@ -120,3 +120,58 @@ def test_cross_domain_delete():
 
         # Check that env1.prop still exists.
         assert 3 == int(env1.locals.prop)
+
+def test_to_js():
+    import v8
+
+    data = {'a': [1, 2, (3, 4)], 'b': {'c': 'd'}}
+    data['self'] = data
+
+    with JSContext() as ctxt:
+        obj = ctxt.to_js(data)
+
+        assert isinstance(obj, JSObject)
+        assert isinstance(obj.a, JSArray)
+
+        func = ctxt.eval("""(function (o) {
+            return [Array.isArray(o.a), Array.isArray(o.a[2]), o.a[2][1], o.b.c, o.self === o];
+        })""")
+
+        assert [True, True, 4, 'd', True] == list(func(obj))
+
+        shallow = v8.copy(data, deep=False)
+
+        assert [False, False] == list(func(shallow))[:2]
+        assert 3 == len(v8.copy([1, 2, 3]))
+
+    pytest.raises(UnboundLocalError, v8.copy, data)
+
+def test_parse_json():
+    with JSContext() as ctxt:
+        obj = ctxt.parse_json(b'{"a": [1, 2.5, "x"], "b": null}')
+
+        assert isinstance(obj, JSObject)
+        assert [1, 2.5, 'x'] == list(obj.a)
+        assert obj.b is None
+
+        assert 3 == ctxt.parse_json(u'3')
+        assert 2 == len(ctxt.parse_json(bytearray(b'[1, 2]')))
+
+        pytest.raises(SyntaxError, ctxt.parse_json, b'{')
+
+def test_heap_stats():
+    with JSContext() as ctxt:
+        stats = JSIsolate.current.heap_stats()
+
+        assert 0 < stats['used_heap_size'] <= stats['total_heap_size']
+        assert stats['heap_size_limit']
+
+        assert set(['new', 'old_pointer', 'old_data', 'code', 'map', 'cell', 'property_cell', 'large_object']) == set(stats['spaces'])
+        assert all(0 <= space['used'] <= space['committed'] for space in stats['spaces'].values())
+        assert 0 <= stats['external_memory']
+
+        live = JSEngine.liveWrappers
+
+        objs = [ctxt.eval("({})") for i in range(10)]
+
+        assert live + 10 <= JSEngine.liveWrappers
@@ -274,6 +274,104 @@ def testMemoryAllocationCallback():
 
     JSEngine.setMemoryAllocationCallback(None)
 
+def testAllocationStats():
+    samples = []
+
+    JSEngine.allocationTracking = True
+    JSEngine.setAllocationCallback(samples.append, threshold=1024)
+
+    try:
+        JSEngine.allocation_stats(reset=True)
+
+        with JSContext() as ctxt:
+            ctxt.eval("var a = []; for (var i=0; i<16; i++) a.push(new Array(256 * 1024));")
+
+        stats = JSEngine.allocation_stats()
+
+        assert set(['new', 'old_pointer', 'old_data', 'code', 'map', 'cell', 'property_cell', 'large_object']) == set(stats)
+        assert 256 * 1024 * 16 < sum(space['allocated'] for space in stats.values())
+        assert stats['large_object']['allocations']
+
+        JSEngine.allocation_stats(reset=True)
+
+        assert 0 == sum(space['allocations'] for space in JSEngine.allocation_stats().values())
+        assert samples
+    finally:
+        JSEngine.setAllocationCallback(None)
+        JSEngine.allocationTracking = False
+
+def testGCStats():
+    records = []
+
+    JSEngine.gcTracking = True
+    JSEngine.setGCCallback(records.append)
+
+    try:
+        JSEngine.gc_stats(reset=True)
+
+        with JSContext() as ctxt:
+            ctxt.eval("var a = []; for (var i=0; i<16; i++) a.push(new Array(256 * 1024)); a = null;")
+
+            JSEngine.collect()
+
+        stats = JSEngine.gc_stats()
+
+        assert stats['count'] > 0
+        assert stats['count'] == stats['scavenges'] + stats['mark_sweeps']
+        assert stats['mark_sweeps'] > 0
+        assert 0 <= stats['p50_pause'] <= stats['p99_pause'] <= stats['max_pause'] <= stats['total_pause']
+
+        history = JSEngine.gc_history()
+
+        assert stats['count'] == len(history)
+        assert set(['scavenge', 'mark_sweep_compact']) >= set(record['type'] for record in history)
+        assert any(record['reclaimed'] > 0 for record in history)
+
+        assert records
+
+        JSEngine.gc_stats(reset=True)
+
+        assert 0 == JSEngine.gc_stats()['count']
+        assert [] == JSEngine.gc_history()
+    finally:
+        JSEngine.setGCCallback(None)
+        JSEngine.gcTracking = False
+
+def testMemoryLimit():
+    with JSIsolate() as isolate:
+        with JSContext() as ctxt:
+            assert 0 == isolate.memoryLimit
+
+            isolate.memoryLimit = isolate.heap_stats()['used_heap_size'] + 8 * 1024 * 1024
+
+            try:
+                with pytest.raises(JSMemoryLimitExceeded):
+                    ctxt.eval("var a = []; while(true) a.push([1, 2, 3]);")
+
+                with pytest.raises(MemoryError):
+                    ctxt.eval("try { var b = []; while(true) b.push([1, 2, 3]); } catch (e) {} 'caught'")
+
+                # the nested call raises, but the outer script still can't catch the termination
+
+                ctxt.locals.grow = lambda: ctxt.eval("var c = []; while(true) c.push([1, 2, 3]);")
+
+                with pytest.raises(JSMemoryLimitExceeded):
+                    ctxt.eval("try { grow(); } catch (e) {} 'caught'")
+
+                # a few shared strings, but their JSON doesn't fit in the limit
+
+                d = ctxt.eval("var s = new Array(65536).join('x'), d = []; for (var i = 0; i < 1024; i++) d.push(s); d")
+
+                with pytest.raises(JSMemoryLimitExceeded):
+                    d.to_json()
+
+                assert 3 == ctxt.eval("1 + 2")
+            finally:
+                isolate.memoryLimit = 0
+
+            assert 0 == isolate.memoryLimit
+            assert 3 == ctxt.eval("1 + 2")
+
 def testOutOfMemory():
     with JSIsolate():
         JSEngine.setMemoryLimit(max_young_space_size=16 * 1024, max_old_space_size=4 * 1024 * 1024)
@@ -303,3 +401,61 @@ def testStackLimit():
             newStackSize = ctxt.eval("var maxStackSize = function(i){try{(function m(){++i&&m()}())}catch(e){return i}}(0); maxStackSize")
 
     assert newStackSize > oldStackSize * 2
+
+def testScriptCache():
+    with JSContext() as ctxt:
+        JSEngine.enableScriptCache(max_count=2)
+
+        try:
+            for i in range(3):
+                assert 3 == ctxt.eval("1+2")
+
+            stats = JSEngine.scriptCacheStats
+
+            assert stats['enabled']
+            assert 1 == stats['misses']
+            assert 2 == stats['hits']
+            assert 1 == stats['count']
+
+            ctxt.eval("1+3")
+            ctxt.eval("1+4")
+
+            stats = JSEngine.scriptCacheStats
+
+            assert 2 == stats['count']
+            assert 1 == stats['evictions']
+
+            # the cached script should run in the current context
+
+            with JSContext() as ctxt2:
+                ctxt2.eval("var owner = 'ctxt2'")
+
+                assert 'ctxt2' == ctxt2.eval("typeof owner == 'undefined' ? null : owner")
+
+            assert None == ctxt.eval("typeof owner == 'undefined' ? null : owner")
+
+            JSEngine.clearScriptCache()
+
+            assert 0 == JSEngine.scriptCacheStats['count']
+        finally:
+            JSEngine.disableScriptCache()
+
+        assert not JSEngine.scriptCacheStats['enabled']
+
+def testExternalString():
+    assert 0 == JSEngine.externalStringThreshold
+
+    JSEngine.externalStringThreshold = 16
+
+    try:
+        with JSContext() as ctxt:
+            length = ctxt.eval("(function (s) { return s.length; })")
+            concat = ctxt.eval("(function (s) { return s + s.charAt(0); })")
+
+            for s in ['x' * 1000, u'中' * 1000, b'y' * 1000, 'short']:
+                assert len(s) == length(s)
+
+            assert 'abc' * 10 + 'a' == concat('abc' * 10)
+            assert u'中' * 20 + u'中' == concat(u'中' * 20)
+    finally:
+        JSEngine.externalStringThreshold = 0
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import pytest
+from v8 import *
+
+pytest.importorskip("concurrent.futures")
+
+from v8.executor import JSProcessPoolExecutor
+
+def test_eval_and_call(tmpdir):
+    preload = ["function double(x) { return { value: x * 2 }; }"]
+
+    with JSProcessPoolExecutor(2, preload=preload, code_cache=str(tmpdir)) as executor:
+        assert 3 == executor.eval("1+2").result(timeout=30)
+        assert {'value': 4} == executor.call("double", [2]).result(timeout=30)
+        assert {'value': 6} == executor.call("double", [3], marshal='pickle').result(timeout=30)
+        assert [1, 2] == executor.call("(function (a) { return a; })", [[1, 2]]).result(timeout=30)
+
+        pytest.raises(SyntaxError, executor.eval("1+").result, 30)
+        pytest.raises(RuntimeError, executor.eval("throw new Error('fail')").result, 30)
+        pytest.raises(ValueError, executor.eval, "1", marshal='xml')
+
+    pytest.raises(RuntimeError, executor.eval, "1+2")
+
+def test_unpicklable_result():
+    with JSProcessPoolExecutor(1, marshal='pickle') as executor:
+        pytest.raises(RuntimeError, executor.eval("(function () {})").result, 30)
+
+        assert [1, 2] == executor.eval("[1, 2]").result(timeout=30)
+
+def test_broken_preload():
+    with JSProcessPoolExecutor(2, preload=["1+"]) as executor:
+        with pytest.raises(RuntimeError):
+            executor.eval("1+2").result(timeout=30)
+
+        assert executor.stats['broken']
+
+        pytest.raises(RuntimeError, executor.eval, "1+2")
+
+def test_recycle():
+    with JSProcessPoolExecutor(1, max_jobs=2) as executor:
+        assert list(range(5)) == [executor.eval(str(i)).result(timeout=30) for i in range(5)]
+
+    assert 3 <= executor.stats['started']
+    assert 2 <= executor.stats['recycled']
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+from v8 import *
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+def testRequestBoundaries():
+    scheduler = IdleScheduler(min_budget=0)
+
+    with JSContext() as ctxt:
+        for i in range(4):
+            with scheduler.request():
+                ctxt.eval("var a = []; for (var i=0; i<1024; i++) a.push({});")
+
+            time.sleep(0.01)
+
+    stats = scheduler.stats
+
+    assert 4 == stats['requests']
+    assert 4 == stats['notifications'] + stats['low_memory']
+    assert 0.03 <= stats['idle_time']
+    assert 0.01 <= stats['expected_gap']
+
+def testHeapGrowth():
+    scheduler = IdleScheduler(heap_growth=1.0, min_heap_growth=1024)
+
+    with JSContext() as ctxt:
+        with scheduler.request():
+            pass
+
+        with scheduler.request():
+            ctxt.eval("var a = []; for (var i=0; i<16; i++) a.push(new Array(64 * 1024));")
+
+    assert 1 == scheduler.stats['low_memory']
+
+@pytest.mark.skipif(asyncio is None, reason="requires asyncio")
+def testAsyncio():
+    scheduler = IdleScheduler(min_budget=0)
+    loop = asyncio.new_event_loop()
+
+    try:
+        with JSContext() as ctxt:
+            scheduler.attach(loop, interval=0.01)
+
+            loop.run_until_complete(asyncio.sleep(0.1))
+
+            scheduler.detach()
+    finally:
+        loop.close()
+
+    stats = scheduler.stats
+
+    assert stats['notifications'] + stats['low_memory']
+    assert stats['budget'] <= stats['notifications'] * 0.01 * scheduler.ratio + 1e-9
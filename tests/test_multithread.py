@@ -106,3 +106,40 @@ def test_multi_javascript_thread():
     for t in threads: t.join()
 
     assert 20 == len(g.result)
+
+def test_isolate_pool():
+    pytest.importorskip("concurrent.futures")
+
+    with JSIsolatePool(2) as pool:
+        futures = [pool.submit("(function (x) { return { x: x, y: [x * 2] }; })", [i]) for i in range(8)]
+
+        assert [{'x': i, 'y': [i * 2]} for i in range(8)] == [f.result(timeout=10) for f in futures]
+
+        assert 3 == pool.submit("1+2").result(timeout=10)
+        assert [2, 4] == pool.map("(function (x) { return x * 2; })", [[1], [2]])
+
+        with pytest.raises(JSError) as exc:
+            pool.submit("throw new Error('fail')").result(10)
+
+        assert 'Error' == exc.value.name
+        assert 'fail' == exc.value.message
+        assert 'fail' in str(exc.value)
+
+        pytest.raises(SyntaxError, pool.submit("1+").result, 10)
+
+        pytest.raises(TypeError, pool.submit("(function () {})").result, 10)
+        pytest.raises(TypeError, pool.submit("({ a: [1, function () {}] })").result, 10)
+        assert None == pool.submit("null").result(timeout=10)
+
+    pytest.raises(RuntimeError, pool.submit, "1+2")
+
+def test_isolate_pool_broken():
+    pytest.importorskip("concurrent.futures")
+
+    def global_factory():
+        raise ValueError("no global")
+
+    with JSIsolatePool(2, global_factory=global_factory) as pool:
+        # the job may be queued before or after the workers fail, it fails either way
+        pytest.raises(ValueError, pool.submit("1+2").result, 10)
+        pytest.raises(ValueError, pool.submit("1+2").result, 10)
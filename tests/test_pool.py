@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import pytest
+from v8 import *
+
+def test_context_pool_restore():
+    class Global(JSClass):
+        name = "global"
+
+    pool = JSContextPool(2, global_factory=Global, reset='restore')
+
+    assert 2 == pool.idle
+    assert 2 == pool.stats['created']
+
+    for i in range(4):
+        with pool.acquire() as ctxt:
+            assert "undefined" == ctxt.eval("typeof leaked")
+            assert "global" == ctxt.eval("name")
+
+            ctxt.eval("var leaked = 1; implicit = 2; Math = null;")
+
+        assert 2 == pool.idle
+
+    with pool.acquire() as ctxt:
+        assert "object" == ctxt.eval("typeof Math")
+        assert "undefined" == ctxt.eval("typeof implicit")
+
+    stats = pool.stats
+
+    assert 2 == stats['created']
+    assert 5 == stats['acquired']
+    assert 3 == stats['reused']
+    assert 0 == stats['discarded']
+
+def test_context_pool_recreate():
+    pool = JSContextPool(1, reset='recreate')
+
+    with pool.acquire() as ctxt:
+        ctxt.eval("var leaked = 1;")
+
+    assert 1 == pool.idle
+
+    with pool.acquire() as ctxt:
+        assert "undefined" == ctxt.eval("typeof leaked")
+
+    stats = pool.stats
+
+    assert 3 == stats['created']
+    assert 2 == stats['recreated']
+    assert 0 == stats['reused']
+    assert 0 == stats['discarded']
+
+def test_context_pool_exhausted():
+    pool = JSContextPool(1)
+
+    with pool.acquire():
+        pytest.raises(JSPoolTimeout, lambda: pool.acquire(timeout=0.01).__enter__())
+
+    pytest.raises(ValueError, JSContextPool, 1, reset='unknown')
+
+def test_context_pool_discard():
+    pool = JSContextPool(1)
+
+    with pool.acquire() as ctxt:
+        # the accessor can't be deleted nor reset, so the restore fails
+        ctxt.eval("Object.defineProperty(this, 'stuck', { set: function () { throw new Error(); } });")
+
+    assert 1 == pool.idle
+
+    with pool.acquire() as ctxt:
+        assert "undefined" == ctxt.eval("typeof stuck")
+
+    stats = pool.stats
+
+    assert 2 == stats['created']
+    assert 1 == stats['recreated']
+    assert 1 == stats['discarded']
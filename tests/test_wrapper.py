@@ -580,6 +580,330 @@ def testDict():
                        d: true,
                        e: null }; x"""))
 
+def testToPython():
+    with JSContext() as ctxt:
+        obj = ctxt.eval("var x = { a: [1, 2.5, 'b'], c: { d: null } }; x.self = x; x.e = x.a; x")
+        result = obj.to_python()
+
+        assert [1, 2.5, 'b'] == result['a']
+        assert {'d': None} == result['c']
+        assert result['self'] is result
+        assert result['e'] is result['a']
+
+        shallow = obj.to_python(depth=1)
+
+        assert isinstance(shallow['c'], JSObject)
+        assert [[1]] == ctxt.eval("[[1]]").to_python()
+
+        pytest.raises(ValueError, obj.to_python, max_items=4)
+
+        # RecursionError is a RuntimeError, which Python 2 raises instead
+
+        chain = ctxt.eval("var head = null; for (var i=0; i<100000; i++) head = { next: head }; head")
+
+        pytest.raises(RuntimeError, chain.to_python)
+
+        node = chain.to_python(depth=100)
+
+        for _ in range(99):
+            node = node['next']
+
+        assert isinstance(node['next'], JSObject)
+
+def testBuffer():
+    import array
+
+    with JSContext() as ctxt:
+        data = bytearray(b'abc')
+        func = ctxt.eval("(function (a) { a[0] = 65; return a; })")
+
+        assert ctxt.eval("(function (a) { return a instanceof Uint8Array; })")(data)
+
+        # the resizable bytearray is copied, so it can still be resized
+
+        assert b'Abc' == func(data).tobytes()
+        assert b'abc' == bytes(data)
+
+        data.extend(b'd')
+
+        # a memoryview shares the memory
+
+        func(memoryview(data))
+
+        assert b'Abcd' == bytes(data)
+
+        # the typed arrays owned by JavaScript are copied
+
+        view = ctxt.eval("var x = new Uint8Array([1, 2, 3]); x")
+
+        assert isinstance(view, memoryview)
+        assert b'\x01\x02\x03' == view.tobytes()
+
+        view[0] = 9
+
+        assert 1 == ctxt.eval("x[0]")
+
+        if is_py3k:
+            assert [1, -2, 3] == ctxt.eval("new Int32Array([1, -2, 3])").tolist()
+
+            numbers = array.array('d', [1.5, 2.5])
+
+            assert 4.0 == ctxt.eval("(function (a) { return a instanceof Float64Array && a[0] + a[1]; })")(numbers)
+
+            shared = ctxt.eval("(function (a) { return a.subarray(1); })")(memoryview(numbers))
+
+            assert [2.5] == shared.tolist()
+
+            shared[0] = 5.0
+
+            assert 5.0 == numbers[1]
+
+def testRawString():
+    with JSContext() as ctxt:
+        s = ctxt.eval("var s = 'hello ' + 'world'; s", raw=True)
+
+        assert isinstance(s, JSString)
+        assert 11 == len(s)
+        assert 'hello world' == str(s)
+        assert s == 'hello world'
+        assert s != 'hello'
+        assert s == ctxt.eval("s", raw=True)
+        assert hash('hello world') == hash(s)
+        assert b'hello world' == s.tobytes()
+        assert s.oneByte
+
+        assert 'hello world!' == ctxt.eval("(function (s) { return s + '!'; })")(s)
+        assert 'hello world' == ctxt.eval("s")
+        assert 3 == ctxt.eval("1+2", raw=True)
+
+        u = ctxt.eval(u"'\u4e2d'", raw=True)
+
+        assert 1 == len(u)
+        assert not u.oneByte
+        assert u'\u4e2d'.encode('utf-8') == u.tobytes()
+
+        if is_py3k:
+            assert b'hello world' == bytes(memoryview(s))
+
+            pytest.raises(BufferError, memoryview, u)
+
+    # the cached values are still available, the others need the context of the isolate
+
+    assert 'hello world' == str(s)
+
+    pytest.raises(UnboundLocalError, len, u)
+    pytest.raises(UnboundLocalError, u.tobytes)
+
+    if is_py3k:
+        pytest.raises(UnboundLocalError, memoryview, u)
+
+    with JSIsolate():
+        with JSContext():
+            pytest.raises(UnboundLocalError, len, s)
+
+def testToJSON():
+    with JSContext() as ctxt:
+        obj = ctxt.eval(u"({ a: [1, 2.5, '\u4e2d'], b: null, c: function () {} })")
+
+        assert b'{"a":[1,2.5,"\xe4\xb8\xad"],"b":null}' == obj.to_json()
+        assert b'[1,"a"]' == ctxt.eval("[1, 'a']").to_json()
+        assert ctxt.eval("(function () {})").to_json() is None
+
+def testExposeFunction():
+    def add(i, f, s, *rest):
+        return [type(i).__name__, type(f).__name__, s, len(rest)]
+
+    with JSContext() as ctxt:
+        func = ctxt.expose(add, signature=(int, float, str))
+
+        assert isinstance(func, JSFunction)
+        assert "add" == ctxt.eval("add.name")
+
+        result = list(ctxt.eval("add(1.0, 2, 'x', " + ", ".join(["0"] * 20) + ")"))
+
+        assert 'x' == result[2]
+        assert 20 == result[3]
+        assert 'float' == result[1]
+
+        ctxt.expose(lambda x: x * 2, signature=(int,), name="double")
+
+        assert 6 == ctxt.eval("double(3)")
+        assert "double" == ctxt.eval("double.name")
+
+        pytest.raises(TypeError, ctxt.eval, "double('x')")
+        pytest.raises(TypeError, ctxt.eval, "double(1.5)")
+        pytest.raises(TypeError, ctxt.eval, "add(1, 'x', 'y')")
+        pytest.raises(TypeError, ctxt.eval, "add(1, 2, 3)")
+
+        ctxt.expose(lambda: 1 / 0, name="fail")
+
+        pytest.raises(ZeroDivisionError, ctxt.eval, "fail()")
+        pytest.raises(TypeError, ctxt.expose, add, signature=(list,))
+
+def testFunctionMap():
+    with JSContext() as ctxt:
+        double = ctxt.eval("(function (x) { return x * 2; })")
+        add = ctxt.eval("(function () { var s = 0; for (var i=0; i<arguments.length; i++) s += arguments[i]; return s; })")
+
+        assert [i * 2 for i in range(1000)] == double.map(range(1000), chunk=64)
+        assert [] == double.map([])
+        assert [3, 0, 10] == add.starmap([(1, 2), (), [1, 2, 3, 4]], chunk=2)
+        assert [{'a': 1}] == [convert(r) for r in ctxt.eval("(function (o) { return o; })").map([{'a': 1}])]
+
+        fail = ctxt.eval("(function (x) { if (x == 3) throw new Error('three'); return x; })")
+
+        pytest.raises(JSError, fail.map, range(10), chunk=4)
+        pytest.raises(TypeError, add.starmap, [1])
+        pytest.raises(ValueError, double.map, [1], chunk=0)
+
+def testClassTemplate():
+    class Point(JSClass):
+        def __init__(self, x):
+            self._x = x
+
+        def double(self, factor=2):
+            return self._x * factor
+
+        @property
+        def x(self):
+            return self._x
+
+        @x.setter
+        def x(self, value):
+            self._x = value
+
+    class Global(JSClass):
+        def __init__(self):
+            self.a = Point(1)
+            self.b = Point(2)
+
+        def total(self):
+            return self.a.x + self.b.x
+
+    with JSContext(Global()) as ctxt:
+        assert ctxt.eval("Object.getPrototypeOf(a) === Object.getPrototypeOf(b)")
+        assert [2, 6] == [ctxt.eval("a.double()"), ctxt.eval("b.double(3)")]
+        assert 3 == ctxt.eval("total()")
+
+        ctxt.eval("a.x = 5")
+
+        assert 5 == ctxt.locals.a.x
+        assert 10 == ctxt.eval("a.double()")
+        assert ctxt.eval("'double' in a")
+
+        ctxt.locals.b.double = lambda: 'shadowed'
+
+        assert 'shadowed' == ctxt.eval("b.double()")
+        assert 10 == ctxt.eval("a.double()")
+
+        Point.double = lambda self, factor=2: -self._x
+
+        assert -5 == ctxt.eval("a.double()")
+
+def testClassTemplateLifetime():
+    import gc
+    import weakref
+
+    def make():
+        class Temp(JSClass):
+            def value(self):
+                return 42
+
+            @property
+            def prop(self):
+                return 1
+
+        return Temp
+
+    with JSContext() as ctxt:
+        func = ctxt.eval("(function (o) { return o.value(); })")
+
+        clazz = make()
+
+        assert 42 == func(clazz())
+
+        ctxt.eval("(function (o) { proto = Object.getPrototypeOf(o); })")(clazz())
+
+        ref = weakref.ref(clazz)
+
+        del clazz
+
+        JSEngine.collect()
+        gc.collect()
+
+        assert ref() is None
+
+        # the template of the dead class is released by the next wrap, its prototype is still usable
+
+        assert 42 == func(make()())
+
+        assert ctxt.eval("(function () { try { proto.value.call({}); } catch (e) { return true; } })()")
+        assert ctxt.eval("(function () { try { proto.prop; } catch (e) { return true; } })()")
+
+def testPropertyNames():
+    class Obj(object):
+        pass
+
+    obj = Obj()
+
+    for i in range(5000):
+        setattr(obj, 'attr%d' % i, i)
+
+    with JSContext() as ctxt:
+        func = ctxt.eval("""(function (o) {
+            var sum = 0;
+            for (var i=0; i<5000; i++) sum += o['attr' + i];
+            for (var i=0; i<5000; i++) sum += o['attr' + i];
+            return sum;
+        })""")
+
+        assert 2 * sum(range(5000)) == func(obj)
+
+        names = ctxt.eval("(function (o) { var r = []; for (var k in o) r.push(k); return r; })")(obj)
+
+        assert 5000 == len([name for name in names if name.startswith('attr')])
+
+        ctxt.eval("(function (o) { o.created = o.attr1 + 1; delete o.attr2; })")(obj)
+
+        assert 2 == obj.created
+        assert not hasattr(obj, 'attr2')
+
+def testLargeIntegers():
+    with JSContext() as ctxt:
+        identity = ctxt.eval("(function (x) { return x; })")
+
+        assert 2 ** 31 == identity(2 ** 31)
+        assert 2 ** 32 + 1 == identity(2 ** 32 + 1)
+        assert -2 ** 40 == identity(-2 ** 40)
+        assert float(2 ** 70) == identity(2 ** 70)
+        assert isinstance(identity(2 ** 40), float)
+
+        JSEngine.integralNumbersAsInt = True
+        JSEngine.raiseOnPrecisionLoss = True
+
+        try:
+            assert 2 ** 53 == identity(2 ** 53)
+            assert isinstance(identity(2 ** 40), int if is_py3k else long)
+            assert isinstance(ctxt.eval("1.5"), float)
+            assert 2 ** 60 == identity(2 ** 60)
+
+            pytest.raises(OverflowError, identity, 2 ** 53 + 1)
+            pytest.raises(OverflowError, identity, 2 ** 70 + 1)
+        finally:
+            JSEngine.integralNumbersAsInt = False
+            JSEngine.raiseOnPrecisionLoss = False
+
+def testArrayChunks():
+    with JSContext() as ctxt:
+        array = ctxt.eval("var a = []; for (var i=0; i<1000; i++) a.push(i); a[1001] = 'x'; a")
+
+        items = list(range(1000)) + [None, 'x']
+
+        assert items == list(array)
+        assert items == array.tolist()
+        assert [] == ctxt.eval("[]").tolist()
+        assert [[1]] == [list(item) for item in ctxt.eval("[[1]]").tolist()]
+
 def testDate():
     with JSContext() as ctxt:
         now1 = ctxt.eval("new Date();")
@@ -603,6 +927,37 @@ def testDate():
         now3 = now2.replace(microsecond=123000)
         assert now3 == ctxt.locals.identity(now3)
 
+def testDateConversion():
+    class UTC(tzinfo):
+        def utcoffset(self, dt):
+            return timedelta(0)
+
+        def dst(self, dt):
+            return timedelta(0)
+
+        def tzname(self, dt):
+            return "UTC"
+
+    utc = UTC()
+
+    with JSContext() as ctxt:
+        iso = ctxt.eval("(function (d) { return d.toISOString(); })")
+        identity = ctxt.eval("(function (x) { return x; })")
+
+        assert 946684800000 == ctxt.eval("(function (d) { return d.getTime(); })")(datetime(2000, 1, 1, tzinfo=utc))
+        assert '1960-05-06T07:08:09.010Z' == iso(datetime(1960, 5, 6, 7, 8, 9, 10000, tzinfo=utc))
+
+        old = datetime(1960, 5, 6, 7, 8, 9, 10000)
+
+        assert old == identity(old)
+
+        dates = ctxt.eval("[new Date(Date.UTC(1960, 4, 6, 7, 8, 9, 10)), 0, null]").todates(tz=utc)
+
+        assert [datetime(1960, 5, 6, 7, 8, 9, 10000, tzinfo=utc), datetime(1970, 1, 1, tzinfo=utc), None] == dates
+        assert [old] == ctxt.eval("(function (d) { return [d]; })")(old).todates()
+
+        pytest.raises(TypeError, ctxt.eval("['x']").todates)
+
 def testUnicode():
     with JSContext() as ctxt:
         assert u"人" == toUnicodeString(ctxt.eval(u"\"人\""))
@@ -751,6 +1106,21 @@ def testLivingObjectCache():
         assert ctxt.eval("b == b")
         assert ctxt.eval("o == o")
 
+def testWrapperIdentity():
+    with JSContext() as ctxt:
+        ctxt.eval("var o = { a: [1, 2] }, p = { a: 1 };")
+
+        o = ctxt.locals.o
+
+        assert o is ctxt.locals.o
+        assert o.a is ctxt.locals.o.a
+        assert o is not ctxt.locals.p
+        assert o is ctxt.eval("(function (x) { return x; })")(o)
+
+        del o
+
+        assert ctxt.locals.o == ctxt.locals.o
+
 def testNamedSetter():
     class Obj(JSClass):
         @property
@@ -1 +1,5 @@
 from .engine import *
+from .engine import copy
+from .codecache import *
+from .pool import *
+from .gc import *
@@ -0,0 +1,174 @@
+import os
+import errno
+import mmap
+import hashlib
+import tempfile
+
+import _v8
+
+
+__all__ = ["JSCodeCache"]
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class JSCodeCache(object):
+    """Directory backed store of the precompiled script data.
+
+    The entries are content-addressed by the V8 version and the script source,
+    so a cache directory can be shared between processes and survive restarts.
+
+    Install it with `JSEngine.codeCache = JSCodeCache(path)` to feed the
+    precompiled data into `JSEngine.compile` and `JSContext.eval`.
+    """
+
+    SUFFIX = '.bin'
+
+    def __init__(self, path, max_size=256 * 1024 * 1024, min_source_size=1024):
+        self.path = path
+        self.max_size = max_size
+        self.min_source_size = min_source_size
+
+        self._size = None
+
+        try:
+            os.makedirs(path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def digest(self, source):
+        if not isinstance(source, bytes):
+            source = source.encode('utf-8')
+
+        h = hashlib.sha1(_v8.JSEngine.version.encode('ascii'))
+        h.update(source)
+
+        return h.hexdigest()
+
+    def filename(self, source):
+        return os.path.join(self.path, self.digest(source) + self.SUFFIX)
+
+    def get(self, source):
+        "Return the precompiled data of the source as a read-only mmap, or None if missing."
+        filename = self.filename(source)
+
+        try:
+            f = open(filename, 'rb')
+        except IOError as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            os.utime(filename, None)
+        except OSError:
+            pass
+
+        return data
+
+    def put(self, source, data):
+        "Atomically store the precompiled data of the source."
+        filename = self.filename(source)
+
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+
+            try:
+                replaced = os.stat(filename).st_size
+            except OSError:
+                replaced = 0
+
+            _replace(tmp, filename)
+        except:
+            os.unlink(tmp)
+            raise
+
+        if self._size is not None:
+            self._size += len(data) - replaced
+
+        # the total is tracked incrementally, the directory is only rescanned when it may exceed the max_size
+        if self.max_size and (self._size is None or self._size > self.max_size):
+            self.evict()
+
+    def load(self, source):
+        "Return the precompiled data of the source, precompile and store it when missing."
+        if len(source) < self.min_source_size:
+            return None
+
+        data = self.get(source)
+
+        if data is None:
+            try:
+                data = _v8.JSEngine().precompile(source)
+            except SyntaxError:
+                return None
+
+            self.put(source, data)
+
+        return data
+
+    def entries(self):
+        "Return the (mtime, size, filename) of the stored entries, the least recently used first."
+        entries = []
+
+        for name in os.listdir(self.path):
+            if not name.endswith(self.SUFFIX):
+                continue
+
+            filename = os.path.join(self.path, name)
+
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+
+            entries.append((st.st_mtime, st.st_size, filename))
+
+        return sorted(entries)
+
+    @property
+    def size(self):
+        return sum(size for mtime, size, filename in self.entries())
+
+    def __len__(self):
+        return len(self.entries())
+
+    def evict(self):
+        "Remove the least recently used entries until the store fits the max_size."
+        if not self.max_size:
+            return
+
+        entries = self.entries()
+        total = sum(size for mtime, size, filename in entries)
+
+        for mtime, size, filename in entries:
+            if total <= self.max_size:
+                break
+
+            try:
+                os.unlink(filename)
+            except OSError:
+                pass
+
+            total -= size
+
+        self._size = total
+
+    def clear(self):
+        for mtime, size, filename in self.entries():
+            try:
+                os.unlink(filename)
+            except OSError:
+                pass
+
+        self._size = None
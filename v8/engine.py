@@ -6,8 +6,8 @@ from .utils import is_py3k
 
 
 __all__ = ["ReadOnly", "DontEnum", "DontDelete", "Internal",
-           "JSError", "JSObject", "JSNull", "JSUndefined", "JSArray", "JSFunction",
-           "JSClass", "JSEngine", "JSContext", "JSIsolate", "JSScript",
+           "JSError", "JSMemoryLimitExceeded", "JSObject", "JSNull", "JSUndefined", "JSArray", "JSFunction",
+           "JSString", "JSClass", "JSEngine", "JSContext", "JSIsolate", "JSScript",
            "JSObjectSpace", "JSAllocationAction",
            "JSStackTrace", "JSStackFrame",
            "JSExtension", "JSLocker", "JSUnlocker"]
@@ -87,11 +87,14 @@ class JSError(Exception):
 
 _v8._JSError._jsclass = JSError
 
+JSMemoryLimitExceeded = _v8.JSMemoryLimitExceeded
+
 JSObject = _v8.JSObject
 JSNull = _v8.JSNull
 JSUndefined = _v8.JSUndefined
 JSArray = _v8.JSArray
 JSFunction = _v8.JSFunction
+JSString = _v8.JSString
 
 # contribute by e.generalov
 
@@ -170,6 +173,9 @@ class JSUnlocker(_v8.JSUnlocker):
 
 
 class JSClass(object):
+    # share a per-class template, which installs the methods and properties on its prototype
+    __jstemplate__ = True
+
     __properties__ = {}
     __watchpoints__ = {}
 
@@ -326,3 +332,15 @@ class JSContext(_v8.JSContext):
             self.lock = None
 
         del self
+
+
+def copy(obj, deep=True):
+    """Copy the dict, list and tuple into the native JavaScript object and array of the current context.
+
+    Unlike the Python object proxies, the copied values are accessed at native speed from JavaScript,
+    but the later changes made on either side are not reflected on the other one.
+    """
+    if not JSContext.inContext:
+        raise UnboundLocalError("Javascript object out of context")
+
+    return JSContext.current.to_js(obj, deep)
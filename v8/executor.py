@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import pickle
+import itertools
+import threading
+import multiprocessing
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from concurrent.futures import Future
+except ImportError:
+    Future = None
+
+
+__all__ = ["JSProcessPoolExecutor"]
+
+_READY, _FAILED, _STARTED, _DONE, _EXIT = range(5)
+
+
+def _default_context():
+    # forking a process which has initialized V8 is unsafe, the child inherits
+    # the locked mutexes and the helper threads state of the parent's heap
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('spawn')
+
+    return multiprocessing
+
+
+def _marshal(value, marshal):
+    from .engine import JSObject
+
+    if marshal == 'json':
+        if isinstance(value, JSObject):
+            return value.to_json()
+
+        return json.dumps(value).encode('utf-8')
+
+    if isinstance(value, JSObject):
+        value = value.to_python()
+
+    # pickle here, the queue would drop the values it can't pickle in its feeder thread
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _portable(exc):
+    try:
+        pickle.loads(pickle.dumps(exc))
+    except Exception:
+        return RuntimeError("%s: %s" % (type(exc).__name__, exc))
+
+    return exc
+
+
+def _worker(jobs, results, preload, code_cache, max_jobs, max_heap):
+    from .engine import JSContext, JSEngine, JSIsolate
+    from .codecache import JSCodeCache
+
+    pid = os.getpid()
+    reason = 'shutdown'
+
+    with JSContext() as ctxt:
+        try:
+            if code_cache:
+                JSEngine.codeCache = JSCodeCache(code_cache)
+
+            engine = JSEngine()
+
+            for source in preload:
+                engine.compile(source).run()
+        except Exception:
+            results.put((_FAILED, pid, _portable(sys.exc_info()[1])))
+            return
+
+        results.put((_READY, pid))
+
+        for count in itertools.count(1):
+            job = jobs.get()
+
+            if job is None:
+                break
+
+            job_id, target, args, marshal = job
+
+            results.put((_STARTED, pid, job_id))
+
+            try:
+                value = ctxt.eval(target)
+
+                if args is not None:
+                    value = value(*[ctxt.to_js(arg) for arg in args])
+
+                results.put((_DONE, pid, job_id, True, _marshal(value, marshal)))
+            except Exception:
+                results.put((_DONE, pid, job_id, False, _portable(sys.exc_info()[1])))
+
+            job = value = None
+
+            if max_jobs and count >= max_jobs:
+                reason = 'max_jobs'
+                break
+
+            if max_heap and JSIsolate.current.heap_stats()['used_heap_size'] > max_heap:
+                reason = 'max_heap'
+                break
+
+    results.put((_EXIT, pid, reason))
+
+
+class JSProcessPoolExecutor(object):
+    """Evaluate the scripts in a pool of the worker processes, each of them owns an isolate.
+
+    The workers run the preload scripts once at start, compiled with the precompiled data
+    from the code_cache directory when given, and they are recycled after max_jobs jobs or
+    when the used heap grows beyond max_heap bytes.
+
+    The results are marshalled as JSON (marshal='json') or as the pickled plain Python values
+    (marshal='pickle'), the arguments are pickled and copied into the native JavaScript values.
+
+    When a worker fails to start, because the preload scripts or the code cache fail, the executor
+    is broken: the pending futures fail with the startup error and no new jobs are accepted.
+    """
+
+    def __init__(self, max_workers=None, preload=(), code_cache=None,
+                 max_jobs=None, max_heap=None, marshal='json', mp_context=None):
+        if Future is None:
+            raise RuntimeError("JSProcessPoolExecutor requires the concurrent.futures module")
+
+        if marshal not in ('json', 'pickle'):
+            raise ValueError("unknown marshal: %r" % marshal)
+
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.preload = list(preload)
+        self.code_cache = code_cache
+        self.max_jobs = max_jobs
+        self.max_heap = max_heap
+        self.marshal = marshal
+
+        self._mp = mp_context or _default_context()
+        self._jobs = self._mp.Queue()
+        self._results = self._mp.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._futures = {}
+        self._running = {}
+        self._workers = {}
+        self._ready = set()
+        self._shutdown = False
+        self._broken = None
+        self._stats = dict.fromkeys(['started', 'recycled', 'crashed'], 0)
+
+        with self._lock:
+            for i in range(self.max_workers):
+                self._spawn()
+
+        self._collector = threading.Thread(target=self._collect, name='JSProcessPoolExecutor')
+        self._collector.daemon = True
+        self._collector.start()
+
+    def _spawn(self):
+        process = self._mp.Process(target=_worker, args=(self._jobs, self._results, self.preload,
+                                                         self.code_cache, self.max_jobs, self.max_heap))
+        process.daemon = True
+        process.start()
+
+        self._workers[process.pid] = process
+        self._stats['started'] += 1
+
+    def _finish(self, job_id, ok, payload):
+        future, marshal = self._futures.pop(job_id, (None, None))
+
+        if future is None:
+            return
+
+        if not ok:
+            future.set_exception(payload)
+        elif marshal == 'json':
+            future.set_result(None if payload is None else json.loads(payload.decode('utf-8')))
+        else:
+            future.set_result(pickle.loads(payload))
+
+    def _break(self, exc):
+        if self._broken is not None:
+            return
+
+        self._broken = exc
+
+        for job_id in list(self._futures):
+            self._finish(job_id, False, exc)
+
+        for i in range(len(self._workers)):
+            self._jobs.put(None)
+
+    def _handle(self, msg):
+        kind, pid = msg[:2]
+
+        if kind == _READY:
+            self._ready.add(pid)
+        elif kind == _FAILED:
+            process = self._workers.pop(pid, None)
+
+            if process is not None:
+                process.join()
+
+            self._break(RuntimeError("worker process %d failed to start: %s" % (pid, msg[2])))
+        elif kind == _STARTED:
+            self._running[pid] = msg[2]
+        elif kind == _DONE:
+            self._running.pop(pid, None)
+            self._finish(*msg[2:])
+        elif kind == _EXIT:
+            process = self._workers.pop(pid, None)
+
+            self._ready.discard(pid)
+
+            if process is not None:
+                process.join()
+
+            if msg[2] != 'shutdown':
+                self._stats['recycled'] += 1
+
+                if not self._shutdown and self._broken is None:
+                    self._spawn()
+
+    def _reap(self):
+        for pid, process in list(self._workers.items()):
+            if process.is_alive() or process.exitcode == 0:
+                continue
+
+            del self._workers[pid]
+
+            self._stats['crashed'] += 1
+
+            if pid not in self._ready:
+                self._break(RuntimeError("worker process %d died at startup with exit code %d" %
+                                         (pid, process.exitcode)))
+                continue
+
+            self._ready.discard(pid)
+
+            job_id = self._running.pop(pid, None)
+
+            if job_id is not None:
+                self._finish(job_id, False, RuntimeError("worker process %d died with exit code %d" %
+                                                         (pid, process.exitcode)))
+            if not self._shutdown and self._broken is None:
+                self._spawn()
+
+    def _collect(self):
+        while True:
+            msgs = []
+
+            try:
+                msgs.append(self._results.get(timeout=0.1))
+
+                # drain the queue before reaping, a dead worker may still have messages in it
+                while True:
+                    msgs.append(self._results.get_nowait())
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                for msg in msgs:
+                    self._handle(msg)
+
+                self._reap()
+
+                if (self._shutdown or self._broken is not None) and not self._workers:
+                    for job_id in list(self._futures):
+                        self._finish(job_id, False, self._broken or RuntimeError("executor shut down before the job ran"))
+                    break
+
+    def _submit(self, target, args, marshal):
+        marshal = marshal or self.marshal
+
+        if marshal not in ('json', 'pickle'):
+            raise ValueError("unknown marshal: %r" % marshal)
+
+        future = Future()
+
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new jobs after shutdown")
+
+            if self._broken is not None:
+                raise RuntimeError("cannot schedule new jobs, the executor is broken: %s" % self._broken)
+
+            job_id = next(self._ids)
+
+            self._futures[job_id] = (future, marshal)
+
+        self._jobs.put((job_id, target, args, marshal))
+
+        return future
+
+    def eval(self, source, marshal=None):
+        "Evaluate the script in a worker and return a Future of the result."
+        return self._submit(source, None, marshal)
+
+    def call(self, func, args=(), marshal=None):
+        "Call the function, named or given as the source, with the arguments in a worker and return a Future of the result."
+        return self._submit(func, list(args), marshal)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, workers=len(self._workers), pending=len(self._futures),
+                        broken=self._broken is not None)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+
+                for i in range(len(self._workers)):
+                    self._jobs.put(None)
+
+        if wait:
+            self._collector.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
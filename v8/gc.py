@@ -0,0 +1,189 @@
+import time
+import threading
+import contextlib
+
+import _v8
+
+
+__all__ = ["IdleScheduler"]
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class IdleScheduler(object):
+    """Move the V8 garbage collection work into the idle gaps of the host.
+
+    The scheduler is told about the request boundaries with begin() and end(), or the
+    request() context manager, and measures the gaps between the requests. When a request
+    ends, it expects the next gap to be as long as the recent ones (a moving average) and
+    calls JSEngine.idle() with a budget of ratio of the expected gap, capped at max_budget
+    seconds. After V8 reports the idle work is done, the scheduler waits for the next request.
+
+    When the used heap has grown by heap_growth times (and at least min_heap_growth bytes)
+    since the last full cleanup, JSEngine.lowMemory() is called instead.
+
+    With an asyncio loop, attach(loop) runs a timer every interval seconds. When the timer fires
+    on time and no request is running, the loop is idle, and V8 gets a budget of ratio of the
+    interval. Once V8 has no more idle work, the timer waits until the heap grows again.
+
+    The scheduler must be used on the thread which owns the current isolate.
+
+    scheduler = IdleScheduler()
+
+    with scheduler.request():
+        ctxt.eval(...)
+    """
+
+    def __init__(self, ratio=0.5, min_budget=0.001, max_budget=0.1, smoothing=0.2,
+                 heap_growth=2.0, min_heap_growth=16 * 1024 * 1024):
+        self.ratio = ratio
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self.smoothing = smoothing
+        self.heap_growth = heap_growth
+        self.min_heap_growth = min_heap_growth
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._idle_since = _clock()
+        self._expected_gap = None
+        self._done = False
+        self._baseline = None
+        self._loop = None
+        self._handle = None
+        self._stats = dict.fromkeys(['requests', 'notifications', 'completed', 'low_memory'], 0)
+        self._stats.update(dict.fromkeys(['idle_time', 'budget'], 0.0))
+
+    @staticmethod
+    def _used_heap_size():
+        return _v8.JSIsolate.current.heap_stats()['used_heap_size']
+
+    def _count(self, **kwds):
+        with self._lock:
+            for key, value in kwds.items():
+                self._stats[key] += value
+
+    def begin(self):
+        "Mark the start of a request, the idle gap ends here."
+        now = _clock()
+
+        with self._lock:
+            if self._active == 0:
+                gap = now - self._idle_since
+
+                self._stats['idle_time'] += gap
+
+                if self._expected_gap is None:
+                    self._expected_gap = gap
+                else:
+                    self._expected_gap += self.smoothing * (gap - self._expected_gap)
+
+            self._active += 1
+            self._stats['requests'] += 1
+
+    def end(self):
+        "Mark the end of a request, and give V8 the idle budget expected for the next gap."
+        with self._lock:
+            self._active -= 1
+
+            if self._active:
+                return
+
+            self._idle_since = _clock()
+            self._done = False
+
+            expected_gap = self._expected_gap
+
+        if not self.check_heap() and expected_gap is not None:
+            self.notify(expected_gap)
+
+    @contextlib.contextmanager
+    def request(self):
+        self.begin()
+
+        try:
+            yield
+        finally:
+            self.end()
+
+    def check_heap(self):
+        "Call JSEngine.lowMemory() when the heap has grown beyond the threshold, return True if it was called."
+        used = self._used_heap_size()
+
+        if self._baseline is None:
+            self._baseline = used
+
+            return False
+
+        if used - self._baseline < max(self._baseline * (self.heap_growth - 1), self.min_heap_growth):
+            return False
+
+        _v8.JSEngine.lowMemory()
+
+        self._baseline = self._used_heap_size()
+        self._done = True
+        self._count(low_memory=1)
+
+        return True
+
+    def notify(self, gap):
+        "Give V8 the idle budget for a gap of the given seconds, return True if V8 has no more idle work."
+        if self._done:
+            return True
+
+        budget = min(gap * self.ratio, self.max_budget)
+
+        if budget < self.min_budget:
+            return False
+
+        self._done = _v8.JSEngine.idle(int(budget * 1000))
+
+        if self._done:
+            self._baseline = self._used_heap_size()
+
+        self._count(notifications=1, completed=1 if self._done else 0, budget=budget)
+
+        return self._done
+
+    def _tick(self, interval, deadline):
+        now = self._loop.time()
+
+        self._handle = self._loop.call_at(now + interval, self._tick, interval, now + interval)
+
+        with self._lock:
+            if self._active:
+                return
+
+        # the timer fired late, so the loop is busy
+        if now - deadline > interval * self.ratio:
+            return
+
+        if self._done:
+            if self._used_heap_size() <= self._baseline:
+                return
+
+            self._done = False
+
+        if not self.check_heap():
+            self.notify(interval)
+
+    def attach(self, loop, interval=0.05):
+        "Check the asyncio loop every interval seconds, and feed its idle time to V8."
+        self.detach()
+
+        deadline = loop.time() + interval
+
+        self._loop = loop
+        self._handle = loop.call_at(deadline, self._tick, interval, deadline)
+
+    def detach(self):
+        if self._handle is not None:
+            self._handle.cancel()
+
+        self._loop = self._handle = None
+
+    @property
+    def stats(self):
+        "The scheduler metrics, times are the totals in seconds."
+        with self._lock:
+            return dict(self._stats, expected_gap=self._expected_gap or 0.0)
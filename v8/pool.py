@@ -0,0 +1,432 @@
+import sys
+import time
+import threading
+import contextlib
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from concurrent.futures import Future
+except ImportError:
+    Future = None
+
+import _v8
+from .engine import JSLocker, JSObject, JSNull, JSUndefined, JSError
+
+
+__all__ = ["JSContextPool", "JSIsolatePool", "JSPoolTimeout"]
+
+try:
+    _TimeoutError = TimeoutError
+except NameError:
+    _TimeoutError = OSError
+
+_SNAPSHOT_GLOBAL = """(function (global) {
+    var hasOwn = Object.prototype.hasOwnProperty,
+        names = Object.getOwnPropertyNames(global),
+        snapshot = {};
+
+    names.forEach(function (name) {
+        snapshot[name] = Object.getOwnPropertyDescriptor(global, name);
+    });
+
+    return function () {
+        Object.getOwnPropertyNames(global).forEach(function (name) {
+            if (!hasOwn.call(snapshot, name) && !delete global[name]) {
+                global[name] = undefined;
+            }
+        });
+
+        names.forEach(function (name) {
+            var desc = snapshot[name];
+
+            if (hasOwn.call(desc, 'value') && desc.writable && global[name] !== desc.value) {
+                global[name] = desc.value;
+            }
+        });
+    };
+})(this)"""
+
+
+@contextlib.contextmanager
+def _locked():
+    if JSLocker.active:
+        with JSLocker():
+            yield
+    else:
+        yield
+
+
+class JSPoolTimeout(_TimeoutError):
+    "Raised when no pooled context becomes available within the timeout."
+
+
+class _DetachedError(object):
+    "The details of a JSError, copied out of the worker isolate."
+
+    ATTRS = ('name', 'message', 'scriptName', 'lineNum', 'startPos', 'endPos',
+             'startCol', 'endCol', 'sourceLine', 'stackTrace')
+
+    def __init__(self, exc):
+        self._str = str(exc)
+
+        for attr in self.ATTRS:
+            setattr(self, attr, getattr(exc, attr, None))
+
+    def __str__(self):
+        return self._str
+
+
+class _PooledContext(object):
+    def __init__(self, ctxt, reset):
+        self.ctxt = ctxt
+        self.reset = reset
+        self.uses = 0
+
+
+class JSContextPool(object):
+    """A pool of the pre-created contexts, handed out one request at a time.
+
+    When a context is returned to the pool, its global object is restored to the snapshot
+    taken at creation (reset='restore'), or the context is dropped and a new one is created
+    (reset='recreate'). The restore only reverts the own properties of the JavaScript global,
+    the changes to the builtin prototypes or to the Python global object are kept.
+
+    with pool.acquire() as ctxt:
+        ctxt.eval(...)
+    """
+
+    RESTORE = 'restore'
+    RECREATE = 'recreate'
+
+    def __init__(self, size, global_factory=None, extensions=None, reset=RESTORE):
+        if reset not in (self.RESTORE, self.RECREATE):
+            raise ValueError("unknown reset mode: %r" % reset)
+
+        self.size = size
+        self.global_factory = global_factory
+        self.extensions = list(extensions or [])
+        self.reset = reset
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(['created', 'acquired', 'reused', 'recreated', 'discarded'], 0)
+        self._stats.update(dict.fromkeys(['creation_time', 'wait_time', 'max_wait_time'], 0.0))
+
+        with _locked():
+            for i in range(size):
+                self._idle.put(self._create())
+
+    def _count(self, **kwds):
+        with self._lock:
+            for key, value in kwds.items():
+                self._stats[key] += value
+
+    def _create(self):
+        start = time.time()
+
+        ctxt = _v8.JSContext(self.global_factory() if self.global_factory else None, self.extensions)
+
+        reset = None
+
+        if self.reset == self.RESTORE:
+            ctxt.enter()
+
+            try:
+                reset = ctxt.eval(_SNAPSHOT_GLOBAL)
+            finally:
+                ctxt.leave()
+
+        self._count(created=1, creation_time=time.time() - start)
+
+        return _PooledContext(ctxt, reset)
+
+    def _recreate(self):
+        with _locked():
+            item = self._create()
+
+        self._idle.put(item)
+        self._count(recreated=1)
+
+    def _release(self, item, restored):
+        if restored:
+            self._idle.put(item)
+        elif JSLocker.active:
+            thread = threading.Thread(target=self._recreate, name='JSContextPool')
+            thread.daemon = True
+            thread.start()
+        else:
+            self._recreate()
+
+    @contextlib.contextmanager
+    def acquire(self, timeout=None):
+        """Borrow an entered context from the pool, wait for the timeout when all the contexts are in use.
+
+        Raises JSPoolTimeout when no context becomes available in time.
+        """
+        start = time.time()
+
+        try:
+            item = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise JSPoolTimeout("no context available in the pool after %s seconds" % timeout)
+
+        wait = time.time() - start
+
+        with self._lock:
+            self._stats['acquired'] += 1
+            self._stats['reused'] += 1 if item.uses else 0
+            self._stats['wait_time'] += wait
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait)
+
+        item.uses += 1
+        restored = discarded = False
+
+        try:
+            with _locked():
+                item.ctxt.enter()
+
+                try:
+                    yield item.ctxt
+                finally:
+                    try:
+                        if item.reset is not None:
+                            item.reset()
+                            restored = True
+                    except Exception:
+                        pass
+                    finally:
+                        item.ctxt.leave()
+
+                        # the discarded context must be released while the V8 lock is still held
+                        if not restored:
+                            discarded = item.reset is not None
+
+                            item.ctxt = item.reset = None
+        finally:
+            # in the recreate mode the release is counted as recreated, only a failed restore is a discard
+            if discarded:
+                self._count(discarded=1)
+
+            self._release(item, restored)
+
+    @property
+    def idle(self):
+        return self._idle.qsize()
+
+    @property
+    def stats(self):
+        "The pool metrics, times are the totals in seconds."
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+
+class JSIsolatePool(object):
+    """A pool of the worker threads, each of them pins its own isolate and context.
+
+    The scripts run in parallel on the workers and release the GIL while executing, so the
+    CPU-bound workloads scale with the cores instead of serializing on a single V8 lock.
+    The results are converted to the plain Python values inside the worker, since the
+    JavaScript objects can't leave their isolate.
+
+    with JSIsolatePool(4) as pool:
+        future = pool.submit("(function (x) { return x * 2; })", [21])
+    """
+
+    def __init__(self, size, global_factory=None, extensions=None, script_cache=True):
+        if Future is None:
+            raise RuntimeError("JSIsolatePool requires the concurrent.futures module")
+
+        self.size = size
+        self.global_factory = global_factory
+        self.extensions = list(extensions or [])
+        self.script_cache = script_cache
+
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._broken = None
+        self._workers = []
+
+        for i in range(size):
+            thread = threading.Thread(target=self._work, name='JSIsolatePool-%d' % i)
+            thread.daemon = True
+            thread.start()
+
+            self._workers.append(thread)
+
+    def _work(self):
+        isolate = _v8.JSIsolate(True)
+
+        locker = _v8.JSLocker(isolate)
+        locker.enter()
+
+        isolate.enter()
+
+        ctxt = None
+
+        try:
+            try:
+                if self.script_cache:
+                    _v8.JSEngine.enableScriptCache()
+
+                ctxt = _v8.JSContext(self.global_factory() if self.global_factory else None, self.extensions)
+                ctxt.enter()
+            except BaseException:
+                self._break(self._detach(sys.exc_info()[1]))
+
+                # drop the handles of the worker isolate while it is still locked and entered
+                ctxt = None
+
+                _v8.JSEngine.disableScriptCache()
+
+                return
+
+            try:
+                while True:
+                    job = self._jobs.get()
+
+                    if job is None:
+                        break
+
+                    future, script, args = job
+
+                    if not future.set_running_or_notify_cancel():
+                        continue
+
+                    result = None
+
+                    try:
+                        result = ctxt.eval(script)
+
+                        if args is not None:
+                            result = result(*args)
+
+                        result = self._plain(result, {})
+                    except BaseException:
+                        future.set_exception(self._detach(sys.exc_info()[1]))
+                    else:
+                        future.set_result(result)
+
+                    job = future = result = None
+            finally:
+                ctxt.leave()
+                del ctxt
+
+                # release the cached scripts while the isolate is still locked and entered
+                _v8.JSEngine.disableScriptCache()
+        finally:
+            isolate.leave()
+            locker.leave()
+
+    @classmethod
+    def _plain(cls, value, memo):
+        # the JavaScript objects hold the handles of the worker isolate, they can't leave the worker
+        if isinstance(value, (JSNull, JSUndefined)):
+            return None
+
+        if isinstance(value, JSObject):
+            value = value.to_python()
+
+            if isinstance(value, JSObject):
+                raise TypeError("the result can't be converted to a Python value: %s" % type(value).__name__)
+
+        if not isinstance(value, (list, dict)):
+            return value
+
+        if id(value) in memo:
+            return value
+
+        memo[id(value)] = value
+
+        if isinstance(value, list):
+            value[:] = [cls._plain(item, memo) for item in value]
+        else:
+            for key, item in list(value.items()):
+                value[key] = cls._plain(item, memo)
+
+        return value
+
+    @staticmethod
+    def _detach(exc):
+        # JSError keeps the handles of the worker isolate, which can't be released on another thread
+        if isinstance(exc, JSError):
+            exc = JSError(_DetachedError(exc))
+
+        exc.__traceback__ = None
+
+        return exc
+
+    def _break(self, exc):
+        # a worker failed to start, fail the queued jobs and stop the other workers
+        with self._lock:
+            if self._broken is not None:
+                return
+
+            self._broken = exc
+
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+
+                if job is not None and job[0].set_running_or_notify_cancel():
+                    job[0].set_exception(exc)
+
+            for i in range(self.size):
+                self._jobs.put(None)
+
+    def submit(self, script, args=None):
+        """Evaluate the script on a worker and return a Future of the result.
+
+        When args is given, the script should evaluate to a function, which is called with them.
+        When a worker failed to start, the future fails with its startup error.
+        """
+        future = Future()
+
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+
+            if self._broken is not None:
+                future.set_exception(self._broken)
+            else:
+                self._jobs.put((future, script, None if args is None else list(args)))
+
+        return future
+
+    def map(self, script, iterable):
+        "Call the function evaluated from the script with each of the argument lists."
+        futures = [self.submit(script, args) for args in iterable]
+
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+
+                if self._broken is None:
+                    for thread in self._workers:
+                        self._jobs.put(None)
+
+        if wait:
+            for thread in self._workers:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
@@ -7,10 +7,7 @@ is_py3k = sys.version_info[0] > 2
 
 def convert(obj):
 
-    if type(obj) == _v8.JSArray:
-        return [convert(v) for v in obj]
-
-    if type(obj) == _v8.JSObject:
-        return dict([[str(k), convert(obj.__getattr__(str(k)))] for k in (obj.__dir__() if is_py3k else obj.__members__)])
+    if type(obj) in (_v8.JSArray, _v8.JSObject):
+        return obj.to_python()
 
     return obj